@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import requests
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from engine.context_transform import ContextModification, ContextTransformer
+from engine.debate import DEFAULT_HISTORY_TOKENS, Debate
+from engine.kg_parser import KnowledgeGraphParser, Philosopher
+from engine.log import configure_logging, log_event
+from engine.name_index import AmbiguousNameError
+from engine.prompt_builder import PromptBuilder
+from engine.registry import DEFAULT_ONTOLOGY_PATH, ONTOLOGY_ENV, get_parser
+from engine.token_budget import TokenBudgeter
+from llm.generate import LLMGenerator
+
+# Here we serve the engine over HTTP
+# `uvicorn app.api:app --workers 4` (or `altergeist serve`) starts the service. Every worker process
+# loads the ontology and creates one generator and one token budgeter at startup, before it accepts
+# requests, and every request then shares them:
+# - LLM calls go through LLMGenerator.agenerate, so they run on the shared pooled HTTP client
+#   without blocking the event loop, at most LLM_MAX_CONCURRENCY at once per worker. Debates and
+#   streams are pulled through LLMGenerator.aiterate and count against the same limit
+# - /ask/stream and /debate/stream send the response as server-sent events while it is generated
+# - Inference API errors return 502, or end a stream with an "error" event
+# - Every response carries a Server-Timing header with the time spent building prompts, waiting
+#   for the model and in total; for streams the header is sent before the body, so it only
+#   covers the time to the first event
+#
+# Worker processes share the response cache and the transcript store on disk; both use SQLite in
+# WAL mode, which allows one writer and many readers across processes.
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Every speaker adds a turn per round, so the panel size bounds the work a single request asks for
+MAX_DEBATERS = 8
+
+
+class SimulatedContext(BaseModel):
+    birth_year: int
+    region: str
+    historical_period: str
+
+
+class AskRequest(BaseModel):
+    philosopher: str
+    question: str
+    simulated_context: Optional[SimulatedContext] = None
+    lineage: bool = Field(False, description="Also name indirect influences, see InfluenceIndex")
+    use_cache: bool = True
+
+
+class DebateRequest(BaseModel):
+    philosophers: List[str] = Field(..., min_length=2, max_length=MAX_DEBATERS, description="Names in speaking order")
+    topic: str
+    rounds: int = Field(1, ge=1, le=10)
+    history_tokens: int = Field(DEFAULT_HISTORY_TOKENS, ge=64)
+
+
+class TransformRequest(BaseModel):
+    philosopher: str
+    year: Optional[int] = None
+    region: Optional[str] = None
+    event: Optional[str] = None
+    lineage: bool = Field(False, description="Replace anachronistic influences by their own influences")
+    question: Optional[str] = Field(None, description="Also answer this question as the transformed philosopher")
+
+
+def philosopher_summary(philosopher: Philosopher) -> Dict:
+    """The JSON form of a philosopher, with labels instead of belief and concept URIs."""
+    return {
+        "name": philosopher.name,
+        "birth_year": philosopher.birth_year,
+        "region": philosopher.region,
+        "ideological_cluster": philosopher.ideological_cluster,
+        "contexts": list(philosopher.contexts),
+        "beliefs": list(philosopher.belief_labels),
+        "key_concepts": list(philosopher.concept_labels),
+        "influenced_by": list(philosopher.influenced_by),
+        "influenced": list(philosopher.influenced),
+    }
+
+
+class Engine:
+    """The per-process state every request shares, created once at startup."""
+
+    def __init__(self, ontology: str = DEFAULT_ONTOLOGY_PATH):
+        started = time.perf_counter()
+        self.parser: KnowledgeGraphParser = get_parser(ontology)
+        self.generator = LLMGenerator.from_env()
+        self.budgeter = TokenBudgeter.from_env()
+        self.influence_index = self.parser.get_influence_index()
+        self.philosophers = self.parser.get_all_philosophers()
+        self.summaries = [philosopher_summary(p) for p in self.philosophers]
+        # Compile every persona prefix now rather than on each philosopher's first request
+        for philosopher in self.philosophers:
+            PromptBuilder(philosopher).build_persona_prefix()
+        log_event(
+            logger, "api_ready",
+            ontology=ontology,
+            philosophers=len(self.philosophers),
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+
+    def philosopher(self, name: str) -> Philosopher:
+        """Look up a philosopher, see KnowledgeGraphParser.get_philosopher."""
+        try:
+            philosopher = self.parser.get_philosopher(name)
+        except AmbiguousNameError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if philosopher is None:
+            raise HTTPException(status_code=404, detail=f"Unknown philosopher '{name}'")
+        return philosopher
+
+    def prompt(self, philosopher: Philosopher, question: str, simulated_context: Optional[Dict] = None,
+               lineage: bool = False) -> str:
+        """The prompt for a question, trimmed to the input token budget."""
+        builder = PromptBuilder(philosopher, influence_index=self.influence_index if lineage else None)
+        return self.budgeter.fit(builder, question, simulated_context).prompt
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Loading the ontology blocks, so it runs off the event loop
+    app.state.engine = await run_in_threadpool(Engine, os.getenv(ONTOLOGY_ENV, DEFAULT_ONTOLOGY_PATH))
+    yield
+
+
+app = FastAPI(title="Altergeist", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def timing_headers(request: Request, call_next):
+    started = time.perf_counter()
+    request.state.timings = {}
+    response = await call_next(request)
+    total_ms = (time.perf_counter() - started) * 1000
+    timings = [f"{name};dur={duration:.2f}" for name, duration in request.state.timings.items()]
+    timings.append(f"total;dur={total_ms:.2f}")
+    response.headers["Server-Timing"] = ", ".join(timings)
+    log_event(
+        logger, "api_request", level=logging.DEBUG,
+        method=request.method, path=request.url.path, status=response.status_code,
+        duration_ms=round(total_ms, 2),
+    )
+    return response
+
+
+@contextmanager
+def timed(request: Request, name: str) -> Iterator[None]:
+    """Add the time spent in the block to the request's Server-Timing header under name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = request.state.timings
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def engine_of(request: Request) -> Engine:
+    return request.app.state.engine
+
+
+def sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def inference_error(e: requests.exceptions.RequestException) -> HTTPException:
+    return HTTPException(status_code=502, detail=f"Inference API error: {e}")
+
+
+def stream_errors(events: Iterator[str]) -> Iterator[str]:
+    """Pass events through, ending the stream with an "error" event if the inference API fails."""
+    try:
+        yield from events
+    except requests.exceptions.RequestException as e:
+        # The 200 status is already sent, so the failure can only be reported in the stream
+        logger.warning("Stream ended by an inference API error: %s", e)
+        yield sse("error", {"detail": f"Inference API error: {e}"})
+
+
+def event_stream(engine: Engine, events: Iterator[str]) -> StreamingResponse:
+    """Send a blocking iterator of server-sent events, pulled on the generator's bounded thread pool."""
+    return StreamingResponse(
+        engine.generator.aiterate(stream_errors(events)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/philosophers")
+async def list_philosophers(request: Request) -> List[Dict]:
+    return engine_of(request).summaries
+
+
+@app.get("/philosophers/{name}")
+async def get_philosopher(name: str, request: Request) -> Dict:
+    return philosopher_summary(engine_of(request).philosopher(name))
+
+
+@app.post("/ask")
+async def ask(body: AskRequest, request: Request) -> Dict:
+    engine = engine_of(request)
+    philosopher = engine.philosopher(body.philosopher)
+    context = body.simulated_context.model_dump() if body.simulated_context else None
+    with timed(request, "prompt"):
+        prompt = engine.prompt(philosopher, body.question, context, body.lineage)
+    try:
+        with timed(request, "llm"):
+            response = await engine.generator.agenerate(prompt, philosopher.name, metadata={"question": body.question},
+                                                        use_cache=body.use_cache, raise_errors=True)
+    except requests.exceptions.RequestException as e:
+        raise inference_error(e)
+    return {"philosopher": philosopher.name, "question": body.question, "response": response,
+            "model": engine.generator.model_name}
+
+
+@app.post("/ask/stream")
+async def ask_stream(body: AskRequest, request: Request) -> StreamingResponse:
+    """
+    Like /ask, as "chunk" events followed by a "done" event with the whole response, or by an
+    "error" event if the inference API fails.
+    """
+    engine = engine_of(request)
+    philosopher = engine.philosopher(body.philosopher)
+    context = body.simulated_context.model_dump() if body.simulated_context else None
+    with timed(request, "prompt"):
+        prompt = engine.prompt(philosopher, body.question, context, body.lineage)
+
+    def events() -> Iterator[str]:
+        parts = []
+        for chunk in engine.generator.stream_response(prompt, philosopher.name, use_cache=body.use_cache,
+                                                      raise_errors=True, metadata={"question": body.question}):
+            parts.append(chunk)
+            yield sse("chunk", {"text": chunk})
+        yield sse("done", {"philosopher": philosopher.name, "response": "".join(parts)})
+
+    return event_stream(engine, events())
+
+
+def _debate(engine: Engine, body: DebateRequest) -> Debate:
+    philosophers = [engine.philosopher(name) for name in body.philosophers]
+    return Debate(engine.generator, philosophers, body.topic, rounds=body.rounds, history_tokens=body.history_tokens)
+
+
+@app.post("/debate")
+async def debate(body: DebateRequest, request: Request) -> Dict:
+    engine = engine_of(request)
+    debate = _debate(engine, body)
+    # Turns depend on each other, so they are taken one at a time, each on the generator's pool
+    try:
+        with timed(request, "llm"):
+            turns = [turn async for turn in engine.generator.aiterate(debate.run_turns())]
+    except requests.exceptions.RequestException as e:
+        raise inference_error(e)
+    return {
+        "debate_id": debate.debate_id,
+        "topic": debate.topic,
+        "turns": [{"round": t.round, "speaker": t.speaker, "text": t.text} for t in turns],
+        "metrics": [asdict(m) for m in debate.metrics],
+    }
+
+
+@app.post("/debate/stream")
+async def debate_stream(body: DebateRequest, request: Request) -> StreamingResponse:
+    """
+    Like /debate, as a "turn" event when a speaker starts, "chunk" events while they speak,
+    and a "done" event with the debate id once every round is finished. A failed turn ends
+    the debate with an "error" event instead.
+    """
+    engine = engine_of(request)
+    debate = _debate(engine, body)
+
+    def events() -> Iterator[str]:
+        for round_number, speaker, chunks in debate.stream_turns():
+            yield sse("turn", {"round": round_number, "speaker": speaker.name})
+            for chunk in chunks:
+                yield sse("chunk", {"text": chunk})
+        yield sse("done", {"debate_id": debate.debate_id, "turns": len(debate.turns)})
+
+    return event_stream(engine, events())
+
+
+@app.post("/transform")
+async def transform(body: TransformRequest, request: Request) -> Dict:
+    engine = engine_of(request)
+    original = engine.philosopher(body.philosopher)
+    transformer = ContextTransformer(original, influence_index=engine.influence_index if body.lineage else None,
+                                     parser=engine.parser)
+    modified = transformer.transform(ContextModification(year=body.year, region=body.region, event=body.event))
+    result = {"philosopher": philosopher_summary(modified)}
+    if body.question:
+        with timed(request, "prompt"):
+            prompt = engine.prompt(modified, body.question)
+        try:
+            with timed(request, "llm"):
+                result["response"] = await engine.generator.agenerate(
+                    prompt, modified.name, metadata={"question": body.question, "transform": body.model_dump()},
+                    raise_errors=True,
+                )
+        except requests.exceptions.RequestException as e:
+            raise inference_error(e)
+    return result
@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import typer
+from engine.kg_parser import Philosopher
+from engine.log import configure_logging, log_event
+from engine.name_index import AmbiguousNameError
+from engine.prompt_builder import PromptBuilder
+from engine.registry import DEFAULT_ONTOLOGY_PATH, ONTOLOGY_ENV, get_parser
+from engine.token_budget import TokenBudgeter
+from llm.client import ClientConfig, RateLimiter
+from llm.generate import LLMGenerator
+
+# Here we generate responses in bulk from the command line
+# `altergeist batch questions.jsonl` asks every selected philosopher every question:
+# - Prompts are built with PromptBuilder and sent through LLMGenerator by a pool of worker threads
+# - An optional rate limit caps how many requests start per second across all workers; cache
+#   hits do not count against it
+# - The shared HTTP connection pool is sized to the number of workers
+# - Results are appended to a JSONL file as they complete, in completion order
+# - Every completed (philosopher, question) pair is appended to a checkpoint file, so an
+#   interrupted run picks up where it stopped; failed pairs are not checkpointed and are retried
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer(help="Altergeist command line tools.")
+
+
+@app.callback()
+def main() -> None:
+    """Altergeist command line tools."""
+    configure_logging()
+
+
+def read_questions(path: Path) -> List[Dict]:
+    """
+    Read questions from a JSONL file.
+
+    Each line is either a JSON string or an object with a "question" and optionally an "id"
+    and a "simulated_context" (see PromptBuilder.build_prompt). Questions without an id are
+    identified by their line number.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"question": record}
+            if not record.get("question"):
+                raise typer.BadParameter(f"Line {number} of {path} has no question")
+            record.setdefault("id", str(number))
+            record["id"] = str(record["id"])
+            questions.append(record)
+    return questions
+
+
+def select_philosophers(names: str, ttl_path: str) -> Dict[str, Philosopher]:
+    """
+    Resolve "all" or a comma-separated list of names to philosophers, keyed by URI.
+
+    Philosophers are keyed by URI rather than name, since two philosophers may share a name.
+    """
+    parser = get_parser(ttl_path)
+    philosophers = parser.get_philosophers_by_uri()
+    if names.strip().lower() == "all":
+        return philosophers
+    selected = {}
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        try:
+            uri = parser.get_philosopher_uri(name)
+        except AmbiguousNameError as e:
+            raise typer.BadParameter(str(e))
+        if uri is None or uri not in philosophers:
+            raise typer.BadParameter(f"Unknown philosopher '{name}'")
+        selected[uri] = philosophers[uri]
+    return selected
+
+
+def read_checkpoint(path: Path) -> Set[Tuple[str, str]]:
+    """The (philosopher URI, question id) pairs a previous run completed."""
+    if not path.exists():
+        return set()
+    completed = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                uri, question_id = json.loads(line)
+                completed.add((uri, question_id))
+    return completed
+
+
+@app.command()
+def batch(
+    questions: Path = typer.Argument(..., exists=True, dir_okay=False, help="JSONL file of questions"),
+    philosophers: str = typer.Option("all", "--philosophers", "-p", help='"all" or a comma-separated list of names'),
+    output: Path = typer.Option(Path("output/batch.jsonl"), "--output", "-o", help="JSONL file results are appended to"),
+    checkpoint: Optional[Path] = typer.Option(None, help="Checkpoint file; defaults to the output path with .checkpoint"),
+    workers: int = typer.Option(8, "--workers", "-w", min=1, help="Number of requests in flight at once"),
+    rate: float = typer.Option(0.0, help="Maximum requests started per second, 0 for no limit"),
+    max_input_tokens: Optional[int] = typer.Option(None, help="Trim prompts to this many tokens, see TokenBudgeter"),
+    use_cache: bool = typer.Option(True, "--cache/--no-cache", help="Use the response cache"),
+    ontology: str = typer.Option(DEFAULT_ONTOLOGY_PATH, help="Ontology file"),
+) -> None:
+    """Ask every selected philosopher every question and stream the responses to JSONL."""
+    started = time.perf_counter()
+    records = read_questions(questions)
+    panel = select_philosophers(philosophers, ontology)
+    checkpoint = checkpoint or output.with_suffix(".checkpoint")
+    completed = read_checkpoint(checkpoint)
+
+    # Give every worker its own pooled connection; a smaller pool opens and discards the extra ones
+    if int(os.getenv("LLM_POOL_SIZE", ClientConfig.pool_size)) < workers:
+        os.environ["LLM_POOL_SIZE"] = str(workers)
+    generator = LLMGenerator.from_env()
+    if not use_cache:
+        generator.cache = None
+    if rate > 0:
+        # Applied by the generator to upstream calls only, so cache hits do not use up the rate
+        generator.rate_limiter = RateLimiter(rate, burst=workers)
+    budgeter = TokenBudgeter(max_input_tokens, model_name=generator.model_name) if max_input_tokens else None
+    # One builder per philosopher, so the persona part of the prompt is only built once
+    builders = {uri: PromptBuilder(p) for uri, p in panel.items()}
+
+    skipped = sum(1 for record in records for uri in builders if (uri, record["id"]) in completed)
+
+    def pending() -> Iterator[Tuple[str, Dict]]:
+        for record in records:
+            for uri in builders:
+                if (uri, record["id"]) not in completed:
+                    yield uri, record
+
+    def ask(uri: str, record: Dict) -> Dict:
+        builder = builders[uri]
+        name = builder.philosopher.name
+        context = record.get("simulated_context")
+        if budgeter is not None:
+            prompt = budgeter.fit(builder, record["question"], context).prompt
+        else:
+            prompt = builder.build_prompt(record["question"], context)
+        call_started = time.perf_counter()
+        response = generator.generate_response(prompt, name, raise_errors=True,
+                                               metadata={"question_id": record["id"], "question": record["question"],
+                                                         "philosopher_uri": uri})
+        return {
+            "philosopher": name,
+            "philosopher_uri": uri,
+            "question_id": record["id"],
+            "question": record["question"],
+            "response": response,
+            "model": generator.model_name,
+            "latency_ms": round((time.perf_counter() - call_started) * 1000, 2),
+        }
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+    done = failed = 0
+    jobs = pending()
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            open(output, "a", encoding="utf-8") as out, open(checkpoint, "a", encoding="utf-8") as ckpt:
+        in_flight: Dict[Future, Tuple[str, Dict]] = {}
+
+        def fill() -> None:
+            # Only keep a bounded number of jobs queued, so huge corpora do not sit in memory
+            while len(in_flight) < workers * 2:
+                job = next(jobs, None)
+                if job is None:
+                    return
+                in_flight[pool.submit(ask, *job)] = job
+
+        fill()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                uri, record = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Any failure, network or not, only fails this pair; it is retried on the next run
+                    failed += 1
+                    name = panel[uri].name
+                    logger.warning("Failed to generate a response for %s, question %s: %s", name, record["id"], e)
+                    error = {"philosopher": name, "philosopher_uri": uri, "question_id": record["id"],
+                             "question": record["question"], "error": f"{type(e).__name__}: {e}"}
+                    out.write(json.dumps(error, ensure_ascii=False) + "\n")
+                    out.flush()
+                    continue
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                # Checkpoint only once the result is safely written
+                ckpt.write(json.dumps([uri, record["id"]]) + "\n")
+                ckpt.flush()
+                done += 1
+            fill()
+
+    log_event(
+        logger, "batch_finished",
+        questions=len(records),
+        philosophers=len(panel),
+        skipped=skipped,
+        completed=done,
+        failed=failed,
+        duration_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+    typer.echo(f"{done} responses written to {output}, {failed} failed, {skipped} already done")
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Address to listen on"),
+    port: int = typer.Option(8000, help="Port to listen on"),
+    workers: int = typer.Option(1, "--workers", "-w", min=1, help="Number of worker processes"),
+    ontology: str = typer.Option(DEFAULT_ONTOLOGY_PATH, help="Ontology file"),
+) -> None:
+    """Serve the HTTP API, see app.api."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise typer.BadParameter("The API needs fastapi and uvicorn, install them with pip install altergeist[api]")
+    # Worker processes import app.api themselves, so the ontology is passed through the environment
+    os.environ[ONTOLOGY_ENV] = ontology
+    uvicorn.run("app.api:app", host=host, port=port, workers=workers)
+
+
+if __name__ == "__main__":
+    app()
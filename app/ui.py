@@ -1,26 +1,32 @@
 import streamlit as st
+import logging
 import sys
 import os
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from pathlib import Path
-from engine.kg_parser import KnowledgeGraphParser
+from engine.log import configure_logging, log_event
+from engine.registry import get_parser
 from engine.prompt_builder import PromptBuilder
+from engine.token_budget import TokenBudgeter
 from engine.context_transform import ContextTransformer, ContextModification
+from engine.debate import Debate
 from llm.generate import LLMGenerator
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 def load_philosophers():
     """Load all philosophers from the knowledge graph."""
-    print("Loading philosophers from knowledge graph...")
-    parser = KnowledgeGraphParser("data/philosophers.ttl")
+    started = time.perf_counter()
+    parser = get_parser()
     philosophers = parser.get_all_philosophers()
-    print(f"Loaded {len(philosophers)} philosophers from parser")
     
     uri_to_philosopher = {}
     label_to_uri = {}
     for p in philosophers:
         # Skip philosophers with None or empty label
         if not p.name or p.name.strip().lower() == 'none':
-            print(f"Skipping philosopher with invalid name: {p}")
+            logger.debug("Skipping philosopher with invalid name: %s", p)
             continue
         # Use both label and URI fragment for uniqueness
         uri_fragment = p.name.replace(' ', '')
@@ -28,11 +34,33 @@ def load_philosophers():
         display_label = f"{p.name} ({uri_fragment})"
         uri_to_philosopher[uri] = p
         label_to_uri[display_label] = uri
-        print(f"Added philosopher to UI: {display_label}")
-    
-    print(f"Final UI mapping: {len(uri_to_philosopher)} philosophers")
+        logger.debug("Added philosopher to UI: %s", display_label)
+
+    log_event(
+        logger, "ui_philosophers_loaded",
+        philosophers=len(philosophers),
+        selectable=len(uri_to_philosopher),
+        duration_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
     return uri_to_philosopher, label_to_uri
 
+def most_opposed_label(philosopher, options, label_to_uri, uri_to_philosopher):
+    """Return the option naming the philosopher who clashes most with the given one, if any."""
+    similarity = get_parser().get_similarity()
+    option_by_name = {uri_to_philosopher[label_to_uri[label]].name: label for label in options}
+    try:
+        ranked = similarity.most_opposed(philosopher.name, n=len(similarity.philosophers))
+    except KeyError:
+        return None
+    for uri, stance in ranked:
+        if stance >= 0:
+            # Nobody left actually clashes with them
+            break
+        label = option_by_name.get(similarity.label(similarity.id_of(uri)))
+        if label:
+            return label
+    return None
+
 def main():
     st.title("Altergeist")
     st.write("Generate responses from historical philosophers or simulate philosophical debates.")
@@ -40,7 +68,6 @@ def main():
     # Load philosophers
     try:
         uri_to_philosopher, label_to_uri = load_philosophers()
-        print(f"Loaded {len(label_to_uri)} philosophers for UI")
         
         # Use label for display, but URI for selection
         label_list = list(label_to_uri.keys())
@@ -49,7 +76,7 @@ def main():
             st.stop()
 
         # Mode selection
-        mode = st.radio("Select Mode", ["Single Philosopher Q&A", "Debate"])
+        mode = st.radio("Select Mode", ["Single Philosopher Q&A", "Panel Q&A", "Debate"])
         
         if mode == "Single Philosopher Q&A":
             # Single philosopher mode
@@ -88,29 +115,59 @@ def main():
                     st.error("Please enter a question first.")
                     return
 
-                # Create prompt
+                # Create prompt, trimmed to the input token budget
                 builder = PromptBuilder(philosopher)
-                prompt = builder.build_prompt(question)
+                prompt = TokenBudgeter.from_env().fit(builder, question).prompt
 
                 # Generate response
                 try:
                     generator = LLMGenerator.from_env()
-                    response = generator.generate_response(prompt, philosopher.name)
-                    
+
+                    # Render the response as it is generated
                     st.subheader("Generated Response")
-                    st.write(response)
-                    
-                    # Save the interaction
-                    output_dir = Path("output")
-                    output_dir.mkdir(exist_ok=True)
-                    
-                    with open(output_dir / f"{philosopher.name.lower().replace(' ', '_')}_response.txt", "w") as f:
-                        f.write(f"Question: {question}\n\n")
-                        f.write(f"Response: {response}\n")
+                    # The response is recorded in the transcript store with its question
+                    st.write_stream(generator.stream_response(prompt, philosopher.name,
+                                                              metadata={"question": question}))
                 
                 except Exception as e:
                     st.error(f"Error generating response: {str(e)}")
 
+        elif mode == "Panel Q&A":
+            # Ask several philosophers the same question at once
+            selected_labels = st.multiselect(
+                "Select Philosophers",
+                options=label_list,
+                default=label_list[:2]
+            )
+            panel = [uri_to_philosopher[label_to_uri[label]] for label in selected_labels]
+
+            st.subheader("Ask the Panel")
+            question = st.text_area("Enter your question:", height=100)
+
+            if st.button("Ask Panel"):
+                if not question:
+                    st.error("Please enter a question first.")
+                    return
+                if not panel:
+                    st.error("Please select at least one philosopher.")
+                    return
+
+                try:
+                    generator = LLMGenerator.from_env()
+                    budgeter = TokenBudgeter.from_env()
+                    jobs = [(budgeter.fit(PromptBuilder(p), question).prompt, p.name) for p in panel]
+                    # The calls are independent, so they run concurrently
+                    responses = generator.generate_many(jobs, metadata={"question": question})
+
+                    st.subheader("Panel Responses")
+                    for p, response in zip(panel, responses):
+                        st.write(f"**{p.name}:**")
+                        st.write(response)
+                        st.write("---")
+
+                except Exception as e:
+                    st.error(f"Error generating responses: {str(e)}")
+
         else:
             # Debate mode
             st.subheader("Select Philosophers for Debate")
@@ -126,17 +183,25 @@ def main():
                 philosopher1 = uri_to_philosopher[philosopher1_uri]
             
             with col2:
+                partner_options = [l for l in label_list if l != philosopher1_label]
+                suggested = most_opposed_label(philosopher1, partner_options, label_to_uri, uri_to_philosopher)
                 philosopher2_label = st.selectbox(
                     "Second Philosopher",
-                    options=[l for l in label_list if l != philosopher1_label],
-                    key="philosopher2"
+                    options=partner_options,
+                    # Default to the philosopher who clashes most with the first one; the key
+                    # follows the first choice so the default updates when it changes
+                    index=partner_options.index(suggested) if suggested else 0,
+                    key=f"philosopher2_{philosopher1_label}"
                 )
+                if suggested:
+                    st.caption(f"Most opposed to {philosopher1.name}: {suggested}")
                 philosopher2_uri = label_to_uri[philosopher2_label]
                 philosopher2 = uri_to_philosopher[philosopher2_uri]
 
             # Display philosopher info
             st.subheader("Debate Topic")
             topic = st.text_area("Enter the topic or question for debate:", height=100)
+            rounds = st.slider("Rounds", min_value=1, max_value=5, value=1)
 
             if st.button("Start Debate"):
                 if not topic:
@@ -145,35 +210,18 @@ def main():
 
                 try:
                     generator = LLMGenerator.from_env()
-                    
-                    # Generate initial responses
-                    builder1 = PromptBuilder(philosopher1)
-                    builder2 = PromptBuilder(philosopher2)
-                    
-                    # First philosopher's opening statement
-                    prompt1 = builder1.build_debate_prompt(topic, None)
-                    response1 = generator.generate_response(prompt1, philosopher1.name)
-                    
-                    # Second philosopher's response
-                    prompt2 = builder2.build_debate_prompt(topic, response1)
-                    response2 = generator.generate_response(prompt2, philosopher2.name)
-                    
-                    # Display the debate
+                    debate = Debate(generator, [philosopher1, philosopher2], topic, rounds=rounds)
+
+                    # Display the debate, streaming each turn as it is generated
                     st.subheader("Debate")
-                    st.write(f"**{philosopher1.name}:**")
-                    st.write(response1)
-                    st.write("---")
-                    st.write(f"**{philosopher2.name}:**")
-                    st.write(response2)
-                    
-                    # Save the debate
-                    output_dir = Path("output")
-                    output_dir.mkdir(exist_ok=True)
-                    
-                    with open(output_dir / f"debate_{philosopher1.name.lower()}_{philosopher2.name.lower()}.txt", "w") as f:
-                        f.write(f"Topic: {topic}\n\n")
-                        f.write(f"{philosopher1.name}:\n{response1}\n\n")
-                        f.write(f"{philosopher2.name}:\n{response2}\n")
+                    for round_number, speaker, chunks in debate.stream_turns():
+                        if rounds > 1 and speaker is philosopher1:
+                            st.write(f"*Round {round_number}*")
+                        st.write(f"**{speaker.name}:**")
+                        st.write_stream(chunks)
+                        st.write("---")
+                    # Every turn is recorded in the transcript store under the debate's id
+                    st.caption(f"Debate {debate.debate_id}")
                 
                 except Exception as e:
                     st.error(f"Error generating debate: {str(e)}")
@@ -0,0 +1,85 @@
+"""
+Benchmark the incremental reasoner against the full OWL RL expansion.
+
+The sample ontology is small, so it is scaled up by adding synthetic philosophers that
+believe in existing beliefs and form long influence chains. For each scale we time:
+- full: DeductiveClosure(OWLRL_Semantics).expand, which is what every change used to cost
+- incremental run: the initial run of the incremental reasoner
+- add / retract: asserting and retracting one influencedBy edge after the initial run
+
+Usage:
+    python benchmarks/bench_reasoner.py --scales 0 200 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS
+from engine.symbolic_reasoner import SymbolicReasoner
+
+EX = "http://example.org/philosophy/"
+TTL_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "philosophers.ttl")
+
+
+def synthetic_triples(count: int, seed: int = 0):
+    """Generate `count` synthetic philosophers with beliefs and chained influences."""
+    rng = random.Random(seed)
+    base = Graph()
+    base.parse(TTL_PATH, format="turtle")
+    beliefs = sorted(set(base.subjects(RDF.type, URIRef(EX + "belief"))))
+    triples = []
+    for i in range(count):
+        uri = URIRef(f"{EX}synthetic{i}")
+        triples.append((uri, RDF.type, URIRef(EX + "philosopher")))
+        triples.append((uri, RDFS.label, Literal(f"Synthetic {i}")))
+        for belief in rng.sample(beliefs, 3):
+            triples.append((uri, URIRef(EX + "believesIn"), belief))
+        if i:
+            # Mostly chains, with some branching, so lineages are long
+            teacher = URIRef(f"{EX}synthetic{max(0, i - rng.randint(1, 3))}")
+            triples.append((uri, URIRef(EX + "influencedBy"), teacher))
+    return triples
+
+
+def build(scale: int) -> SymbolicReasoner:
+    reasoner = SymbolicReasoner()
+    reasoner.load_ontology(TTL_PATH)
+    for t in synthetic_triples(scale):
+        reasoner.graph.add(t)
+    return reasoner
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[0, 100, 400])
+    args = parser.parse_args()
+
+    print(f"{'synthetic':>9} {'asserted':>9} {'full (s)':>9} {'inc run (s)':>11} "
+          f"{'add (ms)':>9} {'retract (ms)':>12} {'full size':>10} {'inc size':>9}")
+    for scale in args.scales:
+        full = build(scale)
+        asserted = len(full.graph)
+        full_time, _ = timed(full.run_full_reasoning)
+
+        incremental = build(scale)
+        run_time, _ = timed(incremental.run_reasoning)
+
+        edge = (URIRef(EX + "socrates"), URIRef(EX + "influencedBy"), URIRef(EX + "thucydides"))
+        add_time, _ = timed(lambda: incremental.add_triples([edge]))
+        retract_time, _ = timed(lambda: incremental.retract_triples([edge]))
+
+        print(f"{scale:>9} {asserted:>9} {full_time:>9.3f} {run_time:>11.3f} "
+              f"{add_time * 1000:>9.2f} {retract_time * 1000:>12.2f} {len(full.graph):>10} {len(incremental.graph):>9}")
+
+
+if __name__ == "__main__":
+    main()
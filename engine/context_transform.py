@@ -1,10 +1,18 @@
 from dataclasses import dataclass
-from typing import List, Optional
-from .kg_parser import Philosopher, KnowledgeGraphParser
+from typing import Dict, Iterable, List, Optional, Tuple
+from .influence_index import InfluenceIndex
+from .kg_parser import KnowledgeGraphParser, Philosopher
+from .name_index import AmbiguousNameError
+from .registry import get_parser
 
 # Here we transform the context of a philosopher
 # We can modify the year, region, event, or core beliefs
 # We also calculate the ideology preservation score - the score is the number of core beliefs that are preserved
+#
+# A transformed philosopher is a copy-on-write view of the original: only the changed fields
+# (birth year, contexts, influences) are new, everything else is shared. Birth years come from a
+# lookup built once per ontology, and each influence is only resolved once per transformer, so
+# sweeping one philosopher across many years and regions stays cheap.
 
 @dataclass
 class ContextModification:
@@ -14,46 +22,99 @@ class ContextModification:
     core_beliefs: List[str] = None
 
 class ContextTransformer:
-    def __init__(self, philosopher: Philosopher):
+    def __init__(self, philosopher: Philosopher, influence_index: Optional[InfluenceIndex] = None,
+                 parser: Optional[KnowledgeGraphParser] = None):
+        """
+        Args:
+            philosopher: The philosopher to transform
+            influence_index: Optional lineage index, see _adjust_influences
+            parser: The parser to look up influences in; defaults to the shared parser,
+                which is only fetched if a lookup actually needs it
+        """
         self.original = philosopher
         self.modified = None
         self.core_beliefs = []
-        self.kg_parser = KnowledgeGraphParser("data/philosophers.ttl")
+        self._kg_parser = parser
+        # With a lineage index, influences born after the new year are replaced by their
+        # own earlier influences instead of being dropped outright
+        self.influence_index = influence_index
+        # Birth year of every influence looked up so far
+        self._birth_years: Dict[str, Optional[int]] = {}
+
+    @property
+    def kg_parser(self) -> KnowledgeGraphParser:
+        if self._kg_parser is None:
+            self._kg_parser = get_parser()
+        return self._kg_parser
 
     def transform(self, modification: ContextModification) -> Philosopher:
         self.core_beliefs = modification.core_beliefs or []
-        
-        self.modified = Philosopher(
-            name=self.original.name,
-            birth_year=modification.year or self.original.birth_year,
-            beliefs=self.original.beliefs.copy(),
-            key_concepts=self.original.key_concepts.copy(),
-            contexts=self.original.contexts.copy(),
-            ideological_cluster=self.original.ideological_cluster,
-            influenced_by=self.original.influenced_by.copy(),
-            influenced=self.original.influenced.copy()
-        )
+        self.modified = self._apply(modification, {})
+        return self.modified
+
+    def transform_many(self, modifications: Iterable[ContextModification]) -> List[Philosopher]:
+        """
+        Apply many modifications to the original philosopher in one pass, e.g. a grid of
+        simulated years and regions.
+
+        Influences are adjusted once per distinct year and shared by every result for that
+        year; results without an event may be the very same object. Unlike transform(), this
+        does not change `modified` or `core_beliefs`.
+        """
+        by_year: Dict[Optional[int], Philosopher] = {}
+        return [self._apply(modification, by_year) for modification in modifications]
 
+    def _apply(self, modification: ContextModification, by_year: Dict[Optional[int], Philosopher]) -> Philosopher:
+        # Everything but the contexts only depends on the year, so that part is shared by
+        # every modification for the same year
+        base = by_year.get(modification.year)
+        if base is None:
+            changes = {"birth_year": modification.year or self.original.birth_year, "region": None}
+            if modification.year:
+                changes["influenced_by"] = self._adjust_influences(modification.year)
+            # Philosophers are immutable, so unchanged fields are shared with the original
+            base = by_year[modification.year] = self.original.replace(**changes)
         if modification.event:
-            self.modified.contexts.append(f"{modification.event}{modification.region or ''}")
+            return base.replace(contexts=base.contexts + (f"{modification.event}{modification.region or ''}",))
+        return base
 
-        if modification.year:
-            self._adjust_influences(modification.year)
+    def _adjust_influences(self, new_year: int) -> Tuple[str, ...]:
+        """Return the original influences that could still have influenced someone born in new_year."""
+        def born_before(name: str) -> bool:
+            year = self._get_philosopher_birth_year(name)
+            return year is not None and year < new_year
 
-        return self.modified
+        if self.influence_index is None:
+            return tuple(influence for influence in self.original.influenced_by if born_before(influence))
 
-    def _adjust_influences(self, new_year: int) -> None:
-        self.modified.influenced_by = [
-            influence for influence in self.modified.influenced_by
-            if self._get_philosopher_birth_year(influence) is not None 
-            and self._get_philosopher_birth_year(influence) < new_year
-        ]
+        adjusted = []
+        for influence in self.original.influenced_by:
+            if born_before(influence):
+                adjusted.append(influence)
+            else:
+                # Keep the lineage through the anachronistic influence's own predecessors
+                adjusted.extend(a for a in self.influence_index.ancestors(influence) if born_before(a))
+        return tuple(dict.fromkeys(adjusted))
 
     def _get_philosopher_birth_year(self, name: str) -> Optional[int]:
+        try:
+            return self._birth_years[name]
+        except KeyError:
+            year = self._birth_years[name] = self._lookup_birth_year(name)
+            return year
+
+    def _lookup_birth_year(self, name: str) -> Optional[int]:
+        if self.influence_index is not None and name in self.influence_index:
+            return self.influence_index.birth_year(name)
+        birth_years = self.kg_parser.get_birth_years()
+        if name in birth_years:
+            return birth_years[name]
         # Extract the philosopher name from the URI
         if name.startswith("http://example.org/philosophy/"):
             name = name.split("/")[-1]
-        philosopher = self.kg_parser.get_philosopher(name)
+        try:
+            philosopher = self.kg_parser.get_philosopher(name)
+        except AmbiguousNameError:
+            # An influence we cannot pin down is treated like one with an unknown birth year
+            return None
         return philosopher.birth_year if philosopher else None
-
- 
\ No newline at end of file
@@ -0,0 +1,295 @@
+import logging
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from .influence_index import InfluenceIndex
+from .kg_parser import Philosopher
+from .log import log_event
+from .prompt_builder import PromptBuilder
+from .token_budget import DEFAULT_MODEL, load_token_counter
+
+# Here we run debates between two or more philosophers over several rounds
+# In every round each philosopher speaks once, in order, responding to the debate so far.
+#
+# Feeding every speaker the full transcript makes each prompt longer than the last. Once the
+# transcript exceeds a token budget, a speaker is given a compacted history instead: as many of the
+# most recent turns verbatim as fit in the budget, preceded by a summary of the older turns. The
+# summary keeps the gist (first sentence) of every older turn, and the oldest gists are dropped once
+# the summary no longer fits next to the recent turns, so prompt size stays bounded however long the
+# debate runs.
+#
+# Every turn records its latency and token counts. The generator records each turn in the transcript
+# store as soon as it is finished, under the debate's id, so a long debate survives an interruption.
+#
+# A turn the model fails to produce is never recorded: the inference error is raised to the caller
+# instead of an error message becoming the speaker's argument. The debate stops at that turn, and
+# running it again resumes from there.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_TOKENS = 1024
+# Share of the history budget the summary of older turns may use
+SUMMARY_SHARE = 0.25
+# Longest gist kept per summarized turn, in tokens
+MAX_GIST_TOKENS = 48
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class DebateTurn:
+    round: int
+    speaker: str
+    text: str
+    prompt_tokens: int
+    response_tokens: int
+    history_tokens: int  # Tokens of the history the speaker was given
+    compacted: bool  # Whether older turns were summarized for this prompt
+    latency_ms: float
+
+
+@dataclass
+class RoundMetrics:
+    round: int
+    latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    max_prompt_tokens: int = 0
+    response_tokens: int = 0
+    compacted_turns: int = 0
+
+
+@dataclass
+class _HistoryEntry:
+    turn: DebateTurn
+    tokens: int  # Tokens of the verbatim entry
+    gist: str  # First sentence of the turn, for summaries
+
+
+class Debate:
+    def __init__(self, generator, philosophers: Sequence[Philosopher], topic: str, rounds: int = 2,
+                 history_tokens: int = DEFAULT_HISTORY_TOKENS, count_tokens: Optional[Callable[[str], int]] = None,
+                 influence_index: Optional[InfluenceIndex] = None):
+        """
+        Args:
+            generator: The LLMGenerator used for every turn
+            philosophers: Two or more philosophers, in speaking order
+            topic: The topic or question for debate
+            rounds: Number of rounds; every philosopher speaks once per round
+            history_tokens: Token budget for the history given to each speaker
+            count_tokens: Function counting the tokens of a text; defaults to the generator's model tokenizer
+            influence_index: Optional lineage index passed to the prompt builders
+        """
+        if len(philosophers) < 2:
+            raise ValueError("A debate needs at least two philosophers")
+        if rounds < 1:
+            raise ValueError("A debate needs at least one round")
+        self.generator = generator
+        self.philosophers = list(philosophers)
+        self.builders = [PromptBuilder(p, influence_index=influence_index) for p in self.philosophers]
+        self.topic = topic
+        self.rounds = rounds
+        self.history_tokens = history_tokens
+        self.count_tokens = count_tokens or load_token_counter(getattr(generator, "model_name", DEFAULT_MODEL))
+        self.debate_id = uuid.uuid4().hex
+        self.turns: List[DebateTurn] = []
+        self.metrics: List[RoundMetrics] = []
+        self._history: List[_HistoryEntry] = []
+
+    # History compaction
+
+    @staticmethod
+    def _format_turn(turn: DebateTurn) -> str:
+        return f"{turn.speaker}:\n{turn.text}"
+
+    def _gist(self, text: str) -> str:
+        """The first sentence of a turn, shortened to MAX_GIST_TOKENS tokens at most."""
+        sentence = _SENTENCE_END.split(text.strip(), 1)[0]
+        if self.count_tokens(sentence) <= MAX_GIST_TOKENS:
+            return sentence
+        words = sentence.split()[:MAX_GIST_TOKENS]
+        while words and self.count_tokens(" ".join(words) + "...") > MAX_GIST_TOKENS:
+            words = words[:len(words) * 3 // 4]
+        return " ".join(words) + "..."
+
+    def history(self) -> Tuple[str, int, bool]:
+        """
+        The history the next speaker is given, its token count and whether it was compacted.
+
+        Token counts of the parts are added up rather than recounted, which slightly
+        overestimates the joined text.
+        """
+        entries = self._history
+        total = sum(entry.tokens for entry in entries)
+        if total <= self.history_tokens:
+            return "\n\n".join(self._format_turn(entry.turn) for entry in entries), total, False
+
+        # The most recent turns verbatim, as many as fit next to the summary's share of the budget
+        recent_budget = self.history_tokens - int(self.history_tokens * SUMMARY_SHARE)
+        recent: List[_HistoryEntry] = []
+        used = 0
+        for entry in reversed(entries):
+            if recent and used + entry.tokens > recent_budget:
+                break
+            recent.append(entry)
+            used += entry.tokens
+        recent.reverse()
+        older = entries[:len(entries) - len(recent)]
+
+        # Gists of the older turns, newest first, until the summary's share is used up
+        summary_budget = self.history_tokens - used
+        lines: List[str] = []
+        summary_tokens = self.count_tokens("Summary of earlier turns:")
+        for entry in reversed(older):
+            line = f"- {entry.turn.speaker}: {entry.gist}"
+            tokens = self.count_tokens(line)
+            if summary_tokens + tokens > summary_budget:
+                break
+            lines.append(line)
+            summary_tokens += tokens
+        lines.reverse()
+        omitted = len(older) - len(lines)
+        if omitted:
+            # The note about omitted turns counts against the budget too, at the expense of the oldest gists
+            note = f"- ({omitted} earlier turns omitted)"
+            while lines and summary_tokens + self.count_tokens(note) > summary_budget:
+                summary_tokens -= self.count_tokens(lines.pop(0))
+                omitted += 1
+                note = f"- ({omitted} earlier turns omitted)"
+            lines.insert(0, note)
+            summary_tokens += self.count_tokens(note)
+
+        parts = ["Summary of earlier turns:\n" + "\n".join(lines)]
+        parts.extend(self._format_turn(entry.turn) for entry in recent)
+        return "\n\n".join(parts), summary_tokens + used, True
+
+    def _prompt(self, speaker: int) -> Tuple[str, int, bool]:
+        builder = self.builders[speaker]
+        if not self._history:
+            return builder.build_debate_prompt(self.topic, None), 0, False
+        if len(self._history) == 1:
+            # A single earlier turn gets the classic two-philosopher response prompt
+            entry = self._history[0]
+            return builder.build_debate_prompt(self.topic, entry.turn.text), entry.tokens, False
+        history, tokens, compacted = self.history()
+        return builder.build_debate_history_prompt(self.topic, history), tokens, compacted
+
+    # Running
+
+    def _record(self, round_number: int, speaker: int, text: str, prompt_tokens: int, history_tokens: int,
+                compacted: bool, started: float) -> DebateTurn:
+        turn = DebateTurn(
+            round=round_number,
+            speaker=self.philosophers[speaker].name,
+            text=text,
+            prompt_tokens=prompt_tokens,
+            response_tokens=self.count_tokens(text),
+            history_tokens=history_tokens,
+            compacted=compacted,
+            latency_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        self.turns.append(turn)
+        formatted = self._format_turn(turn)
+        self._history.append(_HistoryEntry(turn, self.count_tokens(formatted), self._gist(text)))
+
+        metrics = self.metrics[-1] if self.metrics and self.metrics[-1].round == round_number else None
+        if metrics is None:
+            metrics = RoundMetrics(round=round_number)
+            self.metrics.append(metrics)
+        metrics.latency_ms = round(metrics.latency_ms + turn.latency_ms, 2)
+        metrics.prompt_tokens += turn.prompt_tokens
+        metrics.max_prompt_tokens = max(metrics.max_prompt_tokens, turn.prompt_tokens)
+        metrics.response_tokens += turn.response_tokens
+        metrics.compacted_turns += int(turn.compacted)
+
+        log_event(
+            logger, "debate_turn", level=logging.DEBUG,
+            debate=self.debate_id, round=turn.round, speaker=turn.speaker,
+            prompt_tokens=turn.prompt_tokens, response_tokens=turn.response_tokens,
+            compacted=turn.compacted, latency_ms=turn.latency_ms,
+        )
+        return turn
+
+    def _metadata(self, round_number: int, history_tokens: int, compacted: bool) -> Dict:
+        """Recorded with the turn's response in the transcript store; the debate id is its session."""
+        return {"topic": self.topic, "round": round_number, "history_tokens": history_tokens, "compacted": compacted}
+
+    def _schedule(self) -> Iterator[Tuple[int, int]]:
+        """(round, speaker) of every turn still to be taken."""
+        taken = len(self.turns)
+        for i in range(taken, self.rounds * len(self.philosophers)):
+            yield i // len(self.philosophers) + 1, i % len(self.philosophers)
+
+    def run_turns(self) -> Iterator[DebateTurn]:
+        """
+        Take the remaining turns one by one, yielding each as soon as it is finished.
+
+        Raises:
+            requests.RequestException: If a turn could not be generated; the turn is not recorded
+        """
+        for round_number, speaker in self._schedule():
+            started = time.perf_counter()
+            prompt, history_tokens, compacted = self._prompt(speaker)
+            text = self.generator.generate_response(prompt, self.philosophers[speaker].name, raise_errors=True,
+                                                    session=self.debate_id,
+                                                    metadata=self._metadata(round_number, history_tokens, compacted))
+            yield self._record(round_number, speaker, text, self.count_tokens(prompt),
+                               history_tokens, compacted, started)
+        self._log_finished()
+
+    def stream_turns(self) -> Iterator[Tuple[int, Philosopher, Iterator[str]]]:
+        """
+        Take the remaining turns one by one, yielding (round, speaker, chunks) for each.
+
+        The turn is recorded once its chunks have been consumed; a turn whose chunks are not
+        consumed is finished before the next one starts. If a turn fails, iterating its chunks
+        raises the inference error, the turn is not recorded and the debate stops there.
+        """
+        for round_number, speaker in self._schedule():
+            started = time.perf_counter()
+            prompt, history_tokens, compacted = self._prompt(speaker)
+            philosopher = self.philosophers[speaker]
+            parts: List[str] = []
+            finished: List[bool] = []
+
+            metadata = self._metadata(round_number, history_tokens, compacted)
+
+            def chunks(prompt=prompt, philosopher=philosopher, parts=parts, finished=finished,
+                       metadata=metadata) -> Iterator[str]:
+                for chunk in self.generator.stream_response(prompt, philosopher.name, raise_errors=True,
+                                                            session=self.debate_id, metadata=metadata):
+                    parts.append(chunk)
+                    yield chunk
+                finished.append(True)
+
+            stream = chunks()
+            yield round_number, philosopher, stream
+            for _ in stream:
+                pass
+            if not finished:
+                # The error was raised to whoever consumed the chunks; a partial turn is not an argument
+                log_event(logger, "debate_aborted", level=logging.WARNING, debate=self.debate_id,
+                          round=round_number, speaker=philosopher.name)
+                return
+            self._record(round_number, speaker, "".join(parts), self.count_tokens(prompt),
+                         history_tokens, compacted, started)
+        self._log_finished()
+
+    def run(self) -> List[DebateTurn]:
+        """Run the remaining rounds and return the whole transcript."""
+        for _ in self.run_turns():
+            pass
+        return self.turns
+
+    def _log_finished(self) -> None:
+        log_event(
+            logger, "debate_finished",
+            debate=self.debate_id,
+            philosophers=len(self.philosophers),
+            rounds=self.rounds,
+            turns=len(self.turns),
+            prompt_tokens=sum(m.prompt_tokens for m in self.metrics),
+            max_prompt_tokens=max((m.max_prompt_tokens for m in self.metrics), default=0),
+            duration_ms=round(sum(m.latency_ms for m in self.metrics), 2),
+        )
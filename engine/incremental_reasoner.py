@@ -0,0 +1,322 @@
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+from rdflib.term import Node
+
+# Here we keep the entailments of the ontology up to date incrementally
+# Rather than running the full OWL RL fixpoint, we only apply the rules the app relies on:
+# - "transitive": transitivity of owl:TransitiveProperty properties such as ex:influencedBy
+# - "subclass": rdfs:subClassOf transitivity and rdf:type propagation along it
+# - "equivalent_class": owl:equivalentClass as mutual rdfs:subClassOf
+# - "domain_range": rdf:type from rdfs:domain and rdfs:range
+#
+# Additions are handled semi-naively: each new triple is only joined against the current
+# facts once, so the work is proportional to what actually changed. Transitive properties get
+# a shortcut: their relation is kept closed, so adding an edge s -> o only needs the cross
+# product of s's predecessors and o's successors. Retractions use delete-rederive (DRed):
+# everything that might depend on a removed triple is removed, then whatever still has another
+# derivation is put back.
+
+Triple = Tuple[Node, Node, Node]
+
+TRANSITIVE = "transitive"
+SUBCLASS = "subclass"
+EQUIVALENT_CLASS = "equivalent_class"
+DOMAIN_RANGE = "domain_range"
+ALL_RULES = frozenset({TRANSITIVE, SUBCLASS, EQUIVALENT_CLASS, DOMAIN_RANGE})
+
+
+class IncrementalReasoner:
+    def __init__(self, graph: Graph, rules: Iterable[str] = ALL_RULES,
+                 transitive_properties: Optional[Iterable[URIRef]] = None,
+                 inferred_graph: Optional[Graph] = None):
+        """
+        Initialize an incremental reasoner over a graph.
+
+        By default inferred triples are written into the same graph, and the set of triples
+        the reasoner added is tracked so they can be told apart from asserted ones. If an
+        inferred_graph is given, inferred triples are written there instead; `graph` must
+        then be a view that spans both, such as a Dataset with default_union=True whose
+        default graph holds the asserted triples.
+
+        Args:
+            graph: The graph holding the asserted triples
+            rules: The subset of rule names to apply, see ALL_RULES
+            transitive_properties: Properties to treat as transitive. If None, every
+                property declared as owl:TransitiveProperty in the graph is used.
+            inferred_graph: Separate graph to hold the inferred triples
+        """
+        unknown = set(rules) - ALL_RULES
+        if unknown:
+            raise ValueError(f"Unknown reasoning rules: {', '.join(sorted(unknown))}")
+        self.graph = graph
+        self.rules = frozenset(rules)
+        self.fixed_transitive = frozenset(transitive_properties) if transitive_properties is not None else None
+        self.inferred_graph = inferred_graph
+        self.inferred: Union[Set[Triple], Graph] = inferred_graph if inferred_graph is not None else set()
+
+    # Rule application
+
+    def _is_transitive(self, p: Node) -> bool:
+        if self.fixed_transitive is not None:
+            return p in self.fixed_transitive
+        return (p, RDF.type, OWL.TransitiveProperty) in self.graph
+
+    def _consequences(self, t: Triple, transitive: bool = True) -> Iterator[Triple]:
+        """
+        Yield every triple one rule application away that uses t as one of its premises.
+
+        With transitive=False the transitivity rule is skipped, for callers that keep
+        transitive relations closed themselves.
+        """
+        s, p, o = t
+        g = self.graph
+
+        if TRANSITIVE in self.rules and transitive:
+            if self._is_transitive(p):
+                for z in g.objects(o, p):
+                    yield (s, p, z)
+                for x in g.subjects(p, s):
+                    yield (x, p, o)
+            if self.fixed_transitive is None and p == RDF.type and o == OWL.TransitiveProperty:
+                # A newly declared transitive property: close over its existing triples
+                for x, y in g.subject_objects(s):
+                    for z in g.objects(y, s):
+                        yield (x, s, z)
+
+        if SUBCLASS in self.rules:
+            if p == RDFS.subClassOf:
+                for c in g.objects(o, RDFS.subClassOf):
+                    yield (s, RDFS.subClassOf, c)
+                for a in g.subjects(RDFS.subClassOf, s):
+                    yield (a, RDFS.subClassOf, o)
+                for x in g.subjects(RDF.type, s):
+                    yield (x, RDF.type, o)
+            elif p == RDF.type:
+                for b in g.objects(o, RDFS.subClassOf):
+                    yield (s, RDF.type, b)
+
+        if EQUIVALENT_CLASS in self.rules and p == OWL.equivalentClass:
+            yield (o, OWL.equivalentClass, s)
+            yield (s, RDFS.subClassOf, o)
+            yield (o, RDFS.subClassOf, s)
+
+        if DOMAIN_RANGE in self.rules:
+            if p == RDFS.domain:
+                for x in g.subjects(s, None):
+                    yield (x, RDF.type, o)
+            elif p == RDFS.range:
+                for y in g.objects(None, s):
+                    yield (y, RDF.type, o)
+            for c in g.objects(p, RDFS.domain):
+                yield (s, RDF.type, c)
+            for c in g.objects(p, RDFS.range):
+                yield (o, RDF.type, c)
+
+    def _derivable(self, t: Triple) -> bool:
+        """Check whether t follows in one rule application from the current facts."""
+        s, p, o = t
+        g = self.graph
+
+        if TRANSITIVE in self.rules and self._is_transitive(p):
+            if any((y, p, o) in g for y in g.objects(s, p) if y != o):
+                return True
+        if SUBCLASS in self.rules:
+            if p == RDFS.subClassOf:
+                if any((b, RDFS.subClassOf, o) in g for b in g.objects(s, RDFS.subClassOf) if b != o):
+                    return True
+            elif p == RDF.type:
+                if any((a, RDFS.subClassOf, o) in g for a in g.objects(s, RDF.type) if a != o):
+                    return True
+        if EQUIVALENT_CLASS in self.rules:
+            if p == OWL.equivalentClass and (o, OWL.equivalentClass, s) in g:
+                return True
+            if p == RDFS.subClassOf and ((s, OWL.equivalentClass, o) in g or (o, OWL.equivalentClass, s) in g):
+                return True
+        if DOMAIN_RANGE in self.rules and p == RDF.type:
+            if any(next(iter(g.objects(s, q)), None) is not None for q in g.subjects(RDFS.domain, o)):
+                return True
+            if any(next(iter(g.subjects(q, s)), None) is not None for q in g.subjects(RDFS.range, o)):
+                return True
+        return False
+
+    @staticmethod
+    def _valid(t: Triple) -> bool:
+        # Literals can only appear as objects
+        return not isinstance(t[0], Literal) and not isinstance(t[1], Literal)
+
+    # Provenance bookkeeping
+
+    def _store_inferred(self, t: Triple) -> None:
+        if self.inferred_graph is None:
+            self.graph.add(t)
+        self.inferred.add(t)
+
+    def _drop_inferred(self, t: Triple) -> None:
+        if self.inferred_graph is None:
+            self.graph.remove(t)
+            self.inferred.discard(t)
+        else:
+            self.inferred_graph.remove(t)
+
+    def _promote_inferred(self, t: Triple) -> None:
+        """Record that an inferred triple is now asserted as well."""
+        if self.inferred_graph is None:
+            self.inferred.discard(t)
+        else:
+            self.inferred_graph.remove(t)
+            self.graph.add(t)
+
+    def _add_inferred(self, t: Triple, queue: Deque[Triple], added: Set[Triple]) -> None:
+        self._store_inferred(t)
+        added.add(t)
+        queue.append(t)
+
+    def _insert_transitive(self, t: Triple, queue: Deque[Triple], added: Set[Triple],
+                           asserted: bool = False) -> None:
+        """
+        Insert an edge of a transitive property together with its entailments.
+
+        The relation is closed before the edge is inserted, so the new closure is the old
+        one plus every (s or a predecessor of s) -> (o or a successor of o) pair. Keeping every
+        insertion closed means edges never have to be joined transitively again later.
+        """
+        s, p, o = t
+        sources = [s] + [x for x in self.graph.subjects(p, s) if x != s]
+        targets = [o] + [z for z in self.graph.objects(o, p) if z != o]
+        for x in sources:
+            for z in targets:
+                c = (x, p, z)
+                if c in self.graph or not self._valid(c):
+                    continue
+                if asserted and c == t:
+                    self.graph.add(c)
+                    queue.append(c)
+                else:
+                    self._add_inferred(c, queue, added)
+
+    def _close_property(self, p: Node, queue: Deque[Triple], added: Set[Triple]) -> None:
+        """Close a transitive property from scratch, e.g. when it has just been declared."""
+        successors: Dict[Node, Set[Node]] = {}
+        for s, o in self.graph.subject_objects(p):
+            successors.setdefault(s, set()).add(o)
+        missing: List[Triple] = []
+        for s, direct in successors.items():
+            reachable: Set[Node] = set()
+            stack = list(direct)
+            while stack:
+                y = stack.pop()
+                if y not in reachable:
+                    reachable.add(y)
+                    stack.extend(successors.get(y, ()))
+            missing.extend((s, p, z) for z in reachable - direct)
+        for c in missing:
+            if self._valid(c):
+                self._add_inferred(c, queue, added)
+
+    def _saturate(self, queue: Deque[Triple], added: Set[Triple]) -> None:
+        """
+        Semi-naive forward chaining from a queue of triples that are new to the graph.
+
+        Transitive relations are kept closed on insertion, so queued triples are only
+        joined by the other rules.
+        """
+        while queue:
+            t = queue.popleft()
+            s, p, o = t
+            if (TRANSITIVE in self.rules and self.fixed_transitive is None
+                    and p == RDF.type and o == OWL.TransitiveProperty):
+                self._close_property(s, queue, added)
+            for c in self._consequences(t, transitive=False):
+                if c in self.graph or not self._valid(c):
+                    continue
+                if TRANSITIVE in self.rules and self._is_transitive(c[1]):
+                    self._insert_transitive(c, queue, added)
+                else:
+                    self._add_inferred(c, queue, added)
+
+    # Public API
+
+    def run(self) -> Set[Triple]:
+        """Compute all entailments of the triples currently in the graph."""
+        queue: Deque[Triple] = deque()
+        added: Set[Triple] = set()
+        if TRANSITIVE in self.rules:
+            # Asserted relations are not closed yet, so close them before anything else
+            if self.fixed_transitive is not None:
+                properties = set(self.fixed_transitive)
+            else:
+                properties = set(self.graph.subjects(RDF.type, OWL.TransitiveProperty))
+            for p in properties:
+                self._close_property(p, queue, added)
+        queue.extend(t for t in self.graph.triples((None, None, None)) if t not in added)
+        self._saturate(queue, added)
+        return added
+
+    def add(self, triples: Iterable[Triple]) -> Set[Triple]:
+        """
+        Assert triples and derive only the entailments they make possible.
+
+        Returns the set of newly inferred triples.
+        """
+        queue: Deque[Triple] = deque()
+        added: Set[Triple] = set()
+        for t in triples:
+            if t in self.inferred:
+                # Already entailed; it is now asserted as well
+                self._promote_inferred(t)
+            elif t not in self.graph:
+                if TRANSITIVE in self.rules and self._is_transitive(t[1]):
+                    self._insert_transitive(t, queue, added, asserted=True)
+                else:
+                    self.graph.add(t)
+                    queue.append(t)
+        self._saturate(queue, added)
+        return added
+
+    def retract(self, triples: Iterable[Triple]) -> Set[Triple]:
+        """
+        Retract asserted triples and withdraw the entailments that no longer hold.
+
+        Returns the set of triples that were removed from the graph, including retracted
+        triples that are no longer entailed.
+        """
+        retracted = [t for t in triples if t in self.graph and t not in self.inferred]
+
+        # Overdelete: everything reachable from the retracted triples through a rule
+        overdeleted: Set[Triple] = set()
+        queue: Deque[Triple] = deque(retracted)
+        while queue:
+            t = queue.popleft()
+            for c in self._consequences(t):
+                if c in self.inferred and c not in overdeleted:
+                    overdeleted.add(c)
+                    queue.append(c)
+
+        for t in retracted:
+            self.graph.remove(t)
+        for t in overdeleted:
+            self._drop_inferred(t)
+
+        # Rederive: put back whatever still follows from the remaining facts, then
+        # propagate from those triples as if they had just been added
+        candidates = list(overdeleted) + retracted
+        restored: Set[Triple] = set()
+        queue = deque()
+        changed = True
+        while changed:
+            changed = False
+            for t in candidates:
+                if t not in self.graph and self._derivable(t):
+                    self._store_inferred(t)
+                    restored.add(t)
+                    queue.append(t)
+                    changed = True
+            self._saturate(queue, restored)
+
+        return (overdeleted | set(retracted)) - restored
+
+    def is_inferred(self, t: Triple) -> bool:
+        """Check whether a triple is in the graph only because the reasoner derived it."""
+        return t in self.inferred
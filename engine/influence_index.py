@@ -0,0 +1,192 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Here we index the influence relation between philosophers
+# ex:influencedBy is transitive, but the full OWL RL expansion followed by one SPARQL query
+# per philosopher is far too slow to answer lineage questions while building prompts.
+#
+# Every philosopher gets an integer id, direct influences are kept as adjacency tuples, and
+# the transitive closure is precomputed once as reachability bitsets (Python ints, bit i set
+# for philosopher i). Ancestor/descendant sets and "is X an influence on Y" are then a few
+# integer operations, and shortest paths only expand nodes that can still reach the target.
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Yield the positions of the set bits of mask in increasing order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class InfluenceIndex:
+    def __init__(self, edges: Iterable[Tuple[str, str]], labels: Optional[Dict[str, str]] = None,
+                 birth_years: Optional[Dict[str, Optional[int]]] = None):
+        """
+        Build the index from direct influence edges.
+
+        Args:
+            edges: (influenced, influencer) pairs, i.e. the subject and object of ex:influencedBy
+            labels: Optional human-readable label per node, also accepted as a lookup key
+            birth_years: Optional birth year per node
+        """
+        self.nodes: List[str] = []
+        self.ids: Dict[str, int] = {}
+        parents: List[List[int]] = []
+        children: List[List[int]] = []
+
+        def node_id(node: str) -> int:
+            i = self.ids.get(node)
+            if i is None:
+                i = self.ids[node] = len(self.nodes)
+                self.nodes.append(node)
+                parents.append([])
+                children.append([])
+            return i
+
+        for influenced, influencer in edges:
+            child, parent = node_id(influenced), node_id(influencer)
+            if parent not in parents[child]:
+                parents[child].append(parent)
+                children[parent].append(child)
+        for node in labels or ():
+            node_id(node)
+
+        self.parents: List[Tuple[int, ...]] = [tuple(p) for p in parents]
+        self.children: List[Tuple[int, ...]] = [tuple(c) for c in children]
+        self.labels: List[Optional[str]] = [(labels or {}).get(node) for node in self.nodes]
+        self.birth_years: List[Optional[int]] = [(birth_years or {}).get(node) for node in self.nodes]
+        self._label_ids: Dict[str, int] = {label: i for i, label in enumerate(self.labels) if label}
+        self.ancestor_bits = self._closure(self.parents)
+        self.descendant_bits = self._closure(self.children)
+
+    @staticmethod
+    def _closure(adjacency: List[Tuple[int, ...]]) -> List[int]:
+        """Reachability bitsets following `adjacency` one or more steps from every node."""
+        n = len(adjacency)
+        reach = [0] * n
+        # Kahn's algorithm over the reversed edges gives an order where every node comes
+        # after all nodes it points to, so each bitset is final when it is read
+        pending = [len(targets) for targets in adjacency]
+        reverse: List[List[int]] = [[] for _ in range(n)]
+        for i, targets in enumerate(adjacency):
+            for j in targets:
+                reverse[j].append(i)
+        ready = deque(i for i in range(n) if not pending[i])
+        done = 0
+        while ready:
+            i = ready.popleft()
+            done += 1
+            for j in adjacency[i]:
+                reach[i] |= reach[j] | (1 << j)
+            for k in reverse[i]:
+                pending[k] -= 1
+                if not pending[k]:
+                    ready.append(k)
+        if done < n:
+            # Influence cycles are unusual but possible; iterate the rest to a fixpoint
+            changed = True
+            while changed:
+                changed = False
+                for i in range(n):
+                    if pending[i]:
+                        mask = reach[i]
+                        for j in adjacency[i]:
+                            mask |= reach[j] | (1 << j)
+                        if mask != reach[i]:
+                            reach[i] = mask
+                            changed = True
+        return reach
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, key: str) -> bool:
+        return self.id_of(key) is not None
+
+    def id_of(self, key: str) -> Optional[int]:
+        """Return the integer id of a philosopher given by URI or label."""
+        i = self.ids.get(key)
+        return i if i is not None else self._label_ids.get(key)
+
+    def _nodes(self, mask: int) -> List[str]:
+        return [self.nodes[i] for i in _bits(mask)]
+
+    def ancestors(self, key: str) -> List[str]:
+        """All direct and indirect influences of a philosopher."""
+        i = self.id_of(key)
+        return self._nodes(self.ancestor_bits[i]) if i is not None else []
+
+    def descendants(self, key: str) -> List[str]:
+        """All philosophers directly or indirectly influenced by a philosopher."""
+        i = self.id_of(key)
+        return self._nodes(self.descendant_bits[i]) if i is not None else []
+
+    def is_influence(self, influencer: str, influenced: str) -> bool:
+        """Check whether `influencer` is a direct or indirect influence on `influenced`."""
+        i, j = self.id_of(influencer), self.id_of(influenced)
+        if i is None or j is None:
+            return False
+        return bool(self.ancestor_bits[j] >> i & 1)
+
+    def shortest_path(self, influencer: str, influenced: str) -> Optional[List[str]]:
+        """
+        Return the shortest chain of influence from `influencer` down to `influenced`.
+
+        The path starts with the influencer and ends with the influenced philosopher, or
+        is None if there is no such chain.
+        """
+        i, j = self.id_of(influencer), self.id_of(influenced)
+        if i is None or j is None:
+            return None
+        if i == j:
+            return [self.nodes[i]]
+        if not self.ancestor_bits[j] >> i & 1:
+            return None
+        # Breadth-first search that only expands nodes from which the target is reachable
+        target_ancestors = self.ancestor_bits[j]
+        previous = {i: i}
+        queue = deque([i])
+        while queue:
+            k = queue.popleft()
+            for c in self.children[k]:
+                if c in previous or not (c == j or target_ancestors >> c & 1):
+                    continue
+                previous[c] = k
+                if c == j:
+                    path = [j]
+                    while path[-1] != i:
+                        path.append(previous[path[-1]])
+                    return [self.nodes[n] for n in reversed(path)]
+                queue.append(c)
+        return None
+
+    def lineage(self, keys: Iterable[str], descendants: bool = False) -> List[str]:
+        """
+        Expand a list of philosophers with everyone who influenced them, or with everyone
+        they influenced if descendants is True.
+
+        The given keys come first in their original order, followed by the rest in id order.
+        """
+        closure = self.descendant_bits if descendants else self.ancestor_bits
+        result = list(dict.fromkeys(keys))
+        seen = 0
+        for key in result:
+            i = self.id_of(key)
+            if i is not None:
+                seen |= 1 << i
+        mask = 0
+        for key in result:
+            i = self.id_of(key)
+            if i is not None:
+                mask |= closure[i]
+        result.extend(self._nodes(mask & ~seen))
+        return result
+
+    def label(self, key: str) -> Optional[str]:
+        i = self.id_of(key)
+        return self.labels[i] if i is not None else None
+
+    def birth_year(self, key: str) -> Optional[int]:
+        i = self.id_of(key)
+        return self.birth_years[i] if i is not None else None
@@ -1,7 +1,19 @@
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+import logging
+import sqlite3
+import sys
+import time
+from dataclasses import FrozenInstanceError, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
 from rdflib import Graph, URIRef
+from rdflib.exceptions import Error as RDFLibError
 from rdflib.namespace import RDF, RDFS, XSD
+from .influence_index import InfluenceIndex
+from .log import log_event
+from .name_index import NameIndex, uri_fragment
+from .similarity import PhilosopherSimilarity
+from .snapshot import load_graph
+from .store import DEFAULT_GRAPH, open_store, store_matches_source
+from .vocabulary import DEFAULT_VOCABULARY, Vocabulary
 
 # Here we parse the knowledge graph and return a list of philosophers
 
@@ -12,18 +24,154 @@ from rdflib.namespace import RDF, RDFS, XSD
 # - Contexts
 # - Ideological clusters
 
+logger = logging.getLogger(__name__)
+
+# Predicate and type URIs used when materializing philosophers, built once at import time
+EX_NAMESPACE = "http://example.org/philosophy/"
+PHILOSOPHER_TYPE = URIRef(EX_NAMESPACE + "philosopher")
+BELIEVES_IN = URIRef(EX_NAMESPACE + "believesIn")
+DEVELOPED_CONCEPT = URIRef(EX_NAMESPACE + "developedConcept")
+LIVED_DURING = URIRef(EX_NAMESPACE + "livedDuring")
+INFLUENCED_BY = URIRef(EX_NAMESPACE + "influencedBy")
+INFLUENCED = URIRef(EX_NAMESPACE + "influenced")
+BIRTH_YEAR = URIRef(EX_NAMESPACE + "birthYear")
+IDEOLOGICAL_CLUSTER = URIRef(EX_NAMESPACE + "ideologicalCluster")
+
+# Keywords found in historical context URIs, checked in order, and the region they imply
+REGION_KEYWORDS = [
+    (("greece",), "Greece"),
+    (("rome",), "Rome"),
+    (("england", "britain"), "England"),
+    (("france",), "France"),
+    (("germany",), "Germany"),
+    (("america", "united states"), "America"),
+]
+
 
-@dataclass
 class Philosopher:
-    name: str  # Human-readable label or URI fragment
-    birth_year: int | None  # Allow None if missing
-    beliefs: List[str]
-    key_concepts: List[str]
-    contexts: List[str]
-    ideological_cluster: str | None
-    influenced_by: List[str]
-    influenced: List[str]
-    region: str | None = None  # Add region field with default None
+    """
+    A compact, immutable philosopher record.
+
+    Beliefs and key concepts are stored as ids into a shared Vocabulary, so a URI shared by
+    many philosophers is only kept once; `beliefs` and `key_concepts` still read as URIs, and
+    `belief_labels` and `concept_labels` resolve labels lazily. The other URI fields are tuples
+    of interned strings. Use `replace()` to derive a modified copy.
+    """
+
+    __slots__ = ("name", "birth_year", "belief_ids", "concept_ids", "contexts", "ideological_cluster",
+                 "influenced_by", "influenced", "region", "vocabulary", "_hash")
+
+    def __init__(self, name: str, birth_year: int | None, beliefs: Iterable[str], key_concepts: Iterable[str],
+                 contexts: Iterable[str], ideological_cluster: str | None, influenced_by: Iterable[str],
+                 influenced: Iterable[str], region: str | None = None, vocabulary: Optional[Vocabulary] = None):
+        vocabulary = vocabulary if vocabulary is not None else DEFAULT_VOCABULARY
+        init = object.__setattr__
+        init(self, "name", name)  # Human-readable label or URI fragment
+        init(self, "birth_year", birth_year)  # None if missing
+        init(self, "belief_ids", vocabulary.intern_all(beliefs))
+        init(self, "concept_ids", vocabulary.intern_all(key_concepts))
+        init(self, "contexts", _interned(contexts))
+        init(self, "ideological_cluster", sys.intern(ideological_cluster) if ideological_cluster else ideological_cluster)
+        init(self, "influenced_by", _interned(influenced_by))
+        init(self, "influenced", _interned(influenced))
+        init(self, "region", region)
+        init(self, "vocabulary", vocabulary)
+
+    @property
+    def beliefs(self) -> Tuple[str, ...]:
+        return self.vocabulary.terms_of(self.belief_ids)
+
+    @property
+    def key_concepts(self) -> Tuple[str, ...]:
+        return self.vocabulary.terms_of(self.concept_ids)
+
+    @property
+    def belief_labels(self) -> Tuple[str, ...]:
+        return self.vocabulary.labels_of(self.belief_ids)
+
+    @property
+    def concept_labels(self) -> Tuple[str, ...]:
+        return self.vocabulary.labels_of(self.concept_ids)
+
+    def replace(self, **changes) -> "Philosopher":
+        """Return a copy with some fields changed; unchanged fields are shared, not copied."""
+        if "beliefs" in changes or "key_concepts" in changes:
+            vocabulary = changes.setdefault("vocabulary", self.vocabulary)
+            if "beliefs" in changes:
+                changes["belief_ids"] = vocabulary.intern_all(changes.pop("beliefs"))
+            if "key_concepts" in changes:
+                changes["concept_ids"] = vocabulary.intern_all(changes.pop("key_concepts"))
+        for field in ("contexts", "influenced_by", "influenced"):
+            if field in changes:
+                changes[field] = _interned(changes[field])
+        copy = object.__new__(Philosopher)
+        for field, set_field in _FIELD_SETTERS.items():
+            set_field(copy, changes.pop(field) if field in changes else getattr(self, field))
+        if changes:
+            raise TypeError(f"Philosopher has no field '{next(iter(changes))}'")
+        return copy
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
+
+    def _key(self) -> tuple:
+        return (self.name, self.birth_year, self.beliefs, self.key_concepts, self.contexts,
+                self.ideological_cluster, self.influenced_by, self.influenced, self.region)
+
+    def __eq__(self, other):
+        if not isinstance(other, Philosopher):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        # Philosophers are used as cache keys, so the hash is only computed once
+        try:
+            return self._hash
+        except AttributeError:
+            h = hash(self._key())
+            _HASH_SETTER(self, h)
+            return h
+
+    def __reduce__(self):
+        # Pickled by value: URIs and their labels rather than ids, so no Vocabulary travels with the
+        # record. The copy interns them into the default vocabulary of the process that loads it
+        return (_unpickle_philosopher, (self.name, self.birth_year, self.beliefs, self.key_concepts, self.contexts,
+                                        self.ideological_cluster, self.influenced_by, self.influenced, self.region,
+                                        self.belief_labels, self.concept_labels))
+
+    def __copy__(self):
+        # Immutable, so a copy can be the record itself, like a tuple's
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return (f"Philosopher(name={self.name!r}, birth_year={self.birth_year!r}, beliefs={self.beliefs!r}, "
+                f"key_concepts={self.key_concepts!r}, contexts={self.contexts!r}, "
+                f"ideological_cluster={self.ideological_cluster!r}, influenced_by={self.influenced_by!r}, "
+                f"influenced={self.influenced!r}, region={self.region!r})")
+
+
+# Slot descriptors write fields directly, bypassing the frozen __setattr__
+_FIELD_SETTERS = {field: getattr(Philosopher, field).__set__ for field in Philosopher.__slots__ if field != "_hash"}
+_HASH_SETTER = Philosopher._hash.__set__
+
+
+def _interned(values: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(map(sys.intern, map(str, values)))
+
+
+def _unpickle_philosopher(name, birth_year, beliefs, key_concepts, contexts, ideological_cluster, influenced_by,
+                          influenced, region, belief_labels, concept_labels) -> Philosopher:
+    # The default vocabulary cannot resolve labels from the graph, so keep the ones that were pickled
+    DEFAULT_VOCABULARY.intern_labeled(beliefs, belief_labels)
+    DEFAULT_VOCABULARY.intern_labeled(key_concepts, concept_labels)
+    return Philosopher(name, birth_year, beliefs, key_concepts, contexts, ideological_cluster, influenced_by,
+                       influenced, region)
 
 @dataclass
 class HistoricalContext:
@@ -31,28 +179,100 @@ class HistoricalContext:
     start_year: int
     end_year: int
 
+class ReadOnlyGraphError(RDFLibError):
+    """Raised when something tries to modify a shared, read-only graph."""
+
+    def __init__(self):
+        super().__init__("This graph is a shared read-only view and cannot be modified.")
+
+
+class ReadOnlyGraph(Graph):
+    """A graph view over an existing store that rejects all modifications.
+
+    The view shares the underlying store with the graph it was created from, so
+    creating one does not copy any triples.
+    """
+
+    @classmethod
+    def view_of(cls, graph: Graph) -> "ReadOnlyGraph":
+        return cls(store=graph.store, identifier=graph.identifier,
+                   namespace_manager=graph.namespace_manager)
+
+    def add(self, triple):
+        raise ReadOnlyGraphError()
+
+    def addN(self, quads):
+        raise ReadOnlyGraphError()
+
+    def remove(self, triple):
+        raise ReadOnlyGraphError()
+
+    def set(self, triple):
+        raise ReadOnlyGraphError()
+
+    def __iadd__(self, other):
+        raise ReadOnlyGraphError()
+
+    def __isub__(self, other):
+        raise ReadOnlyGraphError()
+
+
 # The KnowledgeGraphParser class is used to parse the knowledge graph and return a list of philosophers
 class KnowledgeGraphParser:
-    def __init__(self, ttl_path: str):
-        self.graph = Graph()
-        print(f"Loading TTL file from: {ttl_path}")
-        self.graph.parse(ttl_path, format="turtle")
+    def __init__(self, ttl_path: str, use_snapshot: bool = True, read_only: bool = False,
+                 store_path: Optional[str] = None):
+        logger.debug("Loading TTL file from: %s", ttl_path)
+        self.ttl_path = ttl_path
+        started = time.perf_counter()
+        self.graph: Graph = self._open_store(store_path) if store_path else None
+        if self.graph is None:
+            # Load the compiled snapshot if it matches the source, otherwise parse and compile it
+            self.graph = load_graph(ttl_path, use_snapshot=use_snapshot)
         # Bind both prefixes to our namespace
         self.graph.bind("ex", "http://example.org/philosophy/")
         self.graph.bind("", "http://example.org/philosophy/ontology#")
+        if read_only:
+            # Parsers handed out by the registry are shared, so they only get a read-only view
+            self.graph = ReadOnlyGraph.view_of(self.graph)
         self.namespace = "http://example.org/philosophy/"
-        print(f"Using namespace: {self.namespace}")
-        
-        # Debug: Print all namespaces in the graph
-        print("Namespaces in graph:")
-        for prefix, uri in self.graph.namespaces():
-            print(f"  {prefix}: {uri}")
-        
-        # Debug: Check if we can find any philosopher type declarations
-        philosopher_type = URIRef("http://example.org/philosophy/philosopher")
-        print(f"Looking for philosopher type: {philosopher_type}")
-        for s, p, o in self.graph.triples((None, RDF.type, philosopher_type)):
-            print(f"Found philosopher: {s}")
+        loaded = time.perf_counter()
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for prefix, uri in self.graph.namespaces():
+                logger.debug("Namespace %s: %s", prefix, uri)
+
+        # Built once here so name lookups never have to scan the graph
+        self.name_index = self._build_name_index()
+        indexed = time.perf_counter()
+        self._influence_index: Optional[InfluenceIndex] = None
+        self._similarity: Optional[PhilosopherSimilarity] = None
+        self._birth_years: Optional[Dict[str, Optional[int]]] = None
+        # Beliefs and concepts of every philosopher built by this parser are interned here
+        self.vocabulary = Vocabulary(resolve_label=self._resolve_label)
+
+        log_event(
+            logger, "ontology_loaded",
+            path=ttl_path,
+            triples=len(self.graph),
+            philosophers=len(self.name_index),
+            load_ms=round((loaded - started) * 1000, 2),
+            index_ms=round((indexed - loaded) * 1000, 2),
+        )
+
+    def _open_store(self, store_path: str) -> Optional[Graph]:
+        """Open the asserted graph of an on-disk store, or None if it is missing or stale."""
+        try:
+            store = open_store(store_path)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Could not open ontology store %s, loading %s instead: %s", store_path, self.ttl_path, e)
+            return None
+        if not store_matches_source(store, self.ttl_path):
+            logger.warning("Ontology store %s was built from a different version of %s, loading the TTL instead",
+                           store_path, self.ttl_path)
+            store.close()
+            return None
+        logger.debug("Opened ontology store %s", store_path)
+        return Graph(store=store, identifier=DEFAULT_GRAPH)
 
     def _get_label(self, uri: URIRef) -> str:
         label = self.graph.value(uri, RDFS.label)
@@ -66,12 +286,17 @@ class KnowledgeGraphParser:
             return uri_str.split("#")[-1]
         return uri_str
 
+    def _resolve_label(self, term: str) -> Optional[str]:
+        label = self.graph.value(URIRef(term), RDFS.label)
+        return str(label) if label else None
+
     def _get_literal_values(self, uri: URIRef, predicate: str) -> List[str]:
         # Ensure we're using the full URI for the predicate
         pred_uri = URIRef(self.namespace + predicate)
         return [str(o) for o in self.graph.objects(uri, pred_uri)]
 
-    def _parse_year(self, year_str: str) -> int | None:
+    @staticmethod
+    def _parse_year(year_str: str) -> int | None:
         if not year_str:
             return None
         parts = year_str.split()
@@ -84,7 +309,7 @@ class KnowledgeGraphParser:
             return None
 
     def _get_birth_year(self, uri: URIRef) -> int | None:
-        birth_year = self.graph.value(uri, URIRef(self.namespace + "birthYear"))
+        birth_year = self.graph.value(uri, BIRTH_YEAR)
         if not birth_year:
             return None
         return self._parse_year(str(birth_year))
@@ -96,51 +321,30 @@ class KnowledgeGraphParser:
             return None, None
         return self._parse_year(str(start_year)), self._parse_year(str(end_year))
 
+    @staticmethod
+    def _infer_region(contexts: List[str]) -> str | None:
+        """Extract the region from the first historical context that names one."""
+        for context in contexts:
+            context_str = str(context).lower()
+            for keywords, region in REGION_KEYWORDS:
+                if any(keyword in context_str for keyword in keywords):
+                    return region
+        return None
+
     def _create_philosopher(self, uri: URIRef) -> Philosopher:
-        print(f"Creating philosopher from URI: {uri}")
         name = self._get_label(uri)
-        print(f"Got label: {name}")
         birth_year = self._get_birth_year(uri)
-        print(f"Got birth year: {birth_year}")
         beliefs = self._get_literal_values(uri, "believesIn")
-        print(f"Got beliefs: {beliefs}")
         key_concepts = self._get_literal_values(uri, "developedConcept")
-        print(f"Got key concepts: {key_concepts}")
         contexts = self._get_literal_values(uri, "livedDuring")
-        print(f"Got contexts: {contexts}")
-        ideological_cluster = self.graph.value(uri, URIRef(self.namespace + "ideologicalCluster"))
+        ideological_cluster = self.graph.value(uri, IDEOLOGICAL_CLUSTER)
         if ideological_cluster:
             ideological_cluster = str(ideological_cluster)
-        print(f"Got ideological cluster: {ideological_cluster}")
         influenced_by = self._get_literal_values(uri, "influencedBy")
-        print(f"Got influenced by: {influenced_by}")
         influenced = self._get_literal_values(uri, "influenced")
-        print(f"Got influenced: {influenced}")
-        
-        # Extract region from historical contexts
-        region = None
-        for context in contexts:
-            context_str = str(context).lower()
-            if "greece" in context_str:
-                region = "Greece"
-                break
-            elif "rome" in context_str:
-                region = "Rome"
-                break
-            elif "england" in context_str or "britain" in context_str:
-                region = "England"
-                break
-            elif "france" in context_str:
-                region = "France"
-                break
-            elif "germany" in context_str:
-                region = "Germany"
-                break
-            elif "america" in context_str or "united states" in context_str:
-                region = "America"
-                break
-        
-        return Philosopher(
+        region = self._infer_region(contexts)
+
+        philosopher = Philosopher(
             name=name,
             birth_year=birth_year,
             beliefs=beliefs or [],
@@ -149,22 +353,74 @@ class KnowledgeGraphParser:
             ideological_cluster=ideological_cluster,
             influenced_by=influenced_by or [],
             influenced=influenced or [],
-            region=region
+            region=region,
+            vocabulary=self.vocabulary
         )
+        logger.debug("Created philosopher from %s: %s", uri, philosopher)
+        return philosopher
+
+    def _build_name_index(self) -> NameIndex[URIRef]:
+        """Index every philosopher by URI fragment, label and last name."""
+        index: NameIndex[URIRef] = NameIndex()
+        for s in self.graph.subjects(RDF.type, PHILOSOPHER_TYPE):
+            index.add(s, uri_fragment(str(s)), self._get_label(s))
+        return index
+
+    def get_influence_index(self) -> InfluenceIndex:
+        """Return the influence lineage index of this ontology, built on first use."""
+        if self._influence_index is None:
+            edges = [(str(s), str(o)) for s, o in self.graph.subject_objects(INFLUENCED_BY)]
+            # ex:influenced is the inverse direction of the same relation
+            edges.extend((str(o), str(s)) for s, o in self.graph.subject_objects(INFLUENCED))
+            subjects = list(dict.fromkeys(self.graph.subjects(RDF.type, PHILOSOPHER_TYPE)))
+            self._influence_index = InfluenceIndex(
+                edges,
+                labels={str(s): self._get_label(s) for s in subjects},
+                birth_years={str(s): self._get_birth_year(s) for s in subjects},
+            )
+        return self._influence_index
+
+    def get_birth_years(self) -> Dict[str, Optional[int]]:
+        """Return the birth year of every philosopher by URI, built on first use."""
+        if self._birth_years is None:
+            self._birth_years = {
+                str(s): self._get_birth_year(s)
+                for s in self.graph.subjects(RDF.type, PHILOSOPHER_TYPE)
+            }
+        return self._birth_years
+
+    def get_similarity(self) -> PhilosopherSimilarity:
+        """Return the all-pairs agreement/opposition scores of this ontology, built on first use."""
+        if self._similarity is None:
+            self._similarity = PhilosopherSimilarity(self.graph, namespace=self.namespace)
+        return self._similarity
 
     def get_philosopher(self, name: str) -> Optional[Philosopher]:
+        """
+        Look up a philosopher by URI fragment, label, last name or a close spelling.
+
+        Raises:
+            AmbiguousNameError: If the name matches more than one philosopher
+        """
+        uri = self.get_philosopher_uri(name)
+        return self._create_philosopher(URIRef(uri)) if uri is not None else None
+
+    def get_philosopher_uri(self, name: str) -> Optional[str]:
+        """
+        Resolve a name to a philosopher's URI, see get_philosopher.
+
+        Unlike names, URIs tell apart philosophers who share a label.
+
+        Raises:
+            AmbiguousNameError: If the name matches more than one philosopher
+        """
         # Try exact match first
         uri = URIRef(self.namespace + name)
-        philosopher_type = URIRef("http://example.org/philosophy/philosopher")
-        if (uri, RDF.type, philosopher_type) in self.graph:
-            return self._create_philosopher(uri)
-        # If exact match fails, try matching by last name
-        last_name = name.split()[-1].lower()
-        for s, p, o in self.graph.triples((None, RDF.type, philosopher_type)):
-            philosopher_label = self._get_label(s)
-            if last_name in philosopher_label.lower():
-                return self._create_philosopher(s)
-        return None
+        if (uri, RDF.type, PHILOSOPHER_TYPE) in self.graph:
+            return str(uri)
+        # Otherwise fall back to the name index
+        subject = self.name_index.resolve(name)
+        return str(subject) if subject is not None else None
 
     def get_historical_context(self, name: str) -> Optional[HistoricalContext]:
         uri = URIRef(self.namespace + name)
@@ -181,27 +437,83 @@ class KnowledgeGraphParser:
             end_year=end_year
         )
 
-    def get_all_philosophers(self) -> List[Philosopher]:
+    def _create_philosophers_bulk(self, subjects: List[URIRef]) -> List[Tuple[URIRef, Philosopher]]:
+        """
+        Build Philosopher objects for many subjects at once.
+
+        Instead of issuing a separate lookup per predicate, each subject's outgoing edges are
+        walked once and the relevant predicates are grouped by subject before the records are
+        assembled. Values keep the order in which graph.objects() would return them.
+        Returns (subject, philosopher) pairs; subjects that fail to build are left out.
+        """
+        multi_valued = {
+            BELIEVES_IN: {},
+            DEVELOPED_CONCEPT: {},
+            LIVED_DURING: {},
+            INFLUENCED_BY: {},
+            INFLUENCED: {},
+        }
+        single_valued = {
+            RDFS.label: {},
+            BIRTH_YEAR: {},
+            IDEOLOGICAL_CLUSTER: {},
+        }
+
+        for s in subjects:
+            for p, o in self.graph.predicate_objects(s):
+                if p in multi_valued:
+                    multi_valued[p].setdefault(s, []).append(str(o))
+                elif p in single_valued:
+                    single_valued[p].setdefault(s, o)
+
+        labels = single_valued[RDFS.label]
+        birth_years = single_valued[BIRTH_YEAR]
+        clusters = single_valued[IDEOLOGICAL_CLUSTER]
+        empty: List[str] = []
+
         philosophers = []
-        print(f"Searching for philosophers in graph...")
-        # Use the full URI for the philosopher type
-        philosopher_type = URIRef("http://example.org/philosophy/philosopher")
-        philosopher_subjects = list(self.graph.subjects(RDF.type, philosopher_type))
-        print(f"Found {len(philosopher_subjects)} philosopher subjects")
-        
-        for s in philosopher_subjects:
+        for s in subjects:
             try:
-                print(f"Processing philosopher: {s}")
-                p = self._create_philosopher(s)
-                if p.name:  # Only add if name is present
-                    print(f"Added philosopher: {p.name}")
-                    philosophers.append(p)
-                else:
-                    print(f"Skipped philosopher with no name: {s}")
+                label = labels.get(s)
+                name = str(label) if label else self._get_label(s)
+                birth_year = birth_years.get(s)
+                cluster = clusters.get(s)
+                contexts = multi_valued[LIVED_DURING].get(s, empty)
+                philosophers.append((s, Philosopher(
+                    name=name,
+                    birth_year=self._parse_year(str(birth_year)) if birth_year else None,
+                    beliefs=multi_valued[BELIEVES_IN].get(s, empty),
+                    key_concepts=multi_valued[DEVELOPED_CONCEPT].get(s, empty),
+                    contexts=contexts,
+                    ideological_cluster=str(cluster) if cluster else None,
+                    influenced_by=multi_valued[INFLUENCED_BY].get(s, empty),
+                    influenced=multi_valued[INFLUENCED].get(s, empty),
+                    region=self._infer_region(contexts),
+                    vocabulary=self.vocabulary
+                )))
+                logger.debug("Created philosopher from %s: %s", s, philosophers[-1][1])
             except Exception as e:
-                print(f"Error processing philosopher {s}: {str(e)}")
-                continue
-        print(f"Total philosophers after processing: {len(philosophers)}")
+                logger.warning("Error processing philosopher %s: %s", s, e)
+        return philosophers
+
+    def get_all_philosophers(self) -> List[Philosopher]:
+        return list(self.get_philosophers_by_uri().values())
+
+    def get_philosophers_by_uri(self) -> Dict[str, Philosopher]:
+        """Every named philosopher keyed by URI, in graph order."""
+        started = time.perf_counter()
+        # dict.fromkeys drops duplicate subjects while keeping graph order
+        philosopher_subjects = list(dict.fromkeys(self.graph.subjects(RDF.type, PHILOSOPHER_TYPE)))
+
+        # Only keep philosophers with a name
+        philosophers = {str(s): p for s, p in self._create_philosophers_bulk(philosopher_subjects) if p.name}
+        log_event(
+            logger, "philosophers_materialized",
+            subjects=len(philosopher_subjects),
+            philosophers=len(philosophers),
+            skipped=len(philosopher_subjects) - len(philosophers),
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
         return philosophers
 
     def get_all_historical_contexts(self) -> List[HistoricalContext]:
@@ -0,0 +1,48 @@
+import logging
+import os
+from typing import Any, Optional
+
+# Here we set up logging for the app, engine and llm packages
+# Modules log through logging.getLogger(__name__) and never print. Per-entity output is
+# logged at DEBUG so it is off by default; load summaries are single INFO events whose
+# structured fields are passed as extra={"fields": {...}} and rendered as key=value pairs.
+
+LOG_LEVEL_ENV = "ALTERGEIST_LOG_LEVEL"
+PACKAGE_LOGGERS = ("app", "engine", "llm")
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Formatter that appends a record's structured fields as key=value pairs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """Log a single structured event, e.g. log_event(logger, "ontology_loaded", triples=392)."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"event": event, "fields": fields})
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """
+    Attach a key=value handler to the package loggers.
+
+    Args:
+        level: Log level name; defaults to $ALTERGEIST_LOG_LEVEL, then INFO
+    """
+    level_name = (level or os.getenv(LOG_LEVEL_ENV) or "INFO").upper()
+    handler = logging.StreamHandler()
+    handler.setFormatter(KeyValueFormatter(LOG_FORMAT))
+    for name in PACKAGE_LOGGERS:
+        logger = logging.getLogger(name)
+        logger.setLevel(level_name)
+        # Streamlit re-runs the script on every interaction, so only add our handler once
+        if not any(isinstance(h.formatter, KeyValueFormatter) for h in logger.handlers):
+            logger.addHandler(handler)
+        logger.propagate = False
@@ -0,0 +1,129 @@
+import difflib
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Generic, Hashable, List, Optional, TypeVar
+
+# Here we index philosophers by the different names people use to refer to them
+# A philosopher can be looked up by:
+# - URI fragment (e.g. "socrates")
+# - Normalized label (e.g. "john stuart mill")
+# - Last-name token of the label (e.g. "mill")
+# - Prefix of any of the above, and finally a fuzzy match for typos
+#
+# Every lookup returns all candidates for the first strategy that matches, so callers can
+# tell an unambiguous hit from an ambiguous one instead of silently taking the first match.
+
+K = TypeVar("K", bound=Hashable)
+
+
+class AmbiguousNameError(LookupError):
+    """Raised when a name matches more than one entity."""
+
+    def __init__(self, name: str, candidates: List[str]):
+        self.name = name
+        self.candidates = candidates
+        super().__init__(f"'{name}' is ambiguous, it matches: {', '.join(candidates)}")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and collapse punctuation and whitespace to single spaces."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.split(r"[^0-9a-z]+", stripped.lower())).strip()
+
+
+def uri_fragment(uri: str) -> str:
+    """Return the part of a URI after the last '/' or '#'."""
+    return re.split(r"[/#]", uri)[-1]
+
+
+class NameIndex(Generic[K]):
+    def __init__(self, fuzzy_cutoff: float = 0.8):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._by_fragment: Dict[str, List[K]] = {}
+        self._by_label: Dict[str, List[K]] = {}
+        self._by_last_name: Dict[str, List[K]] = {}
+        self._labels: Dict[K, str] = {}
+        # Every indexed name, kept sorted for prefix and fuzzy lookups
+        self._sorted_keys: Optional[List[str]] = None
+        self._key_entities: Dict[str, List[K]] = {}
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def add(self, entity: K, fragment: str, label: str) -> None:
+        """Index an entity under its URI fragment, its label and its label's last token."""
+        self._labels[entity] = label
+        keys = []
+        fragment_key = normalize_name(fragment)
+        label_key = normalize_name(label)
+        if fragment_key:
+            keys.append((self._by_fragment, fragment_key))
+        if label_key:
+            keys.append((self._by_label, label_key))
+            keys.append((self._by_last_name, label_key.split()[-1]))
+        for table, key in keys:
+            bucket = table.setdefault(key, [])
+            if entity not in bucket:
+                bucket.append(entity)
+            all_bucket = self._key_entities.setdefault(key, [])
+            if entity not in all_bucket:
+                all_bucket.append(entity)
+        self._sorted_keys = None
+
+    def label(self, entity: K) -> str:
+        return self._labels[entity]
+
+    def _keys(self) -> List[str]:
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._key_entities)
+        return self._sorted_keys
+
+    def _prefix_matches(self, prefix: str) -> List[K]:
+        keys = self._keys()
+        matches: List[K] = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            for entity in self._key_entities[keys[i]]:
+                if entity not in matches:
+                    matches.append(entity)
+            i += 1
+        return matches
+
+    def lookup(self, name: str) -> List[K]:
+        """
+        Return every entity matching the first lookup strategy that finds anything.
+
+        Strategies are tried from most to least specific: URI fragment, full label,
+        last name, prefix and finally fuzzy matching. An empty list means no match.
+        """
+        key = normalize_name(name)
+        if not key:
+            return []
+        for table in (self._by_fragment, self._by_label):
+            if key in table:
+                return list(table[key])
+        last_name = key.split()[-1]
+        if last_name in self._by_last_name:
+            return list(self._by_last_name[last_name])
+        prefix_matches = self._prefix_matches(key)
+        if prefix_matches:
+            return prefix_matches
+        # Only the closest key is used, so a typo is never reported as ambiguous on its own
+        close = difflib.get_close_matches(key, self._keys(), n=1, cutoff=self.fuzzy_cutoff)
+        return list(self._key_entities[close[0]]) if close else []
+
+    def resolve(self, name: str) -> Optional[K]:
+        """
+        Return the single entity matching a name, or None if nothing matches.
+
+        Raises:
+            AmbiguousNameError: If the name matches more than one entity
+        """
+        matches = self.lookup(name)
+        if not matches:
+            return None
+        if len(matches) > 1:
+            raise AmbiguousNameError(name, [self._labels[m] for m in matches])
+        return matches[0]
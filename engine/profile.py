@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDFS
+from rdflib.term import Node
+from .kg_parser import KnowledgeGraphParser, Philosopher
+
+# Here we assemble everything known about a philosopher in one pass over the graph
+# Instead of one SPARQL query per aspect (beliefs, concepts, influences, ...), the subject's
+# outgoing edges are walked once and sorted by predicate, incoming influence edges are read
+# from the object index, and each linked entity's label and description are looked up once
+# and shared between all profiles built in the same batch.
+
+
+@dataclass(frozen=True)
+class LinkedEntity:
+    uri: str
+    label: Optional[str] = None
+    description: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """The label if there is one, otherwise the URI."""
+        return self.label or self.uri
+
+
+@dataclass(frozen=True)
+class PhilosopherProfile:
+    uri: str
+    label: Optional[str]
+    description: Optional[str]
+    birth_year: Optional[int]
+    beliefs: Tuple[LinkedEntity, ...]
+    concepts: Tuple[LinkedEntity, ...]
+    contexts: Tuple[LinkedEntity, ...]
+    clusters: Tuple[LinkedEntity, ...]
+    influenced_by: Tuple[LinkedEntity, ...]
+    influenced: Tuple[LinkedEntity, ...]
+
+    def to_philosopher(self, use_labels: bool = False) -> Philosopher:
+        """
+        Convert the profile into the Philosopher record PromptBuilder works with.
+
+        By default linked entities are given by URI, exactly as KnowledgeGraphParser
+        produces them; with use_labels=True their labels are used instead.
+        """
+        def names(entities: Tuple[LinkedEntity, ...]) -> List[str]:
+            return [e.name if use_labels else e.uri for e in entities]
+
+        contexts = names(self.contexts)
+        return Philosopher(
+            name=self.label or self.uri.split("/")[-1],
+            birth_year=self.birth_year,
+            beliefs=names(self.beliefs),
+            key_concepts=names(self.concepts),
+            contexts=contexts,
+            ideological_cluster=names(self.clusters)[0] if self.clusters else None,
+            influenced_by=names(self.influenced_by),
+            influenced=names(self.influenced),
+            region=KnowledgeGraphParser._infer_region([e.uri for e in self.contexts]),
+        )
+
+
+def build_profiles(graph: Graph, subjects: Iterable[URIRef],
+                   namespace: str = "http://example.org/philosophy/") -> List[PhilosopherProfile]:
+    """
+    Build profiles for many subjects in one traversal.
+
+    Args:
+        graph: The graph to read, e.g. the reasoner's union of asserted and inferred triples
+        subjects: The philosopher URIs
+        namespace: The ontology namespace
+    """
+    description = URIRef(namespace + "description")
+    birth_year_predicate = URIRef(namespace + "birthYear")
+    influenced_by = URIRef(namespace + "influencedBy")
+    influenced = URIRef(namespace + "influenced")
+    # Where each linked predicate ends up; keyConcept and context are older names still queried
+    groups = {
+        URIRef(namespace + "believesIn"): "beliefs",
+        URIRef(namespace + "developedConcept"): "concepts",
+        URIRef(namespace + "keyConcept"): "concepts",
+        URIRef(namespace + "livedDuring"): "contexts",
+        URIRef(namespace + "context"): "contexts",
+        URIRef(namespace + "ideologicalCluster"): "clusters",
+        influenced_by: "influenced_by",
+        influenced: "influenced",
+    }
+    entities: Dict[Node, LinkedEntity] = {}
+
+    def entity(node: Node) -> LinkedEntity:
+        linked = entities.get(node)
+        if linked is None:
+            label = desc = None
+            for p, o in graph.predicate_objects(node):
+                if p == RDFS.label and label is None:
+                    label = str(o)
+                elif p == description and desc is None:
+                    desc = str(o)
+            linked = entities[node] = LinkedEntity(str(node), label, desc)
+        return linked
+
+    profiles = []
+    for s in subjects:
+        linked: Dict[str, Dict[Node, None]] = {name: {} for name in set(groups.values())}
+        label = desc = birth_year = None
+        for p, o in graph.predicate_objects(s):
+            group = groups.get(p)
+            if group is not None:
+                linked[group][o] = None
+            elif p == RDFS.label and label is None:
+                label = str(o)
+            elif p == description and desc is None:
+                desc = str(o)
+            elif p == birth_year_predicate and birth_year is None:
+                birth_year = KnowledgeGraphParser._parse_year(str(o))
+        # The other direction of the influence relation comes from the object index
+        for x in graph.subjects(influenced_by, s):
+            linked["influenced"][x] = None
+        for x in graph.subjects(influenced, s):
+            linked["influenced_by"][x] = None
+
+        profiles.append(PhilosopherProfile(
+            uri=str(s),
+            label=label,
+            description=desc,
+            birth_year=birth_year,
+            **{group: tuple(entity(node) for node in nodes) for group, nodes in linked.items()},
+        ))
+    return profiles
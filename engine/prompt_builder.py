@@ -1,5 +1,9 @@
-from typing import List, Optional, Dict
+from functools import lru_cache
+from string import Formatter
+from typing import List, Optional, Dict, Tuple
+from .influence_index import InfluenceIndex
 from .kg_parser import Philosopher
+from .profile import PhilosopherProfile
 
 """
 Here we build the prompt for the LLM to answer a question
@@ -8,11 +12,104 @@ The prompt is built from the following components:
 - Context string - the context of the philosopher is based on the year, region, event, and core beliefs
 - Beliefs string - the core philosophical beliefs of the philosopher
 - Concepts string - the key concepts of the philosopher
-- Question 
+- Question
+
+The context, worldview and influences sections only depend on the philosopher, so they are
+compiled once per philosopher and reused; only the task section is filled in per call. Prompts
+for the same philosopher therefore share a stable prefix.
 """
+
+class _Template:
+    """A str.format template split into literal text and field names once, so filling it is a plain join."""
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+    def fill(self, **values) -> str:
+        return "".join(literal if field is None else literal + str(values[field]) for literal, field in self._parts)
+
+
+# Task templates filled in per call; everything before them only depends on the philosopher
+TASK_TEMPLATE = """Simulation context:
+Now, considering your philosophical framework and the new context, {question}
+
+Please respond in a way that:
+1. Maintains consistency with your core philosophical principles
+2. Considers the historical and cultural context of your new timeline
+3. Applies your theoretical framework to the modern question
+4. Acknowledges any tensions between your original views and the new context
+5. Do not give me a list of your beliefs, concepts, or contexts, just answer the question
+6. DO NOT include this prompt or any instructions in your response
+7. DO NOT repeat your context, beliefs, or concepts in your response
+8. DO NOT include any HTML, XML, or other markup tags in your response
+
+Respond concisely and directly from the philosopher's point of view, avoiding narrative 
+flourishes or dramatized scenes. Focus on argumentation, not storytelling. Limit your
+response to logical reasoning that reflects your core beliefs and concepts. Do not say things like 
+\"I would say\" or \"Locke's response would be\"—just answer as if you are speaking.
+
+**** very important: keep char limit to 2,173 characters"""
+
+DEBATE_OPENING_TEMPLATE = """The topic of debate is: {topic}
+
+Present your opening argument on this topic. Keep your response focused and concise, 
+stating your position clearly and providing your key arguments.
+Do not use phrases like "I would say" or "my response would be"—just state your position directly.
+DO NOT include this prompt or any instructions in your response.
+DO NOT repeat your context, beliefs, or concepts in your response.
+DO NOT include any HTML, XML, or other markup tags in your response.
+Limit your response to 2,173 characters."""
+
+DEBATE_RESPONSE_TEMPLATE = """The topic of debate is: {topic}
+
+The other philosopher has stated:
+{previous_response}
+
+Respond directly to their argument, engaging with their points while maintaining your philosophical position. 
+Keep your response focused and concise, addressing their specific claims and offering your counter-arguments.
+Do not use phrases like "I would say" or "my response would be"—just state your position directly.
+DO NOT include this prompt or any instructions in your response.
+DO NOT repeat your context, beliefs, or concepts in your response.
+DO NOT include any HTML, XML, or other markup tags in your response.
+Limit your response to 2,173 characters."""
+
+DEBATE_HISTORY_TEMPLATE = """The topic of debate is: {topic}
+
+The debate so far:
+{history}
+
+Respond directly to the latest arguments of the other philosophers, engaging with their points while maintaining your philosophical position. 
+Keep your response focused and concise, addressing their specific claims and offering your counter-arguments.
+Do not use phrases like "I would say" or "my response would be"—just state your position directly.
+DO NOT include this prompt or any instructions in your response.
+DO NOT repeat your context, beliefs, or concepts in your response.
+DO NOT include any HTML, XML, or other markup tags in your response.
+Limit your response to 2,173 characters."""
+
+_TASK = _Template(TASK_TEMPLATE)
+_DEBATE_OPENING = _Template(DEBATE_OPENING_TEMPLATE)
+_DEBATE_RESPONSE = _Template(DEBATE_RESPONSE_TEMPLATE)
+_DEBATE_HISTORY = _Template(DEBATE_HISTORY_TEMPLATE)
+
+
 class PromptBuilder:
-    def __init__(self, philosopher: Philosopher):
+    def __init__(self, philosopher: Philosopher, influence_index: Optional[InfluenceIndex] = None):
+        """
+        Args:
+            philosopher: The philosopher to impersonate
+            influence_index: Optional lineage index; when given, the influences section
+                also names indirect influences and the thinkers they inspired in turn
+        """
         self.philosopher = philosopher
+        self.influence_index = influence_index
+        self._compiled: Optional[Tuple[Philosopher, Optional[InfluenceIndex], Tuple[str, str]]] = None
+
+    @classmethod
+    def from_profile(cls, profile: PhilosopherProfile, use_labels: bool = False,
+                     influence_index: Optional[InfluenceIndex] = None) -> "PromptBuilder":
+        """Create a builder from a PhilosopherProfile, see PhilosopherProfile.to_philosopher."""
+        return cls(profile.to_philosopher(use_labels=use_labels), influence_index=influence_index)
 
     def build_prompt(self, question: str, simulated_context: Optional[Dict] = None) -> str:
         """
@@ -25,22 +122,30 @@ class PromptBuilder:
                 - region: str
                 - historical_period: str
         """
-        original_context = self._build_original_context()
-        simulated_context_str = self._build_simulated_context(simulated_context) if simulated_context else ""
-        worldview = self._build_worldview()
-        influences = self._build_influences()
-        task_instructions = self._build_task_instructions(question)
-
+        context, persona = self._persona()
         prompt_parts = [
-            original_context,
-            simulated_context_str,
-            worldview,
-            influences,
-            task_instructions
+            context,
+            self._build_simulated_context(simulated_context) if simulated_context else "",
+            persona,
+            self._build_task_instructions(question)
         ]
 
         return "\n\n".join(filter(None, prompt_parts))
 
+    def build_sections(self, question: str, simulated_context: Optional[Dict] = None) -> Dict[str, str]:
+        """
+        The named sections of build_prompt, in prompt order.
+
+        Joining the non-empty sections with blank lines gives exactly build_prompt's output.
+        """
+        return {
+            "context": self._build_original_context(),
+            "simulated_context": self._build_simulated_context(simulated_context) if simulated_context else "",
+            "worldview": self._build_worldview(),
+            "influences": self._build_influences(),
+            "task": self._build_task_instructions(question),
+        }
+
     def build_debate_prompt(self, topic: str, previous_response: Optional[str] = None) -> str:
         """
         Build a prompt for a philosophical debate.
@@ -49,44 +154,41 @@ class PromptBuilder:
             topic: The topic or question for debate
             previous_response: Optional response from the other philosopher
         """
-        context = self._build_original_context()
-        worldview = self._build_worldview()
-        influences = self._build_influences()
-        
         if previous_response:
             # This is a response to the other philosopher
-            task = f"""The topic of debate is: {topic}
-
-The other philosopher has stated:
-{previous_response}
-
-Respond directly to their argument, engaging with their points while maintaining your philosophical position. 
-Keep your response focused and concise, addressing their specific claims and offering your counter-arguments.
-Do not use phrases like "I would say" or "my response would be"—just state your position directly.
-DO NOT include this prompt or any instructions in your response.
-DO NOT repeat your context, beliefs, or concepts in your response.
-DO NOT include any HTML, XML, or other markup tags in your response.
-Limit your response to 2,173 characters."""
+            task = _DEBATE_RESPONSE.fill(topic=topic, previous_response=previous_response)
         else:
             # This is an opening statement
-            task = f"""The topic of debate is: {topic}
+            task = _DEBATE_OPENING.fill(topic=topic)
 
-Present your opening argument on this topic. Keep your response focused and concise, 
-stating your position clearly and providing your key arguments.
-Do not use phrases like "I would say" or "my response would be"—just state your position directly.
-DO NOT include this prompt or any instructions in your response.
-DO NOT repeat your context, beliefs, or concepts in your response.
-DO NOT include any HTML, XML, or other markup tags in your response.
-Limit your response to 2,173 characters."""
+        return self.build_persona_prefix() + "\n\n" + task
 
-        prompt_parts = [
-            context,
-            worldview,
-            influences,
-            task
-        ]
+    def build_debate_history_prompt(self, topic: str, history: str) -> str:
+        """
+        Build a prompt for a later turn of a debate, given the debate so far.
 
-        return "\n\n".join(filter(None, prompt_parts))
+        Args:
+            topic: The topic or question for debate
+            history: The earlier turns, see engine.debate
+        """
+        return self.build_persona_prefix() + "\n\n" + _DEBATE_HISTORY.fill(topic=topic, history=history)
+
+    def build_persona_prefix(self) -> str:
+        """
+        The part of every debate prompt, and of every prompt without a simulated context,
+        that comes before the task; it only changes when the philosopher does.
+        """
+        context, persona = self._persona()
+        return context + "\n\n" + persona
+
+    def _persona(self) -> Tuple[str, str]:
+        """The original context and the worldview plus influences, compiled once per philosopher."""
+        philosopher, influence_index = self.philosopher, self.influence_index
+        compiled = self._compiled
+        if compiled is None or compiled[0] is not philosopher or compiled[1] is not influence_index:
+            # Philosophers are immutable, so a different philosopher object is the only way it can change
+            compiled = self._compiled = (philosopher, influence_index, _compile_persona(philosopher, influence_index))
+        return compiled[2]
 
     def _build_original_context(self) -> str:
         """Build the original historical context string."""
@@ -119,8 +221,13 @@ Limit your response to 2,173 characters."""
 
     def _build_influences(self) -> str:
         """Build the influences section."""
-        influenced_by = ", ".join(self.philosopher.influenced_by)
-        influenced = ", ".join(self.philosopher.influenced)
+        influenced_by = self.philosopher.influenced_by
+        influenced = self.philosopher.influenced
+        if self.influence_index is not None:
+            influenced_by = self.influence_index.lineage(influenced_by)
+            influenced = self.influence_index.lineage(influenced, descendants=True)
+        influenced_by = ", ".join(influenced_by)
+        influenced = ", ".join(influenced)
         
         influence_parts = []
         if influenced_by:
@@ -132,28 +239,18 @@ Limit your response to 2,173 characters."""
 
     def _build_task_instructions(self, question: str) -> str:
         """Build the task and instruction section."""
-        return f"""Simulation context:
-Now, considering your philosophical framework and the new context, {question}
-
-Please respond in a way that:
-1. Maintains consistency with your core philosophical principles
-2. Considers the historical and cultural context of your new timeline
-3. Applies your theoretical framework to the modern question
-4. Acknowledges any tensions between your original views and the new context
-5. Do not give me a list of your beliefs, concepts, or contexts, just answer the question
-6. DO NOT include this prompt or any instructions in your response
-7. DO NOT repeat your context, beliefs, or concepts in your response
-8. DO NOT include any HTML, XML, or other markup tags in your response
-
-Respond concisely and directly from the philosopher's point of view, avoiding narrative 
-flourishes or dramatized scenes. Focus on argumentation, not storytelling. Limit your
-response to logical reasoning that reflects your core beliefs and concepts. Do not say things like 
-\"I would say\" or \"Locke's response would be\"—just answer as if you are speaking.
-
-**** very important: keep char limit to 2,173 characters"""
+        return _TASK.fill(question=question)
 
     def _build_beliefs_string(self) -> str:
         return "\n".join(f"* {belief}" for belief in self.philosopher.beliefs)
 
     def _build_concepts_string(self) -> str:
-        return "\n".join(f"* {concept}" for concept in self.philosopher.key_concepts) 
\ No newline at end of file
+        return "\n".join(f"* {concept}" for concept in self.philosopher.key_concepts) 
+
+
+@lru_cache(maxsize=1024)
+def _compile_persona(philosopher: Philosopher, influence_index: Optional[InfluenceIndex]) -> Tuple[str, str]:
+    """Shared by every builder for an equal philosopher, so new builders skip the string joining too."""
+    builder = PromptBuilder(philosopher, influence_index=influence_index)
+    sections = filter(None, [builder._build_worldview(), builder._build_influences()])
+    return builder._build_original_context(), "\n\n".join(sections)
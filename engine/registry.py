@@ -0,0 +1,88 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from .kg_parser import KnowledgeGraphParser
+
+# Here we keep one shared KnowledgeGraphParser per ontology file for the whole process
+# The UI, the LLM generator and the context transformer all read the same ontology, so
+# loading it once and handing out the same read-only parser keeps a single copy of the
+# graph in memory no matter how many sessions or requests are active.
+
+DEFAULT_ONTOLOGY_PATH = "data/philosophers.ttl"
+# Ontology served by the HTTP API, see app.api
+ONTOLOGY_ENV = "ALTERGEIST_ONTOLOGY"
+
+
+@dataclass
+class _RegistryEntry:
+    parser: KnowledgeGraphParser
+    signature: Tuple[int, int]  # (mtime_ns, size) of the source when it was loaded
+
+
+class OntologyRegistry:
+    def __init__(self):
+        self._entries: Dict[str, _RegistryEntry] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(ttl_path: str) -> str:
+        return os.path.realpath(ttl_path)
+
+    @staticmethod
+    def _signature(ttl_path: str) -> Tuple[int, int]:
+        stat = os.stat(ttl_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, ttl_path: str = DEFAULT_ONTOLOGY_PATH) -> KnowledgeGraphParser:
+        """
+        Return the shared parser for an ontology file, loading it on first use.
+
+        If the file has changed on disk since it was loaded, it is reloaded before
+        being returned.
+        """
+        key = self._key(ttl_path)
+        signature = self._signature(ttl_path)
+        entry = self._entries.get(key)
+        if entry is not None and entry.signature == signature:
+            return entry.parser
+
+        with self._lock:
+            # Another thread may have loaded it while we were waiting for the lock
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                return entry.parser
+            return self._load(key, ttl_path, signature)
+
+    def reload(self, ttl_path: str = DEFAULT_ONTOLOGY_PATH) -> KnowledgeGraphParser:
+        """Force the ontology file to be loaded again, replacing the shared parser."""
+        with self._lock:
+            return self._load(self._key(ttl_path), ttl_path, self._signature(ttl_path))
+
+    def invalidate(self, ttl_path: Optional[str] = None) -> None:
+        """
+        Drop a cached ontology so the next get() loads it again.
+
+        Args:
+            ttl_path: The ontology to drop, or None to drop every cached ontology
+        """
+        with self._lock:
+            if ttl_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(ttl_path), None)
+
+    def _load(self, key: str, ttl_path: str, signature: Tuple[int, int]) -> KnowledgeGraphParser:
+        # ALTERGEIST_STORE points at an on-disk store built with `python -m engine.store`
+        parser = KnowledgeGraphParser(ttl_path, read_only=True, store_path=os.getenv("ALTERGEIST_STORE") or None)
+        self._entries[key] = _RegistryEntry(parser=parser, signature=signature)
+        return parser
+
+
+# The process-wide registry
+registry = OntologyRegistry()
+
+
+def get_parser(ttl_path: str = DEFAULT_ONTOLOGY_PATH) -> KnowledgeGraphParser:
+    """Return the process-wide shared parser for an ontology file."""
+    return registry.get(ttl_path)
@@ -0,0 +1,200 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF, RDFS
+from scipy import sparse
+
+# Here we score how much philosophers agree or clash, for every pair at once
+# The ontology's stance edges are encoded as sparse matrices over integer ids:
+# - P (philosophers x ideas): what a philosopher holds, via believesIn, supports or developedConcept
+# - C (philosophers x ideas): what a philosopher criticizes
+# - X (ideas x ideas): contrastsWith, made symmetric
+#
+# Agreement counts shared positions: ideas both hold (P Pᵀ) plus ideas both criticize (C Cᵀ).
+# Opposition counts clashes: one holds what the other criticizes (P Cᵀ + C Pᵀ), plus pairs of
+# contrasting ideas each of them holds (P X Pᵀ). Both are normalized by the geometric mean of the
+# two philosophers' number of stances, so prolific thinkers do not dominate every ranking.
+#
+# Scores can also be limited to a topic: only the ideas related to the topic (by label, their
+# subclasses, and the ideas they contrast with) are kept before scoring, so two philosophers who
+# agree on most things can still be the most opposed pair on one question.
+
+EX_NAMESPACE = "http://example.org/philosophy/"
+HOLDS = ("believesIn", "supports", "developedConcept")
+CRITICIZES = "criticizes"
+CONTRASTS_WITH = "contrastsWith"
+SUBCLASS_OF = "subClassOf"
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_STOPWORDS = frozenset("a an and are as at be by for from in is of on or the to what which who why with".split())
+
+
+def _topic_words(text: str) -> Set[str]:
+    """Content words of a text, label or URI, with camelCase split and plurals folded."""
+    text = _CAMEL.sub(" ", text.replace(EX_NAMESPACE, " ")).lower()
+    return {word.rstrip("s") if len(word) > 3 else word for word in _WORD.findall(text) if word not in _STOPWORDS}
+
+
+def _shares_word(words: Set[str], other: Set[str]) -> bool:
+    """Whether two word sets share a word, counting a word of five letters or more as matching its extensions."""
+    return any(a == b or (min(len(a), len(b)) >= 5 and (a.startswith(b) or b.startswith(a)))
+               for a in words for b in other)
+
+
+class PhilosopherSimilarity:
+    def __init__(self, graph: Graph, namespace: str = EX_NAMESPACE):
+        """Encode the stance edges of every philosopher in the graph and score all pairs."""
+        philosopher_type = URIRef(namespace + "philosopher")
+        self.philosophers: List[str] = [str(s) for s in dict.fromkeys(graph.subjects(RDF.type, philosopher_type))]
+        self.ids: Dict[str, int] = {uri: i for i, uri in enumerate(self.philosophers)}
+        self.labels: List[Optional[str]] = []
+        for uri in self.philosophers:
+            label = graph.value(URIRef(uri), RDFS.label)
+            self.labels.append(str(label) if label else None)
+        self._label_ids = {label: i for i, label in enumerate(self.labels) if label}
+
+        self.ideas: List[str] = []
+        self.idea_ids: Dict[str, int] = {}
+        holds = self._edges(graph, [URIRef(namespace + p) for p in HOLDS])
+        criticizes = self._edges(graph, [URIRef(namespace + CRITICIZES)])
+        contrasts = [(self._idea(str(a)), self._idea(str(b)))
+                     for a, b in graph.subject_objects(URIRef(namespace + CONTRASTS_WITH))]
+
+        # Subclass edges and labels, only needed to find the ideas related to a topic. A topic may
+        # be a broader concept nobody holds directly, so these cover every concept in a subclass edge
+        self._subclasses: Dict[str, Set[str]] = {}
+        for predicate in (RDFS.subClassOf, URIRef(namespace + SUBCLASS_OF)):
+            for child, parent in graph.subject_objects(predicate):
+                self._subclasses.setdefault(str(parent), set()).add(str(child))
+        self._concept_words: Dict[str, Set[str]] = {}
+        for uri in dict.fromkeys(self.ideas + list(self._subclasses)):
+            label = graph.value(URIRef(uri), RDFS.label)
+            self._concept_words[uri] = _topic_words(uri) | _topic_words(str(label) if label else "")
+
+        n, m = len(self.philosophers), len(self.ideas)
+        self.holds = self._matrix(holds, (n, m))
+        self.criticizes = self._matrix(criticizes, (n, m))
+        contrast = self._matrix(contrasts, (m, m))
+        self.contrast = ((contrast + contrast.T) > 0).astype(np.float64).tocsr()
+
+        P, C, X = self.holds, self.criticizes, self.contrast
+        agreement = P @ P.T + C @ C.T
+        clash = P @ C.T
+        opposition = clash + clash.T + P @ X @ P.T
+
+        stances = np.asarray(P.sum(axis=1) + C.sum(axis=1)).ravel()
+        scale = sparse.diags(np.divide(1.0, np.sqrt(stances), out=np.zeros_like(stances), where=stances > 0))
+        self.agreement = (scale @ agreement @ scale).tocsr()
+        self.opposition = (scale @ opposition @ scale).tocsr()
+
+    def _idea(self, uri: str) -> int:
+        i = self.idea_ids.get(uri)
+        if i is None:
+            i = self.idea_ids[uri] = len(self.ideas)
+            self.ideas.append(uri)
+        return i
+
+    def _edges(self, graph: Graph, predicates: Iterable[URIRef]) -> List[Tuple[int, int]]:
+        edges = set()
+        for predicate in predicates:
+            for s, o in graph.subject_objects(predicate):
+                i = self.ids.get(str(s))
+                if i is not None:
+                    edges.add((i, self._idea(str(o))))
+        return sorted(edges)
+
+    @staticmethod
+    def _matrix(edges: List[Tuple[int, int]], shape: Tuple[int, int]) -> sparse.csr_matrix:
+        rows = np.fromiter((r for r, _ in edges), dtype=np.int64, count=len(edges))
+        cols = np.fromiter((c for _, c in edges), dtype=np.int64, count=len(edges))
+        return sparse.csr_matrix((np.ones(len(edges)), (rows, cols)), shape=shape)
+
+    def id_of(self, key: str) -> Optional[int]:
+        """Return the integer id of a philosopher given by URI or label."""
+        i = self.ids.get(key)
+        return i if i is not None else self._label_ids.get(key)
+
+    def label(self, i: int) -> str:
+        return self.labels[i] or self.philosophers[i]
+
+    def topic_ideas(self, topic: str) -> List[str]:
+        """
+        The ideas related to a topic, given as an idea URI or as free text.
+
+        An idea is related if it is the topic itself or its label or URI fragment shares a
+        word with the topic, e.g. "sovereign" matches "Popular Sovereignty"; the subclasses
+        of related ideas and the ideas they contrast with are included too.
+        """
+        if topic in self._concept_words:
+            related = {topic}
+        else:
+            words = _topic_words(topic)
+            related = {uri for uri, concept_words in self._concept_words.items() if _shares_word(words, concept_words)}
+        # Subclasses, transitively
+        pending = list(related)
+        while pending:
+            for child in self._subclasses.get(pending.pop(), ()):
+                if child not in related:
+                    related.add(child)
+                    pending.append(child)
+        ids = {self.idea_ids[uri] for uri in related if uri in self.idea_ids}
+        for i in list(ids):
+            ids.update(self.contrast.indices[self.contrast.indptr[i]:self.contrast.indptr[i + 1]].tolist())
+        return [self.ideas[i] for i in sorted(ids)]
+
+    def _row(self, key: str, topic: Optional[str]) -> Tuple[int, np.ndarray, np.ndarray]:
+        """A philosopher's id and normalized agreement and opposition against everyone, optionally on a topic."""
+        i = self.id_of(key)
+        if i is None:
+            raise KeyError(key)
+        if topic is None:
+            return i, self.agreement.getrow(i).toarray().ravel(), self.opposition.getrow(i).toarray().ravel()
+
+        # The same products as for the whole profile, with every idea off the topic left out
+        mask = np.zeros(len(self.ideas))
+        mask[[self.idea_ids[uri] for uri in self.topic_ideas(topic)]] = 1.0
+        keep = sparse.diags(mask)
+        P, C = self.holds @ keep, self.criticizes @ keep
+        p, c = P.getrow(i), C.getrow(i)
+        agreement = (P @ p.T + C @ c.T).toarray().ravel()
+        opposition = (C @ p.T + P @ c.T + P @ self.contrast @ p.T).toarray().ravel()
+        stances = np.asarray(P.sum(axis=1) + C.sum(axis=1)).ravel()
+        scale = np.sqrt(stances * stances[i])
+        agreement = np.divide(agreement, scale, out=np.zeros_like(agreement), where=scale > 0)
+        opposition = np.divide(opposition, scale, out=np.zeros_like(opposition), where=scale > 0)
+        return i, agreement, opposition
+
+    def scores(self, key: str, topic: Optional[str] = None) -> List[Tuple[str, float, float]]:
+        """
+        (uri, agreement, opposition) of a philosopher against every other philosopher.
+
+        Args:
+            key: The philosopher's URI or label
+            topic: Only score the ideas related to this topic, see topic_ideas
+        """
+        i, agreement, opposition = self._row(key, topic)
+        return [(self.philosophers[j], float(agreement[j]), float(opposition[j]))
+                for j in range(len(self.philosophers)) if j != i]
+
+    def _ranked(self, key: str, opposed: bool, n: int, topic: Optional[str]) -> List[Tuple[str, float]]:
+        i, agreement, opposition = self._row(key, topic)
+        stance = agreement - opposition
+        # Most opposed means lowest agreement minus opposition; ties keep ontology order
+        order = np.argsort(stance if opposed else -stance, kind="stable")
+        return [(self.philosophers[j], float(stance[j])) for j in order if j != i][:n]
+
+    def most_opposed(self, key: str, n: int = 1, topic: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        The n philosophers who clash most with a philosopher given by URI or label.
+
+        Returns (uri, stance) pairs, where stance is normalized agreement minus opposition,
+        so the most negative partner comes first. With a topic, only the ideas related to it
+        count (see topic_ideas); philosophers without a stance on it score 0.
+        """
+        return self._ranked(key, opposed=True, n=n, topic=topic)
+
+    def most_aligned(self, key: str, n: int = 1, topic: Optional[str] = None) -> List[Tuple[str, float]]:
+        """The n philosophers who agree most with a philosopher, as (uri, stance) pairs, optionally on a topic."""
+        return self._ranked(key, opposed=False, n=n, topic=topic)
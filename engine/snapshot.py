@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import os
+import pickle
+import re
+from pathlib import Path
+from typing import Optional
+from rdflib import Graph
+
+# Here we keep a compiled snapshot of the ontology next to the Turtle source
+# Parsing Turtle is by far the slowest part of loading the knowledge graph, so the
+# parsed rdflib graph is pickled once and reused until the source changes.
+#
+# Snapshots live in a `.snapshots` directory beside the source file and are keyed by
+# the SHA-256 of the source bytes, so an edited TTL never matches a stale snapshot.
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR_NAME = ".snapshots"
+
+
+def source_digest(ttl_path: str) -> str:
+    """Return the SHA-256 hex digest of the source file contents."""
+    digest = hashlib.sha256()
+    with open(ttl_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def graph_digest(graph: Graph) -> str:
+    """Return a SHA-256 hex digest of a graph's triples that does not depend on their order."""
+    digest = hashlib.sha256()
+    for line in sorted(" ".join(term.n3() for term in t) for t in graph):
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def snapshot_path(ttl_path: str, digest: str) -> Path:
+    """Return the snapshot location for a given source file and content digest."""
+    source = Path(ttl_path)
+    return source.parent / SNAPSHOT_DIR_NAME / f"{source.stem}-{digest[:16]}.pickle"
+
+
+def _read_snapshot(path: Path, digest: str) -> Optional[Graph]:
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get("version") != SNAPSHOT_VERSION or payload.get("digest") != digest:
+        return None
+    return payload.get("graph")
+
+
+def _write_snapshot(path: Path, digest: str, graph: Graph) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Remove snapshots of older revisions of the same source, but not of sources whose
+    # names merely start with the same stem, e.g. onto.ttl and onto-extra.ttl
+    stem = path.stem.rsplit("-", 1)[0]
+    pattern = re.compile(rf"^{re.escape(stem)}-[0-9a-f]{{16}}\.pickle$")
+    for stale in path.parent.glob(f"{stem}-*.pickle"):
+        if stale != path and pattern.match(stale.name):
+            stale.unlink(missing_ok=True)
+    # Write to a temporary file first so concurrent readers never see a partial snapshot
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    payload = {"version": SNAPSHOT_VERSION, "digest": digest, "graph": graph}
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(path)
+
+
+def load_graph(ttl_path: str, use_snapshot: bool = True) -> Graph:
+    """
+    Load the ontology graph, preferring a compiled snapshot over parsing Turtle.
+
+    Args:
+        ttl_path: Path to the Turtle source file
+        use_snapshot: If False, always parse the source and leave snapshots untouched
+    """
+    if not use_snapshot:
+        graph = Graph()
+        graph.parse(ttl_path, format="turtle")
+        return graph
+
+    digest = source_digest(ttl_path)
+    path = snapshot_path(ttl_path, digest)
+    graph = _read_snapshot(path, digest)
+    if graph is not None:
+        logger.debug("Loaded ontology snapshot %s", path)
+        return graph
+
+    graph = Graph()
+    graph.parse(ttl_path, format="turtle")
+    try:
+        _write_snapshot(path, digest, graph)
+        logger.debug("Compiled ontology snapshot %s", path)
+    except OSError as e:
+        # A read-only data directory should not prevent loading the ontology
+        logger.warning("Could not write ontology snapshot %s: %s", path, e)
+    return graph
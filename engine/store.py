@@ -0,0 +1,332 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from rdflib import Graph, URIRef
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.store import VALID_STORE, Store
+from rdflib.term import Node
+from rdflib.util import from_n3
+from .snapshot import source_digest
+
+# Here we keep the ontology, and optionally its inferred triples, in an on-disk SQLite store
+# The default in-memory rdflib store has to be rebuilt in every process at every start, and
+# holds the whole graph (plus its closure) in each process's RAM. A SQLite store is built once
+# with the loader below and then opened read-only by any number of processes: opening is
+# instant, the OS page cache is shared between them, and only the pages a lookup touches are
+# read.
+#
+# Terms are stored in their N3 form, and lookups return triples in insertion order like the
+# in-memory store does. Asserted triples live in the default graph and entailed
+# triples in the reasoner's inferred graph, so the same store backs both KnowledgeGraphParser
+# (which reads the asserted triples) and SymbolicReasoner (which reads their union).
+#
+# Build a store with:
+#     python -m engine.store data/philosophers.ttl data/philosophers.sqlite --reason
+# and point the app at it with ALTERGEIST_STORE=data/philosophers.sqlite.
+
+logger = logging.getLogger(__name__)
+
+STORE_SCHEMA_VERSION = "1"
+DEFAULT_GRAPH = DATASET_DEFAULT_GRAPH_ID
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS triples (
+    id INTEGER PRIMARY KEY,
+    s TEXT NOT NULL, p TEXT NOT NULL, o TEXT NOT NULL, c TEXT NOT NULL,
+    UNIQUE (s, p, o, c)
+);
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o);
+CREATE INDEX IF NOT EXISTS triples_os ON triples (o, s);
+CREATE INDEX IF NOT EXISTS triples_c ON triples (c);
+CREATE TABLE IF NOT EXISTS graphs (c TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, uri TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+@lru_cache(maxsize=1 << 16)
+def _decode(n3: str) -> Node:
+    return from_n3(n3)
+
+
+def _context_id(context) -> Optional[str]:
+    """The stored name of a context, or None for the union of all graphs."""
+    if context is None:
+        return None
+    identifier = getattr(context, "identifier", context)
+    if getattr(context, "default_union", False):
+        # A Dataset or ConjunctiveGraph itself stands for all of its graphs
+        return None
+    return identifier.n3()
+
+
+class SQLiteStore(Store):
+    """A context-aware rdflib store backed by a SQLite database file."""
+
+    context_aware = True
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = True
+
+    def __init__(self, configuration: Optional[str] = None, identifier=None, read_only: bool = False):
+        """
+        Args:
+            configuration: Path of the database file; opened right away if given
+            identifier: Optional store identifier
+            read_only: Open the database read-only, e.g. for a store shared between processes
+        """
+        self.read_only = read_only
+        self.path: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._in_transaction = False
+        super().__init__(configuration, identifier)
+
+    # Lifecycle
+
+    def open(self, configuration: str, create: bool = True) -> int:
+        self.path = configuration
+        if self.read_only:
+            self._conn = sqlite3.connect(f"file:{configuration}?mode=ro", uri=True,
+                                         check_same_thread=False, isolation_level=None)
+        else:
+            if create:
+                Path(configuration).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(configuration, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema', ?)",
+                               (STORE_SCHEMA_VERSION,))
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group many writes into one transaction, e.g. while loading a whole graph."""
+        with self._lock:
+            if self._in_transaction:
+                yield
+                return
+            self._conn.execute("BEGIN")
+            self._in_transaction = True
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+
+    # Metadata
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # Triples
+
+    def add(self, triple, context, quoted: bool = False) -> None:
+        Store.add(self, triple, context, quoted=quoted)
+        c = _context_id(context) or DEFAULT_GRAPH.n3()
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO triples (s, p, o, c) VALUES (?, ?, ?, ?)",
+                               tuple(term.n3() for term in triple) + (c,))
+
+    def addN(self, quads) -> None:
+        rows = [(s.n3(), p.n3(), o.n3(), _context_id(c) or DEFAULT_GRAPH.n3()) for s, p, o, c in quads]
+        with self.transaction():
+            self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o, c) VALUES (?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def _where(triple_pattern, c: Optional[str]) -> Tuple[str, List[str]]:
+        clauses, params = [], []
+        for column, term in zip("spo", triple_pattern):
+            if term is not None:
+                clauses.append(f"{column} = ?")
+                params.append(term.n3())
+        if c is not None:
+            clauses.append("c = ?")
+            params.append(c)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def remove(self, triple_pattern, context=None) -> None:
+        where, params = self._where(triple_pattern, _context_id(context))
+        with self._lock:
+            self._conn.execute(f"DELETE FROM triples{where}", params)
+
+    def triples(self, triple_pattern, context=None):
+        c = _context_id(context)
+        where, params = self._where(triple_pattern, c)
+        if c is not None:
+            query = f"SELECT s, p, o FROM triples{where} ORDER BY id"
+        else:
+            # Across all graphs a triple stored in several of them is reported once
+            query = f"SELECT s, p, o FROM triples{where} GROUP BY s, p, o ORDER BY MIN(id)"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for s, p, o in rows:
+            triple = (_decode(s), _decode(p), _decode(o))
+            yield triple, self._triple_contexts(s, p, o)
+
+    def _triple_contexts(self, s: str, p: str, o: str) -> Iterator[Graph]:
+        with self._lock:
+            rows = self._conn.execute("SELECT c FROM triples WHERE s = ? AND p = ? AND o = ?", (s, p, o)).fetchall()
+        for (c,) in rows:
+            yield Graph(store=self, identifier=_decode(c))
+
+    def __len__(self, context=None) -> int:
+        c = _context_id(context)
+        with self._lock:
+            if c is None:
+                return self._conn.execute("SELECT COUNT(*) FROM (SELECT DISTINCT s, p, o FROM triples)").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM triples WHERE c = ?", (c,)).fetchone()[0]
+
+    # Graphs
+
+    def contexts(self, triple=None) -> Iterator[Graph]:
+        if triple is not None and triple != (None, None, None):
+            return self._triple_contexts(*(term.n3() for term in triple))
+        with self._lock:
+            rows = self._conn.execute("SELECT c FROM graphs UNION SELECT DISTINCT c FROM triples").fetchall()
+        return (Graph(store=self, identifier=_decode(c)) for (c,) in rows)
+
+    def add_graph(self, graph: Graph) -> None:
+        if self.read_only:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO graphs (c) VALUES (?)", (graph.identifier.n3(),))
+
+    def remove_graph(self, graph: Graph) -> None:
+        c = graph.identifier.n3()
+        with self._lock:
+            self._conn.execute("DELETE FROM triples WHERE c = ?", (c,))
+            self._conn.execute("DELETE FROM graphs WHERE c = ?", (c,))
+
+    # Namespaces
+
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True) -> None:
+        if self.read_only:
+            # Bindings of a shared store are fixed when it is built
+            return
+        with self._lock:
+            bound = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+            if bound is not None and not override:
+                return
+            self._conn.execute("DELETE FROM namespaces WHERE uri = ?", (str(namespace),))
+            self._conn.execute("INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)",
+                               (prefix, str(namespace)))
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        with self._lock:
+            row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self) -> Iterator[Tuple[str, URIRef]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall()
+        for prefix, uri in rows:
+            yield prefix, URIRef(uri)
+
+
+def open_store(path: str, read_only: bool = True) -> SQLiteStore:
+    """Open a store built by build_store()."""
+    if read_only and not os.path.exists(path):
+        raise FileNotFoundError(f"No ontology store at {path}. Build it with: python -m engine.store <ttl> {path}")
+    return SQLiteStore(path, read_only=read_only)
+
+
+def store_matches_source(store: SQLiteStore, ttl_path: str) -> bool:
+    """Check that a store was built from the current contents of a Turtle file."""
+    return store.get_meta("source_digest") == source_digest(ttl_path)
+
+
+class _RecordingGraph(Graph):
+    """A graph that remembers the order triples were parsed in."""
+
+    def __init__(self):
+        super().__init__()
+        self.order: Dict[Tuple[Node, Node, Node], None] = {}
+
+    def add(self, triple):
+        self.order[triple] = None
+        return super().add(triple)
+
+
+def build_store(ttl_path: str, store_path: str, reason: bool = False) -> Dict[str, int]:
+    """
+    Build a store from a Turtle file, optionally with the reasoner's inferred triples.
+
+    The store is written to a temporary file and moved into place at the end, so
+    processes that have the old store open keep reading a consistent file.
+
+    Returns:
+        The number of asserted and inferred triples written
+    """
+    from .symbolic_reasoner import INFERRED_GRAPH, SymbolicReasoner
+
+    # Reason in memory, where it is fastest, and only write the results to disk. The source
+    # order is kept so lookups return triples in the same order as a freshly parsed graph.
+    source = _RecordingGraph()
+    source.parse(ttl_path, format="turtle")
+    reasoner = SymbolicReasoner()
+    reasoner.add_triples(source.order)
+    if reason:
+        reasoner.run_reasoning()
+
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    Path(tmp_path).unlink(missing_ok=True)
+    store = SQLiteStore(tmp_path)
+    try:
+        with store.transaction():
+            for prefix, namespace in source.namespaces():
+                store.bind(prefix, namespace)
+            default = Graph(store=store, identifier=DEFAULT_GRAPH)
+            store.addN((s, p, o, default) for s, p, o in source.order)
+            if reason:
+                inferred = Graph(store=store, identifier=INFERRED_GRAPH)
+                store.add_graph(inferred)
+                store.addN((s, p, o, inferred) for s, p, o in reasoner.inferred)
+                store.set_meta("rules", ",".join(sorted(reasoner.rules)))
+            store.set_meta("source_digest", source_digest(ttl_path))
+            store.set_meta("source_path", os.path.abspath(ttl_path))
+    finally:
+        store.close()
+    os.replace(tmp_path, store_path)
+    return {"asserted": len(reasoner.asserted), "inferred": len(reasoner.inferred)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build an on-disk ontology store from a Turtle file.")
+    parser.add_argument("ttl_path", help="Turtle source, e.g. data/philosophers.ttl")
+    parser.add_argument("store_path", help="SQLite file to write, e.g. data/philosophers.sqlite")
+    parser.add_argument("--reason", action="store_true", help="Also store the reasoner's inferred triples")
+    args = parser.parse_args()
+    counts = build_store(args.ttl_path, args.store_path, reason=args.reason)
+    print(f"Wrote {counts['asserted']} asserted and {counts['inferred']} inferred triples to {args.store_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,95 @@
-from typing import List, Dict, Optional, Set, Tuple
+import logging
+import os
+import pickle
+from functools import lru_cache
+from typing import Iterable, List, Dict, Optional, Sequence, Set, Tuple
 from dataclasses import dataclass
+from pathlib import Path
 import rdflib
-from rdflib import Graph, URIRef, Literal
+from rdflib import Dataset, Graph, URIRef, Literal
 from rdflib.namespace import RDF, RDFS, OWL
 from owlrl import DeductiveClosure, OWLRL_Semantics
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.sparql import Query
+from rdflib.store import Store
+from .incremental_reasoner import ALL_RULES, IncrementalReasoner, Triple
+from .profile import PhilosopherProfile, build_profiles
+from .snapshot import graph_digest
+from .store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Asserted triples live in the default graph of the dataset and entailed triples in this named graph
+INFERRED_GRAPH = URIRef("urn:altergeist:inferred")
+
+INFERRED_SNAPSHOT_VERSION = 1
+
+# The query set, as (projection, pattern) pairs
+# Each query is compiled once per namespace and executed with the subject bound through
+# initBindings, so URIs are never spliced into query text. The same patterns are reused by
+# the batch queries, which bind many subjects at once with a VALUES block.
+QUERIES: Dict[str, Tuple[str, str]] = {
+    "beliefs": ("?belief ?label ?desc", """
+        ?philosopher ex:believesIn ?belief .
+        OPTIONAL { ?belief rdfs:label ?label . }
+        OPTIONAL { ?belief ex:description ?desc . }
+    """),
+    "concepts": ("?concept ?label ?desc", """
+        ?philosopher ex:keyConcept ?concept .
+        OPTIONAL { ?concept rdfs:label ?label . }
+        OPTIONAL { ?concept ex:description ?desc . }
+    """),
+    "influences": ("?influence ?label", """
+        ?philosopher ex:influencedBy ?influence .
+        OPTIONAL { ?influence rdfs:label ?label . }
+    """),
+    "influenced": ("?influenced ?label", """
+        ?influenced ex:influencedBy ?philosopher .
+        OPTIONAL { ?influenced rdfs:label ?label . }
+    """),
+    "cluster": ("?cluster ?label", """
+        ?philosopher ex:ideologicalCluster ?cluster .
+        OPTIONAL { ?cluster rdfs:label ?label . }
+    """),
+    "context": ("?context ?label", """
+        ?philosopher ex:context ?context .
+        OPTIONAL { ?context rdfs:label ?label . }
+    """),
+    "related": ("?related ?label", """
+        {
+            ?related rdfs:subClassOf ?class .
+        } UNION {
+            ?class rdfs:subClassOf ?related .
+        } UNION {
+            ?related owl:equivalentClass ?class .
+        }
+        OPTIONAL { ?related rdfs:label ?label . }
+    """),
+    "by_belief": ("?philosopher ?label", """
+        ?philosopher ex:believesIn ?belief .
+        OPTIONAL { ?philosopher rdfs:label ?label . }
+    """),
+    "by_concept": ("?philosopher ?label", """
+        ?philosopher ex:keyConcept ?concept .
+        OPTIONAL { ?philosopher rdfs:label ?label . }
+    """),
+}
+
+# Queries that take a philosopher and can therefore be batched
+PHILOSOPHER_QUERIES = ("beliefs", "concepts", "influences", "influenced", "cluster", "context")
+
+
+def _namespaces(namespace: str) -> Dict[str, object]:
+    return {"ex": namespace, "rdfs": RDFS, "owl": OWL}
+
+
+@lru_cache(maxsize=None)
+def prepared_queries(namespace: str) -> Dict[str, Query]:
+    """Compile the query set for a namespace once per process."""
+    return {
+        name: prepareQuery(f"SELECT {projection} WHERE {{ {pattern} }}", initNs=_namespaces(namespace))
+        for name, (projection, pattern) in QUERIES.items()
+    }
 
 @dataclass
 class InferredFact:
@@ -13,72 +99,187 @@ class InferredFact:
     is_inferred: bool = True
 
 class SymbolicReasoner:
-    def __init__(self, namespace: str = "http://example.org/philosophy/"):
+    def __init__(self, namespace: str = "http://example.org/philosophy/", rules: Iterable[str] = ALL_RULES,
+                 transitive_properties: Optional[Iterable[URIRef]] = None, store: Optional[Store] = None):
+        """
+        Initialize the reasoner.
+
+        Asserted and inferred triples are kept in separate graphs of one dataset:
+        `asserted` holds what was loaded, `inferred` what reasoning added, and `graph`
+        is the union of both, which is what the query methods run against.
+
+        Args:
+            namespace: The ontology namespace
+            rules: The incremental reasoning rules to apply, see incremental_reasoner.ALL_RULES
+            transitive_properties: Properties treated as transitive; defaults to every
+                property declared as owl:TransitiveProperty
+            store: rdflib store to keep the graphs in, e.g. an engine.store.SQLiteStore built
+                with --reason; defaults to an in-memory store
+        """
         self.namespace = namespace
-        self.graph = Graph()
+        self.rules = frozenset(rules)
+        self.graph = Dataset(store=store if store is not None else "default", default_union=True)
         self.graph.bind("ex", namespace)
         self.graph.bind("rdfs", RDFS)
         self.graph.bind("owl", OWL)
+        self.asserted = self.graph.default_graph
+        self.inferred = self.graph.graph(INFERRED_GRAPH)
+        self.reasoner = IncrementalReasoner(self.graph, rules=rules, transitive_properties=transitive_properties,
+                                            inferred_graph=self.inferred)
+        # A store built with the same rules already holds the entailments
+        self._reasoned = isinstance(store, SQLiteStore) and store.get_meta("rules") == ",".join(sorted(self.rules))
         
     def load_ontology(self, turtle_file_path: str) -> None:
         """Load and parse the ontology from a Turtle file."""
-        self.graph.parse(turtle_file_path, format="turtle")
+        if not self._reasoned:
+            self.asserted.parse(turtle_file_path, format="turtle")
+            return
+        # Once reasoning has run, new triples only trigger the entailments they affect
+        loaded = Graph()
+        loaded.parse(turtle_file_path, format="turtle")
+        self.reasoner.add(loaded)
         
     def run_reasoning(self) -> None:
-        """Run OWL RL reasoning over the graph."""
-        DeductiveClosure(OWLRL_Semantics).expand(self.graph)
+        """
+        Compute the entailments of the configured rule subset over the graph.
+
+        After the first run, use add_triples() and retract_triples() to keep the
+        entailments up to date instead of reasoning from scratch.
+        """
+        self.reasoner.run()
+        self._reasoned = True
+
+    def run_full_reasoning(self) -> None:
+        """Run the complete OWL RL closure over the asserted triples (slow, not incremental)."""
+        closure = Graph()
+        for t in self.asserted:
+            closure.add(t)
+        DeductiveClosure(OWLRL_Semantics).expand(closure)
+        for t in closure:
+            if t not in self.asserted:
+                self.inferred.add(t)
+
+    def add_triples(self, triples: Iterable[Triple]) -> Set[Triple]:
+        """Assert triples and return the entailments they add."""
+        if not self._reasoned:
+            for t in triples:
+                self.asserted.add(t)
+            return set()
+        return self.reasoner.add(triples)
+
+    def retract_triples(self, triples: Iterable[Triple]) -> Set[Triple]:
+        """Retract asserted triples and return every triple that no longer holds."""
+        if not self._reasoned:
+            triples = [t for t in triples if t in self.asserted]
+            for t in triples:
+                self.asserted.remove(t)
+            return set(triples)
+        return self.reasoner.retract(triples)
+
+    def save_inferred(self, path: str) -> None:
+        """
+        Persist the inferred triples so a restart can skip reasoning.
+
+        The file records a digest of the asserted triples and the rule set, and
+        load_inferred() only accepts it if both still match.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": INFERRED_SNAPSHOT_VERSION,
+            "digest": graph_digest(self.asserted),
+            "rules": sorted(self.rules),
+            "triples": list(self.inferred),
+        }
+        # Write to a temporary file first so a concurrent reader never sees a partial file
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    def load_inferred(self, path: str) -> bool:
+        """
+        Restore inferred triples saved by save_inferred().
+
+        Returns False, leaving the reasoner untouched, if the file is missing, unreadable
+        or was computed from different asserted triples or rules; run_reasoning() is
+        needed in that case.
+        """
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return False
+        if not isinstance(payload, dict) or payload.get("version") != INFERRED_SNAPSHOT_VERSION:
+            return False
+        if payload.get("rules") != sorted(self.rules) or payload.get("digest") != graph_digest(self.asserted):
+            logger.debug("Inferred triples in %s are stale", path)
+            return False
+        self.inferred.remove((None, None, None))
+        for t in payload["triples"]:
+            self.inferred.add(t)
+        self._reasoned = True
+        return True
         
+    def _run(self, name: str, **bindings: str) -> List[Tuple]:
+        query = prepared_queries(self.namespace)[name]
+        return list(self.graph.query(query, initBindings={k: URIRef(v) for k, v in bindings.items()}))
+
     def get_philosopher_beliefs(self, philosopher_uri: str) -> List[Tuple[str, str, str]]:
         """Get all beliefs (including inferred ones) for a philosopher."""
-        query = f"""
-        SELECT ?belief ?label ?desc WHERE {{
-            <{philosopher_uri}> <{self.namespace}believesIn> ?belief .
-            OPTIONAL {{ ?belief rdfs:label ?label . }}
-            OPTIONAL {{ ?belief <{self.namespace}description> ?desc . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("beliefs", philosopher=philosopher_uri)
     
     def get_philosopher_concepts(self, philosopher_uri: str) -> List[Tuple[str, str, str]]:
         """Get all key concepts (including inferred ones) for a philosopher."""
-        query = f"""
-        SELECT ?concept ?label ?desc WHERE {{
-            <{philosopher_uri}> <{self.namespace}keyConcept> ?concept .
-            OPTIONAL {{ ?concept rdfs:label ?label . }}
-            OPTIONAL {{ ?concept <{self.namespace}description> ?desc . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("concepts", philosopher=philosopher_uri)
     
     def get_philosopher_influences(self, philosopher_uri: str) -> List[Tuple[str, str]]:
         """Get all influences (including inferred ones) for a philosopher."""
-        query = f"""
-        SELECT ?influence ?label WHERE {{
-            <{philosopher_uri}> <{self.namespace}influencedBy> ?influence .
-            OPTIONAL {{ ?influence rdfs:label ?label . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("influences", philosopher=philosopher_uri)
     
     def get_philosopher_influenced(self, philosopher_uri: str) -> List[Tuple[str, str]]:
         """Get all philosophers influenced (including inferred ones) by this philosopher."""
-        query = f"""
-        SELECT ?influenced ?label WHERE {{
-            ?influenced <{self.namespace}influencedBy> <{philosopher_uri}> .
-            OPTIONAL {{ ?influenced rdfs:label ?label . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("influenced", philosopher=philosopher_uri)
     
     def get_ideological_cluster(self, philosopher_uri: str) -> List[Tuple[str, str]]:
         """Get the ideological cluster (including inferred ones) for a philosopher."""
-        query = f"""
-        SELECT ?cluster ?label WHERE {{
-            <{philosopher_uri}> <{self.namespace}ideologicalCluster> ?cluster .
-            OPTIONAL {{ ?cluster rdfs:label ?label . }}
-        }}
+        return self._run("cluster", philosopher=philosopher_uri)
+
+    def get_philosopher_profile(self, philosopher_uri: str) -> PhilosopherProfile:
+        """
+        Get everything about a philosopher in one traversal: beliefs, concepts, contexts,
+        clusters and influences in both directions, with labels and descriptions.
         """
-        return list(self.graph.query(query))
+        return build_profiles(self.graph, [URIRef(philosopher_uri)], self.namespace)[0]
+
+    def get_philosopher_profiles(self, philosopher_uris: Sequence[str]) -> List[PhilosopherProfile]:
+        """Batched get_philosopher_profile; entities shared between philosophers are read once."""
+        return build_profiles(self.graph, [URIRef(uri) for uri in philosopher_uris], self.namespace)
+
+    def get_philosophers_batch(self, query: str, philosopher_uris: Sequence[str]) -> Dict[str, List[Tuple]]:
+        """
+        Run one of the per-philosopher queries for many philosophers in a single query.
+
+        Args:
+            query: One of PHILOSOPHER_QUERIES, e.g. "beliefs" for get_philosopher_beliefs
+            philosopher_uris: The philosophers to look up
+
+        Returns:
+            The rows for each philosopher, in the same shape as the single-philosopher
+            method returns them, keyed by URI in input order
+        """
+        if query not in PHILOSOPHER_QUERIES:
+            raise ValueError(f"Unknown philosopher query '{query}'. Expected one of: {', '.join(PHILOSOPHER_QUERIES)}")
+        results: Dict[str, List[Tuple]] = {uri: [] for uri in philosopher_uris}
+        if not results:
+            return results
+        projection, pattern = QUERIES[query]
+        # n3() escapes the URI and rejects anything that is not one, so the VALUES block is safe
+        values = " ".join(URIRef(uri).n3() for uri in results)
+        text = f"SELECT ?philosopher {projection} WHERE {{ VALUES ?philosopher {{ {values} }} {pattern} }}"
+        for row in self.graph.query(text, initNs=_namespaces(self.namespace)):
+            results[str(row[0])].append(tuple(row[1:]))
+        return results
     
     def get_inferred_facts(self, philosopher_uri: str) -> List[InferredFact]:
         """Get all inferred facts for a philosopher."""
@@ -98,69 +299,25 @@ class SymbolicReasoner:
         return inferred_facts
     
     def _is_inferred_triple(self, subject: URIRef, predicate: URIRef, obj: URIRef) -> bool:
-        """Check if a triple was inferred by the reasoner."""
-        # This is a simplified check - in practice, you'd want to compare
-        # the original graph with the reasoned graph to find new triples
-        return True  # For now, assume all triples are inferred
+        """Check if a triple was inferred by the reasoner rather than asserted."""
+        return (subject, predicate, obj) in self.inferred
     
     def get_related_beliefs(self, belief_uri: str) -> List[Tuple[str, str]]:
         """Get all beliefs that are related to a given belief through subclass or equivalent class relationships."""
-        query = f"""
-        SELECT ?related ?label WHERE {{
-            {{
-                ?related rdfs:subClassOf <{belief_uri}> .
-            }} UNION {{
-                <{belief_uri}> rdfs:subClassOf ?related .
-            }} UNION {{
-                ?related owl:equivalentClass <{belief_uri}> .
-            }}
-            OPTIONAL {{ ?related rdfs:label ?label . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("related", **{"class": belief_uri})
     
     def get_related_concepts(self, concept_uri: str) -> List[Tuple[str, str]]:
         """Get all concepts that are related to a given concept through subclass or equivalent class relationships."""
-        query = f"""
-        SELECT ?related ?label WHERE {{
-            {{
-                ?related rdfs:subClassOf <{concept_uri}> .
-            }} UNION {{
-                <{concept_uri}> rdfs:subClassOf ?related .
-            }} UNION {{
-                ?related owl:equivalentClass <{concept_uri}> .
-            }}
-            OPTIONAL {{ ?related rdfs:label ?label . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("related", **{"class": concept_uri})
     
     def get_philosopher_context(self, philosopher_uri: str) -> List[Tuple[str, str]]:
         """Get all historical contexts (including inferred ones) for a philosopher."""
-        query = f"""
-        SELECT ?context ?label WHERE {{
-            <{philosopher_uri}> <{self.namespace}context> ?context .
-            OPTIONAL {{ ?context rdfs:label ?label . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("context", philosopher=philosopher_uri)
     
     def get_philosopher_by_belief(self, belief_uri: str) -> List[Tuple[str, str]]:
         """Get all philosophers who hold a given belief (including through inference)."""
-        query = f"""
-        SELECT ?philosopher ?label WHERE {{
-            ?philosopher <{self.namespace}believesIn> <{belief_uri}> .
-            OPTIONAL {{ ?philosopher rdfs:label ?label . }}
-        }}
-        """
-        return list(self.graph.query(query))
+        return self._run("by_belief", belief=belief_uri)
     
     def get_philosopher_by_concept(self, concept_uri: str) -> List[Tuple[str, str]]:
         """Get all philosophers who use a given concept (including through inference)."""
-        query = f"""
-        SELECT ?philosopher ?label WHERE {{
-            ?philosopher <{self.namespace}keyConcept> <{concept_uri}> .
-            OPTIONAL {{ ?philosopher rdfs:label ?label . }}
-        }}
-        """
-        return list(self.graph.query(query)) 
\ No newline at end of file
+        return self._run("by_concept", concept=concept_uri)
@@ -0,0 +1,202 @@
+import logging
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from .kg_parser import Philosopher
+from .log import log_event
+from .name_index import uri_fragment
+from .prompt_builder import PromptBuilder
+
+# Here we keep prompts within a token budget
+# PromptBuilder includes every belief, concept and influence of a philosopher, so richly connected
+# philosophers get arbitrarily long prompts. The budgeter counts tokens with the configured model's
+# tokenizer and, when a prompt is over budget, drops the items least relevant to the question first:
+# - Relevance is the number of question words an item's label shares with the question
+# - Ties drop influences before concepts before beliefs, and later items before earlier ones
+# - The fewest drops that fit are found by binary search over that removal order
+#
+# The tokenizer is loaded from the local Hugging Face cache when transformers is installed. Without
+# it, tokens are estimated from the text, which is close enough for budgeting.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "meta-llama/Llama-3.1-8B-Instruct"
+DEFAULT_MAX_INPUT_TOKENS = 2048
+
+# Trimmable philosopher fields, in the order they are given up on a relevance tie
+TRIMMABLE = ("influenced", "influenced_by", "key_concepts", "beliefs")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can could did do does for from had has have how i if in into is it its
+me my no not of on or our should so than that the their them then there these they this to
+was we were what when where which who whom why will with would you your
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one token per punctuation mark and per four characters of a word."""
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECE.findall(text))
+
+
+@lru_cache(maxsize=None)
+def load_token_counter(model_name: str = DEFAULT_MODEL) -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a text for a model.
+
+    Uses the model's tokenizer from the local Hugging Face cache if transformers is installed
+    and the tokenizer has been downloaded, and estimate_tokens otherwise.
+    """
+    try:
+        from transformers import AutoTokenizer
+    except ImportError:
+        logger.debug("transformers is not installed, estimating token counts")
+        return estimate_tokens
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=True)
+    except (OSError, ValueError) as e:
+        logger.warning("No local tokenizer for %s, estimating token counts: %s", model_name, e)
+        return estimate_tokens
+
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count
+
+
+def _words(text: str) -> set:
+    """The content words of a text or URI, with camelCase fragments split and plurals folded."""
+    if text.startswith(("http://", "https://")):
+        text = uri_fragment(text)
+    text = _CAMEL.sub(" ", text).lower()
+    return {word.rstrip("s") if len(word) > 3 else word for word in _WORD.findall(text) if word not in STOPWORDS}
+
+
+@dataclass
+class BudgetedPrompt:
+    prompt: str
+    tokens: int  # Tokens of the whole prompt
+    budget: int
+    section_tokens: Dict[str, int]  # Tokens per non-empty section, see PromptBuilder.build_sections
+    dropped: Dict[str, List[str]] = field(default_factory=dict)  # Items removed per philosopher field
+    lineage_dropped: bool = False  # Whether indirect influences had to be left out
+
+    @property
+    def fits(self) -> bool:
+        return self.tokens <= self.budget
+
+
+class TokenBudgeter:
+    def __init__(self, max_input_tokens: int = DEFAULT_MAX_INPUT_TOKENS,
+                 count_tokens: Optional[Callable[[str], int]] = None, model_name: str = DEFAULT_MODEL):
+        """
+        Args:
+            max_input_tokens: Token budget for the prompt
+            count_tokens: Function counting the tokens of a text; defaults to the model's tokenizer
+            model_name: The model whose tokenizer is used when count_tokens is not given
+        """
+        self.max_input_tokens = max_input_tokens
+        self.count_tokens = count_tokens or load_token_counter(model_name)
+
+    @classmethod
+    def from_env(cls) -> "TokenBudgeter":
+        """Create a budgeter for the configured model, see LLMGenerator.from_env."""
+        return cls(
+            max_input_tokens=int(os.getenv("LLM_MAX_INPUT_TOKENS", DEFAULT_MAX_INPUT_TOKENS)),
+            model_name=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+        )
+
+    def _label(self, philosopher: Philosopher, field_name: str, index: int, item: str) -> str:
+        if field_name == "beliefs":
+            return philosopher.vocabulary.label(philosopher.belief_ids[index])
+        if field_name == "key_concepts":
+            return philosopher.vocabulary.label(philosopher.concept_ids[index])
+        return item
+
+    def removal_order(self, philosopher: Philosopher, question: str) -> List[Tuple[str, int]]:
+        """(field, position) of every trimmable item, least relevant to the question first."""
+        question_words = _words(question)
+        ranked = []
+        for priority, field_name in enumerate(TRIMMABLE):
+            for i, item in enumerate(getattr(philosopher, field_name)):
+                words = _words(self._label(philosopher, field_name, i, item))
+                ranked.append((len(words & question_words), priority, -i, field_name))
+        ranked.sort()
+        return [(field_name, -negative_i) for _, _, negative_i, field_name in ranked]
+
+    def fit(self, builder: PromptBuilder, question: str, simulated_context: Optional[Dict] = None) -> BudgetedPrompt:
+        """Build the prompt for a question, trimming the least relevant items until it fits the budget."""
+        result = self._fit(builder, question, simulated_context)
+        log_event(
+            logger, "prompt_budgeted", level=logging.DEBUG,
+            philosopher=builder.philosopher.name,
+            tokens=result.tokens,
+            budget=result.budget,
+            dropped=sum(len(items) for items in result.dropped.values()),
+            **{f"{name}_tokens": tokens for name, tokens in result.section_tokens.items()},
+        )
+        return result
+
+    def _fit(self, builder: PromptBuilder, question: str, simulated_context: Optional[Dict]) -> BudgetedPrompt:
+        philosopher = builder.philosopher
+        prompt = builder.build_prompt(question, simulated_context)
+        tokens = self.count_tokens(prompt)
+        if tokens <= self.max_input_tokens:
+            return self._result(builder, question, simulated_context, prompt, tokens)
+
+        lineage = builder.influence_index is not None
+        if lineage:
+            # Indirect influences cannot be ranked item by item, so they go before anything else
+            without_lineage = PromptBuilder(philosopher)
+            tokens = self.count_tokens(without_lineage.build_prompt(question, simulated_context))
+            if tokens <= self.max_input_tokens:
+                return self._fit_result(without_lineage, philosopher, [], question, simulated_context, lineage)
+
+        order = self.removal_order(philosopher, question)
+
+        def trimmed(removed: int) -> PromptBuilder:
+            dropped = set(order[:removed])
+            changes = {
+                field_name: [item for i, item in enumerate(getattr(philosopher, field_name))
+                             if (field_name, i) not in dropped]
+                for field_name in TRIMMABLE
+            }
+            return PromptBuilder(philosopher.replace(**changes))
+
+        # Binary search for the fewest removals that fit; removing more never makes a prompt longer
+        low, high = 1, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.count_tokens(trimmed(middle).build_prompt(question, simulated_context)) <= self.max_input_tokens:
+                high = middle
+            else:
+                low = middle + 1
+        return self._fit_result(trimmed(high), philosopher, order[:high], question, simulated_context, lineage)
+
+    def _fit_result(self, fitted: PromptBuilder, original: Philosopher, removed: List[Tuple[str, int]],
+                    question: str, simulated_context: Optional[Dict], lineage_dropped: bool) -> BudgetedPrompt:
+        prompt = fitted.build_prompt(question, simulated_context)
+        result = self._result(fitted, question, simulated_context, prompt, self.count_tokens(prompt))
+        for field_name, i in sorted(removed, key=lambda item: (TRIMMABLE.index(item[0]), item[1])):
+            result.dropped.setdefault(field_name, []).append(getattr(original, field_name)[i])
+        result.lineage_dropped = lineage_dropped
+        if not result.fits:
+            logger.warning("Prompt for %s is %d tokens even with every optional item removed, budget is %d",
+                           original.name, result.tokens, self.max_input_tokens)
+        return result
+
+    def _result(self, builder: PromptBuilder, question: str, simulated_context: Optional[Dict],
+                prompt: str, tokens: int) -> BudgetedPrompt:
+        sections = builder.build_sections(question, simulated_context)
+        return BudgetedPrompt(
+            prompt=prompt,
+            tokens=tokens,
+            budget=self.max_input_tokens,
+            section_tokens={name: self.count_tokens(text) for name, text in sections.items() if text},
+        )
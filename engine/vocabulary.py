@@ -0,0 +1,85 @@
+import sys
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .name_index import uri_fragment
+
+# Here we intern the URIs philosophers refer to
+# Many philosophers share the same beliefs and concepts, and each used to carry its own copy of
+# every long http://example.org/philosophy/... string. A Vocabulary stores every term once and
+# hands out small integer ids instead, so a philosopher only keeps a tuple of ids. Labels are
+# only looked up the first time someone asks for them.
+
+
+class Vocabulary:
+    def __init__(self, resolve_label: Optional[Callable[[str], Optional[str]]] = None):
+        """
+        Args:
+            resolve_label: Optional function returning the label of a term, e.g. its rdfs:label.
+                Terms without a label fall back to their URI fragment.
+        """
+        self.terms: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._labels: Dict[int, str] = {}
+        self._resolve_label = resolve_label
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.ids
+
+    def intern(self, term: str) -> int:
+        """Return the id of a term, adding it to the vocabulary on first use."""
+        i = self.ids.get(term)
+        if i is not None:
+            return i
+        with self._lock:
+            # Another thread may have added it while we were waiting for the lock
+            i = self.ids.get(term)
+            if i is None:
+                self.terms.append(sys.intern(str(term)))
+                i = self.ids[self.terms[-1]] = len(self.terms) - 1
+            return i
+
+    def intern_all(self, terms: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self.intern(term) for term in terms)
+
+    def intern_labeled(self, terms: Iterable[str], labels: Iterable[str]) -> Tuple[int, ...]:
+        """Intern terms whose labels are already known, e.g. those of an unpickled philosopher."""
+        ids = self.intern_all(terms)
+        for i, label in zip(ids, labels):
+            self._labels[i] = label
+        return ids
+
+    def term(self, i: int) -> str:
+        return self.terms[i]
+
+    def terms_of(self, ids: Iterable[int]) -> Tuple[str, ...]:
+        terms = self.terms
+        return tuple(terms[i] for i in ids)
+
+    def label(self, i: int) -> str:
+        """Return the label of a term, resolving it on first use."""
+        label = self._labels.get(i)
+        if label is None:
+            term = self.terms[i]
+            label = (self._resolve_label(term) if self._resolve_label else None) or uri_fragment(term)
+            self._labels[i] = label
+        return label
+
+    def labels_of(self, ids: Iterable[int]) -> Tuple[str, ...]:
+        return tuple(self.label(i) for i in ids)
+
+
+# Philosophers created without a vocabulary of their own share this one
+DEFAULT_VOCABULARY = Vocabulary()
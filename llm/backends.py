@@ -0,0 +1,323 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import requests
+from llm.client import HTTPClient, get_default_client
+
+# Here we define the inference backends LLMGenerator can talk to
+# - HuggingFaceBackend: the hosted Hugging Face Inference API (the default)
+# - OpenAICompatibleBackend: a local server exposing /v1/completions (vLLM, llama.cpp, TGI, ...)
+# - MockBackend: a deterministic in-process stub for load tests without network access
+#
+# Backends receive the fully formatted prompt and the sampling parameters, and return only the
+# newly generated text. Local backends can be wrapped in a BatchingBackend, which collects prompts
+# arriving from concurrent callers within a short window and submits them as one batched request.
+
+logger = logging.getLogger(__name__)
+
+HF_API_BASE = "https://api-inference.huggingface.co/models"
+LOCAL_API_BASE = "http://localhost:8000/v1"
+
+
+class InferenceBackend:
+    """Base class for inference backends."""
+
+    name = "base"
+
+    def complete(self, prompt: str, parameters: Dict) -> str:
+        """Return the generated continuation of a single prompt."""
+        return self.complete_batch([prompt], parameters)[0]
+
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        """Return the generated continuations of several prompts sharing the same parameters."""
+        return [self.complete(prompt, parameters) for prompt in prompts]
+
+    def stream(self, prompt: str, parameters: Dict) -> Iterator[str]:
+        """Yield the generated continuation in chunks; by default as a single chunk."""
+        yield self.complete(prompt, parameters)
+
+    def close(self) -> None:
+        pass
+
+
+def _iter_sse_data(response: requests.Response) -> Iterator[Dict]:
+    """Yield the decoded JSON payload of every server-sent event in a streaming response."""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        event = json.loads(data)
+        if "error" in event:
+            raise requests.exceptions.RequestException(event["error"])
+        yield event
+
+
+class HuggingFaceBackend(InferenceBackend):
+    name = "huggingface"
+
+    def __init__(self, model_name: str, token: str, api_base: str = HF_API_BASE,
+                 client: Optional[HTTPClient] = None):
+        self.model_name = model_name
+        self.token = token
+        self.api_base = api_base.rstrip("/")
+        self.client = client or get_default_client()
+
+    @property
+    def url(self) -> str:
+        return f"{self.api_base}/{self.model_name}"
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def complete(self, prompt: str, parameters: Dict) -> str:
+        payload = {"inputs": prompt, "parameters": parameters}
+        # Retries, timeouts and the circuit breaker are handled by the client
+        response = self.client.post(self.url, json=payload, headers=self._headers())
+        generated_text = response.json()[0]["generated_text"]
+        # The text-generation task echoes the prompt before the continuation
+        if generated_text.startswith(prompt):
+            generated_text = generated_text[len(prompt):]
+        return generated_text
+
+    def stream(self, prompt: str, parameters: Dict) -> Iterator[str]:
+        payload = {"inputs": prompt, "parameters": parameters, "stream": True}
+        response = self.client.post(self.url, json=payload, headers=self._headers(), stream=True)
+        with response:
+            if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                # The server ignored the stream flag, so hand back the whole response at once
+                yield response.json()[0]["generated_text"]
+                return
+            for event in _iter_sse_data(response):
+                token = event.get("token") or {}
+                if token.get("special"):
+                    continue
+                yield token.get("text", "")
+
+
+class OpenAICompatibleBackend(InferenceBackend):
+    name = "openai"
+
+    def __init__(self, model_name: str, api_base: str = LOCAL_API_BASE, api_key: Optional[str] = None,
+                 client: Optional[HTTPClient] = None):
+        self.model_name = model_name
+        self.api_base = api_base.rstrip("/")
+        self.api_key = api_key
+        self.client = client or get_default_client()
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def _payload(self, prompt, parameters: Dict) -> Dict:
+        # Translate the Hugging Face style parameters into the completions API
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "max_tokens": parameters.get("max_new_tokens", 500),
+            "temperature": parameters.get("temperature", 0.7) if parameters.get("do_sample", True) else 0.0,
+            "top_p": parameters.get("top_p", 1.0),
+        }
+        if "repetition_penalty" in parameters:
+            # Not part of the OpenAI API, but accepted by vLLM and llama.cpp
+            payload["repetition_penalty"] = parameters["repetition_penalty"]
+        return payload
+
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        # The completions API accepts a list of prompts and returns one choice per prompt
+        response = self.client.post(f"{self.api_base}/completions", json=self._payload(prompts, parameters),
+                                    headers=self._headers())
+        choices = sorted(response.json()["choices"], key=lambda choice: choice.get("index", 0))
+        return [choice["text"] for choice in choices]
+
+    def complete(self, prompt: str, parameters: Dict) -> str:
+        return self.complete_batch([prompt], parameters)[0]
+
+    def stream(self, prompt: str, parameters: Dict) -> Iterator[str]:
+        payload = self._payload(prompt, parameters)
+        payload["stream"] = True
+        response = self.client.post(f"{self.api_base}/completions", json=payload, headers=self._headers(),
+                                    stream=True)
+        with response:
+            for event in _iter_sse_data(response):
+                for choice in event.get("choices", []):
+                    yield choice.get("text", "")
+
+
+class MockBackend(InferenceBackend):
+    """
+    Deterministic stand-in for a real model.
+
+    The same prompt always produces the same response, and an optional fixed latency per
+    request (not per prompt) makes it useful for load-testing the batching path.
+    """
+
+    name = "mock"
+
+    def __init__(self, model_name: str = "mock", latency: float = 0.0):
+        self.model_name = model_name
+        self.latency = latency
+        self.requests = 0
+        self.prompts = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        return f"This is a deterministic response from {self.model_name} ({digest})."
+
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        with self._lock:
+            self.requests += 1
+            self.prompts += len(prompts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._respond(prompt) for prompt in prompts]
+
+    def complete(self, prompt: str, parameters: Dict) -> str:
+        return self.complete_batch([prompt], parameters)[0]
+
+    def stream(self, prompt: str, parameters: Dict) -> Iterator[str]:
+        for word in self.complete(prompt, parameters).split(" "):
+            yield word + " "
+
+
+class BatchingBackend(InferenceBackend):
+    """
+    Micro-batching wrapper around another backend.
+
+    complete() calls from concurrent threads are queued; a scheduler thread waits up to
+    `max_wait` seconds after the first queued prompt (or until `max_batch_size` prompts are
+    queued) and submits them to the wrapped backend as one complete_batch() call. Prompts
+    are only batched together when their sampling parameters are identical. Up to
+    `max_in_flight` batches are sent at once, so batching never caps throughput at one
+    batch per round trip. Streaming is passed straight through.
+    """
+
+    def __init__(self, backend: InferenceBackend, max_batch_size: int = 8, max_wait: float = 0.01,
+                 max_in_flight: int = 16):
+        self.backend = backend
+        self.name = backend.name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm-batch")
+        self._queue: "queue.Queue[Tuple[str, str, Dict, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                    self._worker.start()
+
+    def complete(self, prompt: str, parameters: Dict) -> str:
+        future: Future = Future()
+        self._queue.put((prompt, json.dumps(parameters, sort_keys=True), parameters, future))
+        self._ensure_worker()
+        return future.result()
+
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        return self.backend.complete_batch(prompts, parameters)
+
+    def stream(self, prompt: str, parameters: Dict) -> Iterator[str]:
+        return self.backend.stream(prompt, parameters)
+
+    def _collect(self) -> List[Tuple[str, str, Dict, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            groups: Dict[str, List[Tuple[str, str, Dict, Future]]] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for items in groups.values():
+                self._executor.submit(self._complete_group, items)
+
+    def _complete_group(self, items: List[Tuple[str, str, Dict, Future]]) -> None:
+        prompts = [item[0] for item in items]
+        try:
+            results = self.backend.complete_batch(prompts, items[0][2])
+            if len(results) != len(prompts):
+                # Every caller is waiting on its own future, so a short reply must fail them all
+                raise requests.exceptions.RequestException(
+                    f"{self.backend.name} returned {len(results)} completions for {len(prompts)} prompts"
+                )
+        except Exception as e:
+            for item in items:
+                item[3].set_exception(e)
+            return
+        logger.debug("Submitted a batch of %d prompts to %s", len(prompts), self.backend.name)
+        for item, result in zip(items, results):
+            item[3].set_result(result)
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+_env_backends: Dict[Tuple, InferenceBackend] = {}
+_env_backends_lock = threading.Lock()
+
+
+def backend_from_env(model_name: str) -> InferenceBackend:
+    """
+    Return the backend selected by LLM_BACKEND ("huggingface", "openai" or "mock").
+
+    Local backends are wrapped in a BatchingBackend configured by LLM_BATCH_SIZE,
+    LLM_BATCH_WINDOW_MS and LLM_BATCH_IN_FLIGHT; setting LLM_BATCH_SIZE=1 disables batching. Backends are shared
+    per configuration, so concurrent generators feed the same batching scheduler.
+    """
+    settings = tuple(os.getenv(name) for name in (
+        "LLM_BACKEND", "LLM_API_BASE", "LLM_API_KEY", "HUGGINGFACE_TOKEN",
+        "LLM_MOCK_LATENCY", "LLM_BATCH_SIZE", "LLM_BATCH_WINDOW_MS", "LLM_BATCH_IN_FLIGHT",
+    ))
+    key = (model_name,) + settings
+    with _env_backends_lock:
+        if key not in _env_backends:
+            _env_backends[key] = _create_backend(model_name)
+        return _env_backends[key]
+
+
+def _create_backend(model_name: str) -> InferenceBackend:
+    kind = os.getenv("LLM_BACKEND", "huggingface").lower()
+    if kind in ("huggingface", "hf"):
+        token = os.getenv("HUGGINGFACE_TOKEN")
+        if not token:
+            raise ValueError("HUGGINGFACE_TOKEN environment variable not set. Please set it in your .env file.")
+        return HuggingFaceBackend(model_name, token, api_base=os.getenv("LLM_API_BASE", HF_API_BASE))
+
+    if kind in ("openai", "local"):
+        backend: InferenceBackend = OpenAICompatibleBackend(
+            model_name,
+            api_base=os.getenv("LLM_API_BASE", LOCAL_API_BASE),
+            api_key=os.getenv("LLM_API_KEY"),
+        )
+    elif kind == "mock":
+        backend = MockBackend(model_name, latency=float(os.getenv("LLM_MOCK_LATENCY", "0")))
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND '{kind}'. Expected 'huggingface', 'openai' or 'mock'.")
+
+    max_batch_size = int(os.getenv("LLM_BATCH_SIZE", "8"))
+    if max_batch_size <= 1:
+        return backend
+    return BatchingBackend(backend, max_batch_size=max_batch_size,
+                           max_wait=float(os.getenv("LLM_BATCH_WINDOW_MS", "10")) / 1000,
+                           max_in_flight=int(os.getenv("LLM_BATCH_IN_FLIGHT", "16")))
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+# Here we cache generated responses on disk
+# Responses are keyed by a hash of the model name, the sampling parameters and the full
+# prompt, so the same question to the same philosopher with the same settings is only sent
+# upstream once. Entries expire after a TTL, and once the cache grows past its entry or byte
+# limit the least recently used entries are evicted.
+#
+# The cache is an optimization, so a database error (e.g. "database is locked" when several
+# workers share the file) is logged and treated as a miss, never raised to the caller.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = ".cache/llm_responses.sqlite"
+
+
+def cache_key(model_name: str, parameters: Dict, prompt: str) -> str:
+    """Return the content-addressed key for a model, its sampling parameters and a prompt."""
+    material = json.dumps(
+        {"model": model_name, "parameters": parameters, "prompt": prompt},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[float] = 7 * 24 * 3600,
+                 max_entries: int = 10_000, max_bytes: int = 100 * 1024 * 1024):
+        """
+        Initialize a disk-backed response cache.
+
+        Args:
+            path: SQLite database file, created if missing
+            ttl: Seconds an entry stays valid, or None to never expire
+            max_entries: Maximum number of entries before LRU eviction
+            max_bytes: Maximum total size of cached responses before LRU eviction
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL lets several worker processes read the cache while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._create_totals()
+
+    def _create_totals(self) -> None:
+        # Entry count and total size, kept up to date by triggers so eviction checks do not scan
+        # the table, and correct across every process sharing the file
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )"""
+            )
+            # Counted once for caches created before the totals existed
+            self._conn.execute(
+                "INSERT OR IGNORE INTO responses_totals SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            )
+            self._conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS responses_totals_insert AFTER INSERT ON responses BEGIN
+                    UPDATE responses_totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0;
+                END"""
+            )
+            self._conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS responses_totals_delete AFTER DELETE ON responses BEGIN
+                    UPDATE responses_totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0;
+                END"""
+            )
+            self._conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS responses_totals_update AFTER UPDATE OF size ON responses BEGIN
+                    UPDATE responses_totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 0;
+                END"""
+            )
+            self._conn.execute("COMMIT")
+        except sqlite3.Error:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.stats.misses += 1
+                    return None
+                response, created_at = row
+                if self.ttl is not None and now - created_at > self.ttl:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.stats.expirations += 1
+                    self.stats.misses += 1
+                    return None
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                logger.warning("Response cache lookup in %s failed, treating it as a miss: %s", self.path, e)
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            return response
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response and evict the least recently used entries if over the limits."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            try:
+                # An upsert rather than INSERT OR REPLACE, whose implicit delete would not fire the totals trigger
+                self._conn.execute(
+                    "INSERT INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET response = excluded.response, size = excluded.size, "
+                    "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                    (key, response, size, now, now),
+                )
+                self._evict()
+            except sqlite3.Error as e:
+                logger.warning("Could not store a response in the cache %s: %s", self.path, e)
+
+    def _evict(self) -> None:
+        count, total = self._conn.execute("SELECT entries, bytes FROM responses_totals WHERE id = 0").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk entries from least to most recently used until we are back under both limits
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+        self.stats.evictions += len(to_delete)
+
+    def purge_expired(self) -> int:
+        """Delete every expired entry and return how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self.stats.expirations += cursor.rowcount
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ResponseCache:
+    """Return the process-wide response cache configured by LLM_CACHE_* environment variables."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                ttl = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+                _default_cache = ResponseCache(
+                    path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    ttl=ttl if ttl > 0 else None,
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10_000)),
+                    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024)),
+                )
+    return _default_cache
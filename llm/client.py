@@ -0,0 +1,233 @@
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+# Here we wrap the HTTP calls to the inference endpoint
+# A single pooled requests.Session keeps connections alive between calls, so only the first
+# call pays for the TCP and TLS handshake. On top of that we add:
+# - Connect and read timeouts, so a hung upstream cannot block a worker forever
+# - Retries with exponential backoff and jitter on 429/503, honoring Retry-After
+# - A circuit breaker that fails fast while the upstream keeps failing
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = frozenset({429, 503})
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling the upstream while the circuit breaker is open."""
+
+
+@dataclass
+class ClientConfig:
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    pool_size: int = 10
+    breaker_threshold: int = 5
+    breaker_reset: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "ClientConfig":
+        """Create a config from LLM_* environment variables, falling back to the defaults."""
+        defaults = cls()
+        return cls(
+            connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", defaults.connect_timeout)),
+            read_timeout=float(os.getenv("LLM_READ_TIMEOUT", defaults.read_timeout)),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", defaults.max_retries)),
+            backoff_base=float(os.getenv("LLM_BACKOFF_BASE", defaults.backoff_base)),
+            backoff_max=float(os.getenv("LLM_BACKOFF_MAX", defaults.backoff_max)),
+            pool_size=int(os.getenv("LLM_POOL_SIZE", defaults.pool_size)),
+            breaker_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", defaults.breaker_threshold)),
+            breaker_reset=float(os.getenv("LLM_BREAKER_RESET", defaults.breaker_reset)),
+        )
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `threshold` consecutive failures the circuit opens and calls are rejected for
+    `reset_after` seconds. After that a single trial call is let through; if it succeeds
+    the circuit closes again, otherwise it stays open for another period.
+    """
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit breaker opened after %d consecutive failures", self._failures)
+                self._opened_at = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Token bucket shared by concurrent callers.
+
+    acquire() blocks until a request may be sent, so at most `rate` requests start per
+    second on average, with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class HTTPClient:
+    def __init__(self, config: Optional[ClientConfig] = None, session: Optional[requests.Session] = None):
+        self.config = config or ClientConfig()
+        self.session = session or self._build_session()
+        self.breaker = CircuitBreaker(self.config.breaker_threshold, self.config.breaker_reset)
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        # Retries are handled here rather than by urllib3 so Retry-After and the breaker stay in one place
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_size,
+            pool_maxsize=self.config.pool_size,
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.config.backoff_max)
+        # Full jitter: a random delay up to the exponential backoff ceiling
+        ceiling = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def post(self, url: str, json: Dict, headers: Optional[Dict[str, str]] = None,
+             stream: bool = False) -> requests.Response:
+        """
+        POST a JSON payload, retrying on 429/503 and connection errors.
+
+        Returns the successful response. Raises requests.HTTPError for error statuses
+        that are not retried (or once retries are exhausted), and CircuitOpenError while
+        the circuit breaker is open.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit breaker is open, not calling {url}")
+
+        timeout = (self.config.connect_timeout, self.config.read_timeout)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, json=json, headers=headers, timeout=timeout, stream=stream)
+            except requests.exceptions.ConnectionError as e:
+                # Connection failures never reached the model, so they are always safe to retry
+                if attempt >= self.config.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                delay = self._backoff(attempt, None)
+                logger.warning("Connection to %s failed (%s), retrying in %.2fs", url, e, delay)
+            except requests.exceptions.RequestException:
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.config.max_retries:
+                    delay = self._backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                    logger.warning("%s returned %d, retrying in %.2fs", url, response.status_code, delay)
+                    response.close()
+                elif response.status_code >= 500 or response.status_code in RETRY_STATUS_CODES:
+                    self.breaker.record_failure()
+                    response.raise_for_status()
+                    return response
+                else:
+                    # 4xx errors are the caller's fault and say nothing about upstream health
+                    self.breaker.record_success()
+                    response.raise_for_status()
+                    return response
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_client: Optional[HTTPClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> HTTPClient:
+    """Return the process-wide client, so every generator shares one connection pool."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = HTTPClient(ClientConfig.from_env())
+    return _default_client
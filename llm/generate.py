@@ -1,95 +1,376 @@
+import asyncio
+import functools
+import logging
 import os
-from datetime import datetime
-from typing import Optional
-from pathlib import Path
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from weakref import WeakKeyDictionary
 import requests
 from dotenv import load_dotenv
 from engine.prompt_builder import PromptBuilder
-from engine.kg_parser import KnowledgeGraphParser
+from engine.registry import get_parser
+from llm.backends import HF_API_BASE, HuggingFaceBackend, InferenceBackend, backend_from_env
+from llm.cache import ResponseCache, cache_key, get_default_cache
+from llm.client import HTTPClient, RateLimiter
+from llm.transcripts import TranscriptRecord, TranscriptStore, get_default_transcripts, prompt_hash
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = HF_API_BASE
+
+T = TypeVar("T")
+
+# Special tokens of the Llama chat format that should never reach the user
+SPECIAL_TOKENS = ("<s>", "</s>", "[INST]", "[/INST]")
+
+EMPTY_RESPONSE = "I apologize, but I am unable to generate a response at this time. This may be due to the complexity of the question or limitations in my current state."
+
+
+class StreamCleaner:
+    """
+    Incremental version of the response cleanup in generate_response.
+
+    Chunks are fed in as they arrive. Text is held back while it could still be the start
+    of the echoed prompt, a special token split across chunks, or trailing whitespace, so
+    the concatenated output matches what cleaning the complete text would produce.
+    """
+
+    def __init__(self, echo: str):
+        self.echo = echo
+        self._pending = ""
+        self._echo_checked = False
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        self._pending += chunk
+        if not self._echo_checked:
+            if len(self._pending) < len(self.echo) and self.echo.startswith(self._pending):
+                return ""
+            if self._pending.startswith(self.echo):
+                self._pending = self._pending[len(self.echo):]
+            self._echo_checked = True
+        for token in SPECIAL_TOKENS:
+            self._pending = self._pending.replace(token, "")
+        if not self._started:
+            self._pending = self._pending.lstrip()
+            if not self._pending:
+                return ""
+            self._started = True
+
+        # Hold back a possible partial special token at the end, and any whitespace before it
+        hold_from = len(self._pending)
+        for token in SPECIAL_TOKENS:
+            for size in range(len(token) - 1, 0, -1):
+                if self._pending.endswith(token[:size]):
+                    hold_from = min(hold_from, len(self._pending) - size)
+                    break
+        emit = self._pending[:hold_from].rstrip()
+        self._pending = self._pending[len(emit):]
+        return emit
+
+    def flush(self) -> str:
+        """Return whatever is still held back once the stream has ended."""
+        if not self._echo_checked:
+            # The whole response was a prefix of the prompt, which counts as an echo
+            return ""
+        rest = self._pending
+        self._pending = ""
+        for token in SPECIAL_TOKENS:
+            rest = rest.replace(token, "")
+        return rest.rstrip() if self._started else rest.strip()
+
 class LLMGenerator:
-    def __init__(self, model_name: str = "meta-llama/Llama-3.1-8B-Instruct", temperature: float = 0.7):
-        """Initialize the LLM generator with a specific model and temperature."""
+    def __init__(self, model_name: str = "meta-llama/Llama-3.1-8B-Instruct", temperature: float = 0.7,
+                 api_base: str = DEFAULT_API_BASE, client: Optional[HTTPClient] = None,
+                 max_concurrency: int = 8, cache: Optional[ResponseCache] = None, use_cache: bool = True,
+                 backend: Optional[InferenceBackend] = None, transcripts: Optional[TranscriptStore] = None,
+                 record_transcripts: bool = True, rate_limiter: Optional[RateLimiter] = None):
+        """
+        Initialize the LLM generator with a specific model and temperature.
+
+        Args:
+            model_name: The model id
+            temperature: Sampling temperature
+            api_base: Base URL of the Hugging Face Inference API, e.g. a local stub server in tests
+            client: HTTP client to use; defaults to the shared pooled client
+            max_concurrency: Maximum number of requests agenerate() runs at once; the generator
+                keeps a thread pool of this size for them
+            cache: Response cache to use; defaults to the shared on-disk cache
+            use_cache: Set to False for sampling-diverse generation, where every call
+                should produce a fresh sample
+            backend: Inference backend to use; defaults to the Hugging Face Inference API
+            transcripts: Transcript store every response is recorded in; defaults to the shared one
+            record_transcripts: Set to False to not record responses at all
+            rate_limiter: Optional limiter every call to the backend waits for; cache hits do not
+        """
         self.model_name = model_name
         self.temperature = temperature
-        self.output_dir = Path("output")
-        self.output_dir.mkdir(exist_ok=True)
-        
-        # Get Hugging Face token
-        self.token = os.getenv("HUGGINGFACE_TOKEN")
-        if not self.token:
-            raise ValueError("HUGGINGFACE_TOKEN environment variable not set. Please set it in your .env file.")
-        
-        # Initialize knowledge graph parser
-        self.kg_parser = KnowledgeGraphParser("data/philosophers.ttl")
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.cache = (cache if cache is not None else get_default_cache()) if use_cache else None
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        self._semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+        # The loop's default executor has at most 32 threads, which would cap concurrency below
+        # max_concurrency, so blocking calls run on a pool of our own, created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.transcripts = (transcripts if transcripts is not None else get_default_transcripts()) \
+            if record_transcripts else None
 
-    def generate_response(self, prompt: str, philosopher: str) -> str:
-        """Generate a response using the Hugging Face Inference API."""
-        # Format the prompt for Llama
-        llama_prompt = f"""<s>[INST] {prompt} [/INST]"""
-        
-        # Call the Hugging Face Inference API
-        API_URL = f"https://api-inference.huggingface.co/models/{self.model_name}"
-        headers = {"Authorization": f"Bearer {self.token}"}
+        if backend is None:
+            # Get Hugging Face token
+            token = os.getenv("HUGGINGFACE_TOKEN")
+            if not token:
+                raise ValueError("HUGGINGFACE_TOKEN environment variable not set. Please set it in your .env file.")
+            backend = HuggingFaceBackend(model_name, token, api_base=api_base, client=client)
+        self.backend = backend
         
-        payload = {
-            "inputs": llama_prompt,
-            "parameters": {
-                "max_new_tokens": 500,
-                "temperature": self.temperature,
-                "top_p": 0.9,
-                "repetition_penalty": 1.1,
-                "do_sample": True
-            }
+        # Use the process-wide shared knowledge graph parser
+        self.kg_parser = get_parser()
+
+    @property
+    def parameters(self) -> Dict:
+        """The sampling parameters sent with every request."""
+        return {
+            "max_new_tokens": 500,
+            "temperature": self.temperature,
+            "top_p": 0.9,
+            "repetition_penalty": 1.1,
+            "do_sample": True
         }
-        
+
+    @staticmethod
+    def _format_prompt(prompt: str) -> str:
+        # Format the prompt for Llama
+        return f"""<s>[INST] {prompt} [/INST]"""
+
+    def _cache_key(self, prompt: str, parameters: Dict) -> str:
+        return cache_key(f"{self.backend.name}:{self.model_name}", parameters, prompt)
+
+    def generate_response(self, prompt: str, philosopher: str, use_cache: bool = True,
+                          raise_errors: bool = False, session: Optional[str] = None,
+                          metadata: Optional[Dict] = None) -> str:
+        """
+        Generate a response using the configured inference backend.
+
+        Args:
+            prompt: The prompt built by PromptBuilder
+            philosopher: Name of the philosopher, used when recording the response
+            use_cache: Set to False to bypass the response cache for this call
+            raise_errors: Raise inference API errors instead of returning an error message,
+                for callers that need to tell a failed call from a response
+            session: Optional id grouping related responses in the transcripts, e.g. a debate
+            metadata: Optional details recorded with the response, e.g. the question
+        """
+        started = time.perf_counter()
+        llama_prompt = self._format_prompt(prompt)
+        parameters = self.parameters
+        cache = self.cache if use_cache else None
+        key = self._cache_key(prompt, parameters)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug("Response cache hit for %s", philosopher)
+                self._record(prompt, philosopher, cached, parameters, started, True, session, metadata)
+                return cached
+
         try:
-            response = requests.post(API_URL, headers=headers, json=payload)
-            response.raise_for_status()  # Raise an exception for bad status codes
-            
-            # Extract the generated text from the response
-            generated_text = response.json()[0]["generated_text"]
-            
-            # Clean up the response text
-            # First remove the prompt
-            generated_text = generated_text[len(llama_prompt):].strip()
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            # The backend returns only the generated continuation, without the prompt
+            generated_text = self.backend.complete(llama_prompt, parameters).strip()
             
             # Remove any special tokens and URLs
-            generated_text = generated_text.replace("<s>", "").replace("</s>", "")
-            generated_text = generated_text.replace("[INST]", "").replace("[/INST]", "")
+            for token in SPECIAL_TOKENS:
+                generated_text = generated_text.replace(token, "")
             
             if not generated_text:
-                generated_text = "I apologize, but I am unable to generate a response at this time. This may be due to the complexity of the question or limitations in my current state."
+                generated_text = EMPTY_RESPONSE
+            elif cache is not None:
+                cache.put(key, generated_text)
 
-            self._save_response(generated_text, philosopher)
+            self._record(prompt, philosopher, generated_text, parameters, started, False, session, metadata)
             
             return generated_text
             
         except requests.exceptions.RequestException as e:
-            error_msg = f"Error calling Hugging Face API: {str(e)}"
-            print(error_msg)
+            if raise_errors:
+                raise
+            error_msg = f"Error calling {self.backend.name} inference API: {str(e)}"
+            logger.error(error_msg)
             return error_msg
 
-    def _save_response(self, response: str, philosopher: str) -> None:
-        """Save the generated response to a file."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{philosopher.lower()}_{timestamp}.txt"
-        filepath = self.output_dir / filename
-        
-        with open(filepath, "w") as f:
-            f.write(response)
+    def stream_response(self, prompt: str, philosopher: str, use_cache: bool = True, raise_errors: bool = False,
+                        session: Optional[str] = None, metadata: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Generate a response as a stream of text chunks.
+
+        The prompt echo and special tokens are removed incrementally as chunks arrive, and
+        the full response is recorded once the stream is finished. A stream the consumer
+        abandons is recorded with what was generated so far and "incomplete" in its metadata.
+        Backends that cannot stream return their whole response as a single chunk. A cached
+        response is yielded as a single chunk without calling the backend. Inference API errors
+        end the stream with an error message, or are raised if raise_errors is set.
+        """
+        started = time.perf_counter()
+        llama_prompt = self._format_prompt(prompt)
+        parameters = self.parameters
+        cache = self.cache if use_cache else None
+        key = self._cache_key(prompt, parameters)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug("Response cache hit for %s", philosopher)
+                # Recorded before yielding, so a consumer that stops after the chunk still leaves a record
+                self._record(prompt, philosopher, cached, parameters, started, True, session, metadata)
+                yield cached
+                return
+
+        cleaner = StreamCleaner(echo=llama_prompt)
+        parts: List[str] = []
+        finished = False
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        try:
+            try:
+                for chunk in self.backend.stream(llama_prompt, parameters):
+                    text = cleaner.feed(chunk)
+                    if text:
+                        parts.append(text)
+                        yield text
+            except requests.exceptions.RequestException as e:
+                if raise_errors:
+                    raise
+                error_msg = f"Error calling {self.backend.name} inference API: {str(e)}"
+                logger.error(error_msg)
+                yield error_msg
+                return
+
+            tail = cleaner.flush()
+            response = "".join(parts) + tail
+            if not response:
+                tail = response = EMPTY_RESPONSE
+            elif cache is not None:
+                cache.put(key, response)
+            # Recorded before the last chunk, so a consumer that stops after it still leaves a full record
+            self._record(prompt, philosopher, response, parameters, started, False, session, metadata)
+            finished = True
+            if tail:
+                yield tail
+        finally:
+            if not finished and parts:
+                # The consumer went away (e.g. an SSE client disconnected) or the backend failed
+                # mid-stream: keep what was generated, flagged so it is not mistaken for a full response
+                self._record(prompt, philosopher, "".join(parts), parameters, started, False, session,
+                             {**(metadata or {}), "incomplete": True})
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                        thread_name_prefix="llm-generate")
+        return self._executor
+
+    async def agenerate(self, prompt: str, philosopher: str, metadata: Optional[Dict] = None,
+                        use_cache: bool = True, raise_errors: bool = False) -> str:
+        """
+        Async version of generate_response.
+
+        The blocking call runs on the generator's own thread pool and the shared connection
+        pool, and at most max_concurrency calls are in flight at once.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.generate_response, prompt, philosopher, use_cache=use_cache,
+                                 raise_errors=raise_errors, metadata=metadata)
+        async with self._semaphore():
+            return await loop.run_in_executor(self._get_executor(), call)
+
+    async def aiterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """
+        Consume a blocking iterator from async code, e.g. stream_response or a debate's turns.
+
+        The iterator must make at most one model call at a time. Items are pulled on the
+        generator's thread pool, and the iterator holds one of the max_concurrency slots
+        until it is exhausted or closed.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        exhausted = object()
+        async with self._semaphore():
+            try:
+                while True:
+                    item = await loop.run_in_executor(executor, next, iterator, exhausted)
+                    if item is exhausted:
+                        return
+                    yield item
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    try:
+                        close()
+                    except ValueError:
+                        # Still running in a worker thread after a cancellation; closed once collected
+                        pass
+
+    async def agenerate_many(self, jobs: Sequence[Tuple[str, str]], metadata: Optional[Dict] = None) -> List[str]:
+        """
+        Generate responses for many independent (prompt, philosopher) pairs concurrently.
+
+        Responses are returned in the same order as the jobs. Up to max_concurrency jobs the
+        total wall time is close to the slowest call rather than the sum of all calls. The metadata, if given, is
+        recorded with every response.
+        """
+        return list(await asyncio.gather(*(self.agenerate(prompt, philosopher, metadata)
+                                           for prompt, philosopher in jobs)))
+
+    def generate_many(self, jobs: Sequence[Tuple[str, str]], metadata: Optional[Dict] = None) -> List[str]:
+        """Synchronous wrapper around agenerate_many for callers without an event loop."""
+        return asyncio.run(self.agenerate_many(jobs, metadata))
+
+    def _record(self, prompt: str, philosopher: str, response: str, parameters: Dict, started: float,
+                cached: bool, session: Optional[str], metadata: Optional[Dict]) -> None:
+        """Queue the response for the transcript store; the write happens in the background."""
+        if self.transcripts is None:
+            return
+        self.transcripts.record(TranscriptRecord(
+            philosopher=philosopher,
+            response=response,
+            model=self.model_name,
+            backend=self.backend.name,
+            parameters=parameters,
+            prompt_hash=prompt_hash(prompt),
+            latency_ms=round((time.perf_counter() - started) * 1000, 2),
+            cached=cached,
+            session=session,
+            metadata=metadata or {},
+        ))
 
     @classmethod
     def from_env(cls) -> 'LLMGenerator':
         """Create an LLMGenerator instance using environment variables."""
-        token = os.getenv("HUGGINGFACE_TOKEN")
-        if not token:
-            raise ValueError("HUGGINGFACE_TOKEN environment variable not set. Please set it in your .env file.")
-        
         model_name = os.getenv("LLM_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
         temperature = float(os.getenv("LLM_TEMPERATURE", "0.7"))
-        
-        return cls(model_name=model_name, temperature=temperature)  
\ No newline at end of file
+        max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        use_cache = os.getenv("LLM_CACHE", "1").lower() not in ("0", "false", "no", "off")
+        record_transcripts = os.getenv("LLM_TRANSCRIPTS", "1").lower() not in ("0", "false", "no", "off")
+
+        # LLM_BACKEND selects the Hugging Face API, a local OpenAI-compatible server or the mock
+        backend = backend_from_env(model_name)
+
+        return cls(model_name=model_name, temperature=temperature, max_concurrency=max_concurrency,
+                   use_cache=use_cache, backend=backend, record_transcripts=record_transcripts)
+ 
\ No newline at end of file
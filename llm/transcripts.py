@@ -0,0 +1,248 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Here we keep a log of every generated response
+# Responses used to be written to a new .txt file each, synchronously in the request path, with
+# names that collided within the same second. Instead, records are appended to one SQLite table:
+# - record() only puts the record on a queue, so callers never wait for the disk
+# - A background writer thread drains the queue and inserts whatever has accumulated in a single
+#   transaction, so a burst of responses costs one commit instead of one file each
+# - WAL mode lets several worker processes append to the same log and read it back
+#
+# Every record carries the model, backend, sampling parameters, a hash of the prompt and the
+# latency, plus free-form metadata such as the question or the debate a turn belongs to.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSCRIPTS_PATH = "output/transcripts.sqlite"
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class TranscriptRecord:
+    philosopher: str
+    response: str
+    model: Optional[str] = None
+    backend: Optional[str] = None
+    parameters: Dict = field(default_factory=dict)
+    prompt_hash: Optional[str] = None
+    latency_ms: Optional[float] = None
+    cached: bool = False
+    session: Optional[str] = None  # Groups records, e.g. the turns of one debate
+    metadata: Dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    id: Optional[int] = None  # Assigned once written
+
+
+_COLUMNS = ("created_at", "session", "philosopher", "model", "backend", "parameters",
+            "prompt_hash", "latency_ms", "cached", "response", "metadata")
+
+
+class TranscriptStore:
+    def __init__(self, path: str = DEFAULT_TRANSCRIPTS_PATH, batch_size: int = 256, flush_interval: float = 0.2):
+        """
+        Initialize an append-only transcript log.
+
+        Args:
+            path: SQLite database file, created if missing
+            batch_size: Maximum number of records written in one transaction
+            flush_interval: Seconds the writer waits for more records before writing a batch
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        # WAL lets several worker processes read the log while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS transcripts (
+                id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                session TEXT,
+                philosopher TEXT NOT NULL,
+                model TEXT,
+                backend TEXT,
+                parameters TEXT NOT NULL,
+                prompt_hash TEXT,
+                latency_ms REAL,
+                cached INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS transcripts_philosopher ON transcripts (philosopher, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS transcripts_session ON transcripts (session, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS transcripts_created_at ON transcripts (created_at)")
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()  # Serialized rows, None to stop
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="transcript-writer", daemon=True)
+        self._writer.start()
+
+    # Writing
+
+    def record(self, record: TranscriptRecord) -> None:
+        """
+        Queue a record for writing; returns immediately.
+
+        The record is serialized here, on the caller's thread, so the writer only ever sees
+        rows it can insert. Values JSON cannot represent, e.g. datetimes or URIRefs, are
+        stored as their str().
+        """
+        if self._closed:
+            raise ValueError("Transcript store is closed")
+        self._queue.put(self._row(record))
+
+    @staticmethod
+    def _row(r: TranscriptRecord) -> tuple:
+        return (
+            r.created_at, r.session, r.philosopher, r.model, r.backend,
+            json.dumps(r.parameters, sort_keys=True, default=str), r.prompt_hash, r.latency_ms, int(r.cached),
+            r.response, json.dumps(r.metadata, ensure_ascii=False, sort_keys=True, default=str),
+        )
+
+    def _write_loop(self) -> None:
+        while True:
+            row = self._queue.get()
+            if row is None:
+                self._queue.task_done()
+                return
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            # Collect whatever else arrives shortly after, up to a full batch
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Drop the batch rather than the writer: flush() and close() wait on every queued row
+                logger.error("Failed to write %d transcript records to %s: %s", len(batch), self.path, e)
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, rows: List[tuple]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO transcripts ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def flush(self) -> None:
+        """Wait until every record queued so far has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write the remaining records and stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    # Reading
+
+    def query(self, philosopher: Optional[str] = None, session: Optional[str] = None,
+              model: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              limit: Optional[int] = 100, newest_first: bool = False) -> List[TranscriptRecord]:
+        """
+        Read records back, oldest first unless newest_first is set.
+
+        Records queued but not yet written are flushed first, so a caller always sees its own writes.
+
+        Args:
+            philosopher: Only records of this philosopher
+            session: Only records of this session, e.g. one debate
+            model: Only records generated by this model
+            since, until: Only records created in this range of Unix timestamps
+            limit: Maximum number of records, or None for all
+        """
+        self.flush()
+        clauses, params = [], []
+        for column, value in (("philosopher", philosopher), ("session", session), ("model", model)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        sql = f"SELECT id, {', '.join(_COLUMNS)} FROM transcripts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC" if newest_first else " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def session(self, session: str) -> List[TranscriptRecord]:
+        """Every record of one session in the order it was written, e.g. the turns of a debate."""
+        return self.query(session=session, limit=None)
+
+    @staticmethod
+    def _from_row(row) -> TranscriptRecord:
+        (id_, created_at, session, philosopher, model, backend, parameters,
+         prompt_hash_, latency_ms, cached, response, metadata) = row
+        return TranscriptRecord(
+            philosopher=philosopher, response=response, model=model, backend=backend,
+            parameters=json.loads(parameters), prompt_hash=prompt_hash_, latency_ms=latency_ms,
+            cached=bool(cached), session=session, metadata=json.loads(metadata),
+            created_at=created_at, id=id_,
+        )
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+
+
+_default_store: Optional[TranscriptStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_transcripts() -> TranscriptStore:
+    """Return the process-wide transcript store at LLM_TRANSCRIPTS_PATH, written out at exit."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = TranscriptStore(os.getenv("LLM_TRANSCRIPTS_PATH", DEFAULT_TRANSCRIPTS_PATH))
+                atexit.register(_default_store.close)
+    return _default_store
@@ -13,6 +13,17 @@ setup(
         "requests>=2.31.0",
         "streamlit>=1.32.0",
         "owlrl>=6.0.0",
+        "numpy>=1.24.0",
+        "scipy>=1.10.0",
     ],
+    extras_require={
+        "api": ["fastapi>=0.100.0", "uvicorn>=0.23.0"],
+        "tokenizer": ["transformers>=4.40.0"],
+    },
+    entry_points={
+        "console_scripts": [
+            "altergeist=app.cli:app",
+        ],
+    },
     python_requires=">=3.8",
 ) 
\ No newline at end of file
@@ -0,0 +1,142 @@
+import json
+from typing import Dict, List, Tuple
+import pytest
+import requests
+from fastapi.testclient import TestClient
+from app.api import MAX_DEBATERS, app
+from engine.registry import ONTOLOGY_ENV
+from llm.backends import MockBackend
+
+
+class FailingBackend(MockBackend):
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        raise requests.exceptions.ConnectionError("upstream is down")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "mock")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setenv("LLM_TRANSCRIPTS", "0")
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def failing(client):
+    engine = client.app.state.engine
+    backend = engine.generator.backend
+    engine.generator.backend = FailingBackend()
+    yield client
+    engine.generator.backend = backend
+
+
+def events(response) -> List[Tuple[str, Dict]]:
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        parsed.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def test_list_and_get_philosophers(client):
+    philosophers = client.get("/philosophers").json()
+    assert "Locke" in {p["name"] for p in philosophers}
+    locke = client.get("/philosophers/Locke").json()
+    assert locke["name"] == "Locke" and locke["beliefs"]
+
+
+def test_unknown_philosopher_is_404(client):
+    assert client.get("/philosophers/Nobody").status_code == 404
+    assert client.post("/ask", json={"philosopher": "Nobody", "question": "Why?"}).status_code == 404
+
+
+def test_ambiguous_philosopher_is_409(tmp_path, monkeypatch):
+    ontology = tmp_path / "namesakes.ttl"
+    ontology.write_text("""
+@prefix ex: <http://example.org/philosophy/> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+ex:adamSmith rdf:type ex:philosopher ; rdfs:label "Smith" .
+ex:johnSmith rdf:type ex:philosopher ; rdfs:label "Smith" .
+""", encoding="utf-8")
+    monkeypatch.setenv(ONTOLOGY_ENV, str(ontology))
+    monkeypatch.setenv("LLM_BACKEND", "mock")
+    monkeypatch.setenv("LLM_TRANSCRIPTS", "0")
+    with TestClient(app) as client:
+        assert client.get("/philosophers/Smith").status_code == 409
+
+
+def test_ask(client):
+    response = client.post("/ask", json={"philosopher": "Locke", "question": "What is property?"})
+    assert response.status_code == 200
+    assert response.json()["response"].startswith("This is a deterministic response")
+    timings = response.headers["Server-Timing"]
+    assert "prompt;dur=" in timings and "llm;dur=" in timings and "total;dur=" in timings
+
+
+def test_ask_inference_error_is_502(failing):
+    response = failing.post("/ask", json={"philosopher": "Locke", "question": "What is property?"})
+    assert response.status_code == 502
+    assert "upstream is down" in response.json()["detail"]
+
+
+def test_ask_stream(client):
+    response = client.post("/ask/stream", json={"philosopher": "Locke", "question": "What is property?"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    parsed = events(response)
+    assert parsed[-1][0] == "done"
+    assert "".join(data["text"] for event, data in parsed if event == "chunk") == parsed[-1][1]["response"]
+
+
+def test_ask_stream_inference_error_is_an_error_event(failing):
+    parsed = events(failing.post("/ask/stream", json={"philosopher": "Locke", "question": "What is property?"}))
+    assert [event for event, _ in parsed] == ["error"]
+    assert "upstream is down" in parsed[0][1]["detail"]
+
+
+def test_debate(client):
+    response = client.post("/debate", json={"philosophers": ["Locke", "Hobbes"], "topic": "Sovereignty",
+                                            "rounds": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert [(t["round"], t["speaker"]) for t in body["turns"]] == [
+        (1, "Locke"), (1, "Hobbes"), (2, "Locke"), (2, "Hobbes")]
+    assert [m["round"] for m in body["metrics"]] == [1, 2]
+
+
+def test_debate_inference_error_is_502(failing):
+    response = failing.post("/debate", json={"philosophers": ["Locke", "Hobbes"], "topic": "Sovereignty"})
+    assert response.status_code == 502
+
+
+def test_debate_stream(client):
+    response = client.post("/debate/stream", json={"philosophers": ["Locke", "Hobbes"], "topic": "Sovereignty"})
+    parsed = events(response)
+    assert [data["speaker"] for event, data in parsed if event == "turn"] == ["Locke", "Hobbes"]
+    assert parsed[-1] == ("done", {"debate_id": parsed[-1][1]["debate_id"], "turns": 2})
+
+
+def test_debate_stream_inference_error_is_an_error_event(failing):
+    parsed = events(failing.post("/debate/stream", json={"philosophers": ["Locke", "Hobbes"],
+                                                         "topic": "Sovereignty"}))
+    assert [event for event, _ in parsed] == ["turn", "error"]
+
+
+def test_debate_panel_size_is_validated(client):
+    assert client.post("/debate", json={"philosophers": ["Locke"], "topic": "Sovereignty"}).status_code == 422
+    panel = ["Locke"] * (MAX_DEBATERS + 1)
+    assert client.post("/debate", json={"philosophers": panel, "topic": "Sovereignty"}).status_code == 422
+
+
+def test_transform(client):
+    response = client.post("/transform", json={"philosopher": "Locke", "year": 1950, "question": "What is property?"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["philosopher"]["birth_year"] == 1950
+    assert body["response"]
+
+
+def test_transform_inference_error_is_502(failing):
+    response = failing.post("/transform", json={"philosopher": "Locke", "year": 1950, "question": "Why?"})
+    assert response.status_code == 502
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import pytest
+import requests
+from llm.backends import BatchingBackend, MockBackend
+
+PARAMETERS = {"temperature": 0.7}
+
+
+class RecordingBackend(MockBackend):
+    """A mock backend that remembers the prompts and parameters of every batch it receives."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(latency=latency)
+        self.batches: List[tuple] = []
+
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        with self._lock:
+            self.batches.append((list(prompts), json.dumps(parameters, sort_keys=True)))
+        return super().complete_batch(prompts, parameters)
+
+
+def call_concurrently(backend, jobs, timeout: float = 5.0):
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [pool.submit(backend.complete, prompt, parameters) for prompt, parameters in jobs]
+        return [future.result(timeout=timeout) for future in futures]
+
+
+def test_concurrent_prompts_are_batched():
+    inner = RecordingBackend(latency=0.05)
+    backend = BatchingBackend(inner, max_batch_size=8, max_wait=0.02)
+    prompts = [f"prompt {i}" for i in range(16)]
+    results = call_concurrently(backend, [(prompt, PARAMETERS) for prompt in prompts])
+    assert results == [inner._respond(prompt) for prompt in prompts]
+    assert inner.prompts == 16
+    assert inner.requests < 16
+    assert all(len(prompts) <= 8 for prompts, _ in inner.batches)
+
+
+def test_prompts_are_only_batched_with_identical_parameters():
+    inner = RecordingBackend(latency=0.02)
+    backend = BatchingBackend(inner, max_batch_size=16, max_wait=0.05)
+    jobs = [(f"prompt {i}", {"temperature": 0.1 * (i % 2)}) for i in range(12)]
+    call_concurrently(backend, jobs)
+    sent = {prompt: parameters for prompt, parameters in jobs}
+    for prompts, parameters in inner.batches:
+        assert {json.dumps(sent[prompt], sort_keys=True) for prompt in prompts} == {parameters}
+
+
+def test_several_batches_are_in_flight_at_once():
+    backend = BatchingBackend(MockBackend(latency=0.1), max_batch_size=8, max_wait=0.01)
+    started = time.perf_counter()
+    call_concurrently(backend, [(f"prompt {i}", PARAMETERS) for i in range(64)])
+    # Eight batches of eight, sent one after another, would take at least 0.8 s
+    assert time.perf_counter() - started < 0.4
+
+
+class FailingBackend(MockBackend):
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        raise requests.exceptions.ConnectionError("upstream is down")
+
+
+class ShortBackend(MockBackend):
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        return super().complete_batch(prompts, parameters)[:-1]
+
+
+def test_backend_errors_reach_every_caller():
+    backend = BatchingBackend(FailingBackend(), max_batch_size=4, max_wait=0.02)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(backend.complete, f"prompt {i}", PARAMETERS) for i in range(4)]
+        for future in futures:
+            with pytest.raises(requests.exceptions.ConnectionError):
+                future.result(timeout=5)
+
+
+def test_missing_completions_fail_instead_of_hanging():
+    backend = BatchingBackend(ShortBackend(), max_batch_size=4, max_wait=0.05)
+    barrier = threading.Barrier(3)
+
+    def complete(i: int) -> str:
+        barrier.wait()
+        return backend.complete(f"prompt {i}", PARAMETERS)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(complete, i) for i in range(3)]
+        for future in futures:
+            with pytest.raises(requests.exceptions.RequestException, match="completions for"):
+                future.result(timeout=5)
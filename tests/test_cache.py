@@ -0,0 +1,110 @@
+import sqlite3
+import time
+import pytest
+from llm.cache import ResponseCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**options) -> ResponseCache:
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), **options)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def totals(cache: ResponseCache):
+    return cache._conn.execute("SELECT entries, bytes FROM responses_totals").fetchone()
+
+
+def test_hit_and_miss(make_cache):
+    cache = make_cache()
+    assert cache.get("a") is None
+    cache.put("a", "Justice is harmony.")
+    assert cache.get("a") == "Justice is harmony."
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl(make_cache):
+    cache = make_cache(ttl=0.05)
+    cache.put("a", "x")
+    assert cache.get("a") == "x"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_purge_expired(make_cache):
+    cache = make_cache(ttl=0.05)
+    cache.put("a", "x")
+    time.sleep(0.1)
+    cache.put("b", "y")
+    assert cache.purge_expired() == 1
+    assert cache.get("b") == "y"
+
+
+def test_least_recently_used_entry_is_evicted(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.put("a", "x")
+    cache.put("b", "y")
+    # Reading "a" makes "b" the least recently used entry
+    time.sleep(0.01)
+    cache.get("a")
+    cache.put("c", "z")
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" and cache.get("c") == "z"
+    assert cache.stats.evictions == 1
+
+
+def test_byte_limit_evicts_until_under(make_cache):
+    cache = make_cache(max_bytes=10)
+    for key in "abc":
+        cache.put(key, key * 4)
+    assert cache.get("a") is None
+    assert cache.get("b") == "bbbb" and cache.get("c") == "cccc"
+    assert totals(cache) == (2, 8)
+
+
+def test_totals_follow_replacements_and_deletions(make_cache):
+    cache = make_cache()
+    cache.put("a", "x" * 10)
+    cache.put("a", "x" * 3)
+    cache.put("b", "é")
+    assert totals(cache) == (2, 5)
+    cache.clear()
+    assert totals(cache) == (0, 0)
+
+
+def test_totals_are_counted_for_an_existing_cache(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                 "created_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+    conn.execute("INSERT INTO responses VALUES ('a', 'xyz', 3, ?, ?)", (time.time(), time.time()))
+    conn.commit()
+    conn.close()
+    cache = ResponseCache(str(path))
+    assert totals(cache) == (1, 3)
+    cache.close()
+
+
+class LockedConnection:
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_database_errors_are_a_miss_not_a_failure(make_cache):
+    cache = make_cache()
+    cache.put("a", "x")
+    conn, cache._conn = cache._conn, LockedConnection()
+    assert cache.get("a") is None
+    cache.put("b", "y")
+    assert cache.stats.misses == 1
+    cache._conn = conn
+    assert cache.get("a") == "x"
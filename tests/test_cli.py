@@ -0,0 +1,98 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+import pytest
+from typer.testing import CliRunner
+from app.cli import app
+from llm.generate import LLMGenerator
+
+runner = CliRunner()
+
+
+@pytest.fixture(autouse=True)
+def mock_backend(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "mock")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setenv("LLM_TRANSCRIPTS", "0")
+
+
+def read_jsonl(path: Path) -> List:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def batch(tmp_path: Path, questions: List[str], philosophers: str) -> int:
+    path = tmp_path / "questions.jsonl"
+    path.write_text("\n".join(json.dumps(q) for q in questions), encoding="utf-8")
+    result = runner.invoke(app, ["batch", str(path), "-p", philosophers, "-o", str(tmp_path / "out.jsonl"), "-w", "2"])
+    return result.exit_code
+
+
+def test_batch_writes_and_checkpoints_every_pair(tmp_path: Path):
+    assert batch(tmp_path, ["What is justice?", "What is liberty?"], "Locke,Hobbes") == 0
+    results = read_jsonl(tmp_path / "out.jsonl")
+    assert len(results) == 4 and all("response" in r for r in results)
+    assert len(read_jsonl(tmp_path / "out.checkpoint")) == 4
+
+    # Everything is checkpointed, so a rerun has nothing left to do
+    assert batch(tmp_path, ["What is justice?", "What is liberty?"], "Locke,Hobbes") == 0
+    assert len(read_jsonl(tmp_path / "out.jsonl")) == 4
+
+
+def test_non_network_errors_fail_only_their_pair(tmp_path: Path, monkeypatch):
+    generate = LLMGenerator.generate_response
+
+    def flaky(self, prompt, philosopher, **kwargs):
+        if philosopher == "Hobbes":
+            raise ValueError("malformed response")
+        return generate(self, prompt, philosopher, **kwargs)
+
+    monkeypatch.setattr(LLMGenerator, "generate_response", flaky)
+    assert batch(tmp_path, ["What is justice?", "What is liberty?"], "Locke,Hobbes") == 1
+    results = read_jsonl(tmp_path / "out.jsonl")
+    errors = [r for r in results if "error" in r]
+    assert len(errors) == 2 and all(e["error"] == "ValueError: malformed response" for e in errors)
+    assert len(results) == 4
+    # Only the successful pairs are checkpointed, so the failed ones are retried
+    assert len(read_jsonl(tmp_path / "out.checkpoint")) == 2
+
+
+def test_philosophers_sharing_a_name_are_kept_apart(tmp_path: Path):
+    ontology = tmp_path / "namesakes.ttl"
+    ontology.write_text("""
+@prefix ex: <http://example.org/philosophy/> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+ex:adamSmith rdf:type ex:philosopher ; rdfs:label "Smith" ; ex:believesIn ex:freeMarkets .
+ex:johnSmith rdf:type ex:philosopher ; rdfs:label "Smith" ; ex:believesIn ex:socialism .
+""", encoding="utf-8")
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text(json.dumps("What is value?"), encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    result = runner.invoke(app, ["batch", str(questions), "-o", str(output), "--ontology", str(ontology)])
+    assert result.exit_code == 0, result.output
+
+    results = read_jsonl(output)
+    assert {r["philosopher_uri"] for r in results} == {
+        "http://example.org/philosophy/adamSmith", "http://example.org/philosophy/johnSmith"}
+    # Each persona answers for itself
+    assert len({r["response"] for r in results}) == 2
+    assert {tuple(entry) for entry in read_jsonl(tmp_path / "out.checkpoint")} == {
+        ("http://example.org/philosophy/adamSmith", "1"), ("http://example.org/philosophy/johnSmith", "1")}
+
+
+def test_already_done_counts_only_the_selected_pairs(tmp_path: Path):
+    assert batch(tmp_path, ["What is justice?", "What is liberty?"], "Locke,Hobbes") == 0
+    path = tmp_path / "questions.jsonl"
+    result = runner.invoke(app, ["batch", str(path), "-p", "Locke", "-o", str(tmp_path / "out.jsonl")])
+    assert result.exit_code == 0
+    assert "0 responses written" in result.output and "2 already done" in result.output
+
+
+def test_connection_pool_is_sized_to_the_workers(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("LLM_POOL_SIZE", "4")
+    path = tmp_path / "questions.jsonl"
+    path.write_text(json.dumps("What is justice?"), encoding="utf-8")
+    result = runner.invoke(app, ["batch", str(path), "-p", "Locke", "-o", str(tmp_path / "out.jsonl"), "-w", "16"])
+    assert result.exit_code == 0
+    assert os.environ["LLM_POOL_SIZE"] == "16"
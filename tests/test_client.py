@@ -0,0 +1,195 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import pytest
+import requests
+from llm.client import (CircuitBreaker, CircuitOpenError, ClientConfig, HTTPClient, RateLimiter,
+                        parse_retry_after)
+
+
+class StubServer:
+    """
+    A local HTTP server answering POSTs with scripted (status, headers, body) replies.
+
+    Once the script is used up, every further request gets the last reply again.
+    """
+
+    def __init__(self, replies: List[Tuple[int, Dict[str, str], Dict]]):
+        self.replies = list(replies)
+        self.requests: List[Dict] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                stub.requests.append(json.loads(self.rfile.read(length) or b"null"))
+                status, headers, body = stub.replies.pop(0) if len(stub.replies) > 1 else stub.replies[0]
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/generate"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+OK = (200, {}, {"generated_text": "ok"})
+
+
+def client(**overrides) -> HTTPClient:
+    config = ClientConfig(connect_timeout=1.0, read_timeout=5.0, backoff_base=0.01, backoff_max=1.0)
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return HTTPClient(config)
+
+
+def test_retries_503_then_succeeds():
+    with StubServer([(503, {}, {}), (503, {}, {}), OK]) as stub:
+        response = client(max_retries=3).post(stub.url, json={"inputs": "x"})
+    assert response.json() == {"generated_text": "ok"}
+    assert len(stub.requests) == 3
+
+
+def test_honors_retry_after():
+    with StubServer([(429, {"Retry-After": "0.3"}, {}), OK]) as stub:
+        started = time.monotonic()
+        client(max_retries=1).post(stub.url, json={})
+        elapsed = time.monotonic() - started
+    assert len(stub.requests) == 2
+    assert elapsed >= 0.3
+
+
+def test_retry_after_is_capped_by_backoff_max():
+    with StubServer([(503, {"Retry-After": "60"}, {}), OK]) as stub:
+        started = time.monotonic()
+        client(max_retries=1, backoff_max=0.1).post(stub.url, json={})
+    assert time.monotonic() - started < 5
+
+
+def test_raises_once_retries_are_exhausted():
+    with StubServer([(503, {}, {})]) as stub:
+        http = client(max_retries=2)
+        with pytest.raises(requests.HTTPError):
+            http.post(stub.url, json={})
+    assert len(stub.requests) == 3
+
+
+def test_client_errors_are_not_retried():
+    with StubServer([(400, {}, {"error": "bad input"}), OK]) as stub:
+        http = client(max_retries=3, breaker_threshold=1)
+        with pytest.raises(requests.HTTPError):
+            http.post(stub.url, json={})
+    assert len(stub.requests) == 1
+    # A 4xx says nothing about upstream health
+    assert not http.breaker.is_open
+
+
+def test_connection_errors_are_retried_then_raised():
+    with StubServer([OK]) as stub:
+        url = stub.url
+    # The server is shut down, so every connection is refused
+    http = client(max_retries=1, breaker_threshold=1)
+    with pytest.raises(requests.ConnectionError):
+        http.post(url, json={})
+    assert http.breaker.is_open
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_successful_trial():
+    with StubServer([(500, {}, {}), (500, {}, {}), OK]) as stub:
+        http = client(max_retries=0, breaker_threshold=2, breaker_reset=0.2)
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                http.post(stub.url, json={})
+        assert http.breaker.is_open
+
+        # Open: rejected without calling the upstream
+        with pytest.raises(CircuitOpenError):
+            http.post(stub.url, json={})
+        assert len(stub.requests) == 2
+
+        # Half-open after the reset period: the trial call goes through and closes the circuit
+        time.sleep(0.25)
+        assert http.post(stub.url, json={}).status_code == 200
+        assert not http.breaker.is_open
+        assert len(stub.requests) == 3
+
+
+def test_breaker_reopens_when_the_trial_fails():
+    with StubServer([(500, {}, {})]) as stub:
+        http = client(max_retries=0, breaker_threshold=1, breaker_reset=0.2)
+        with pytest.raises(requests.HTTPError):
+            http.post(stub.url, json={})
+        time.sleep(0.25)
+        with pytest.raises(requests.HTTPError):
+            http.post(stub.url, json={})
+        # The failed trial starts a new open period
+        with pytest.raises(CircuitOpenError):
+            http.post(stub.url, json={})
+    assert len(stub.requests) == 2
+
+
+def test_breaker_lets_one_trial_through_at_a_time():
+    breaker = CircuitBreaker(threshold=1, reset_after=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), ("2", 2.0), ("-1", 0.0), ("soon", None)])
+def test_parse_retry_after_seconds(value: Optional[str], expected: Optional[float]):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+
+def test_rate_limiter_allows_a_burst_then_paces():
+    limiter = RateLimiter(rate=20, burst=3)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.05
+    for _ in range(4):
+        limiter.acquire()
+    # Four more requests at 20 per second take at least 0.2 s
+    assert time.monotonic() - started >= 0.18
+
+
+def test_rate_limiter_is_shared_by_threads():
+    limiter = RateLimiter(rate=50, burst=1)
+    started = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started >= 0.18
+
+
+def test_rate_limiter_rejects_non_positive_rates():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
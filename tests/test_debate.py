@@ -0,0 +1,111 @@
+from typing import Dict, List
+import pytest
+import requests
+from engine.debate import Debate
+from engine.kg_parser import Philosopher
+from engine.token_budget import estimate_tokens
+from engine.vocabulary import Vocabulary
+from llm.backends import MockBackend
+from llm.generate import LLMGenerator
+
+EX = "http://example.org/philosophy/"
+
+
+def philosopher(name: str) -> Philosopher:
+    return Philosopher(name=name, birth_year=None, beliefs=[EX + "justice"], key_concepts=[], contexts=[],
+                       ideological_cluster=None, influenced_by=[], influenced=[], vocabulary=Vocabulary())
+
+
+PANEL = [philosopher("Plato"), philosopher("Aristotle"), philosopher("Hobbes")]
+
+
+class ArguingBackend(MockBackend):
+    """Long, distinct responses, and optionally a connection error on some calls."""
+
+    def __init__(self, fail_on: tuple = ()):
+        super().__init__()
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def complete_batch(self, prompts: List[str], parameters: Dict) -> List[str]:
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise requests.exceptions.ConnectionError("upstream is down")
+        return [f"Argument number {self.calls} settles it. " + "Justice is a virtue of the soul. " * 20
+                for _ in prompts]
+
+
+def debate(backend: MockBackend, philosophers=PANEL, **options) -> Debate:
+    generator = LLMGenerator(backend=backend, use_cache=False, record_transcripts=False)
+    return Debate(generator, philosophers, "What is justice?", count_tokens=estimate_tokens, **options)
+
+
+def test_every_philosopher_speaks_once_per_round_in_order():
+    turns = debate(ArguingBackend(), rounds=3).run()
+    assert [(turn.round, turn.speaker) for turn in turns] == [
+        (round_number, p.name) for round_number in (1, 2, 3) for p in PANEL]
+
+
+def test_history_stays_within_the_budget():
+    long_debate = debate(ArguingBackend(), rounds=8, history_tokens=400)
+    prompt_tokens = []
+    for turn in long_debate.run_turns():
+        assert turn.history_tokens <= 400
+        text, tokens, _ = long_debate.history()
+        assert estimate_tokens(text) <= tokens <= 400
+        prompt_tokens.append(turn.prompt_tokens)
+    assert any(turn.compacted for turn in long_debate.turns)
+    # Once compaction kicks in prompts stop growing
+    assert max(prompt_tokens[-10:]) - min(prompt_tokens[-10:]) < 100
+
+
+def test_compacted_history_keeps_recent_turns_and_summarizes_older_ones():
+    long_debate = debate(ArguingBackend(), rounds=4, history_tokens=600)
+    long_debate.run()
+    text, _, compacted = long_debate.history()
+    assert compacted
+    assert text.startswith("Summary of earlier turns:")
+    # The latest turn is verbatim, the first only as its gist
+    assert long_debate.turns[-1].text in text
+    assert long_debate.turns[0].text not in text
+
+
+def test_a_failed_turn_is_raised_not_recorded():
+    backend = ArguingBackend(fail_on=(2,))
+    failing = debate(backend, rounds=1)
+    with pytest.raises(requests.exceptions.RequestException):
+        failing.run()
+    assert [turn.speaker for turn in failing.turns] == ["Plato"]
+    assert failing.metrics[0].response_tokens == failing.turns[0].response_tokens
+
+    # Running again resumes with the turn that failed
+    turns = failing.run()
+    assert [turn.speaker for turn in turns] == ["Plato", "Aristotle", "Hobbes"]
+    assert not any("Error calling" in turn.text for turn in turns)
+
+
+def test_a_failed_streamed_turn_stops_the_debate():
+    failing = debate(ArguingBackend(fail_on=(2,)), rounds=1)
+    spoken = []
+    with pytest.raises(requests.exceptions.RequestException):
+        for _, speaker, chunks in failing.stream_turns():
+            spoken.append((speaker.name, "".join(chunks)))
+    assert [name for name, _ in spoken] == ["Plato"]
+    assert [turn.speaker for turn in failing.turns] == ["Plato"]
+
+
+def test_a_failed_streamed_turn_is_not_recorded_even_if_the_consumer_carries_on():
+    failing = debate(ArguingBackend(fail_on=(2,)), rounds=1)
+    for _, _, chunks in failing.stream_turns():
+        try:
+            "".join(chunks)
+        except requests.exceptions.RequestException:
+            pass
+    assert [turn.speaker for turn in failing.turns] == ["Plato"]
+
+
+def test_a_debate_needs_two_philosophers_and_a_round():
+    with pytest.raises(ValueError):
+        debate(ArguingBackend(), philosophers=PANEL[:1])
+    with pytest.raises(ValueError):
+        debate(ArguingBackend(), rounds=0)
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from itertools import combinations
+from typing import List
+import pytest
+from llm.backends import MockBackend
+from llm.cache import ResponseCache
+from llm.generate import SPECIAL_TOKENS, LLMGenerator, StreamCleaner
+from llm.transcripts import TranscriptStore
+
+ECHO = "<s>[INST] What is justice? [/INST]"
+
+
+def clean(text: str, echo: str) -> str:
+    """Cleaning the complete text at once, which the streamed output must match."""
+    if text.startswith(echo):
+        text = text[len(echo):]
+    for token in SPECIAL_TOKENS:
+        text = text.replace(token, "")
+    return text.strip()
+
+
+def stream(chunks: List[str], echo: str = ECHO) -> str:
+    cleaner = StreamCleaner(echo=echo)
+    return "".join(cleaner.feed(chunk) for chunk in chunks) + cleaner.flush()
+
+
+def splits(text: str, parts: int) -> List[List[str]]:
+    """Every way of cutting text into the given number of chunks, empty chunks included."""
+    result = []
+    for cuts in combinations(range(len(text) + 1), parts - 1):
+        bounds = (0,) + cuts + (len(text),)
+        result.append([text[start:end] for start, end in zip(bounds, bounds[1:])])
+    return result
+
+
+@pytest.mark.parametrize("text", [
+    "Justice is the harmony of the soul.",
+    ECHO + " Justice is </s>harmony.",
+    "  [INST]Justice[/INST] is [/I",
+    "Virtue</s>  ",
+    "<s>",
+    ECHO,
+    ECHO[:10],
+])
+def test_stream_matches_cleaning_the_whole_text(text: str):
+    expected = clean(text, ECHO)
+    for chunks in splits(text, 2) + splits(text, 3)[::7]:
+        assert stream(chunks) == expected, chunks
+
+
+def test_special_token_split_across_chunks_is_removed():
+    assert stream(["Justice is", " good[/IN", "ST] indeed</", "s>"]) == "Justice is good indeed"
+
+
+def test_prompt_echo_split_across_chunks_is_removed():
+    assert stream([ECHO[:5], ECHO[5:20], ECHO[20:] + " Justice", " is good."]) == "Justice is good."
+
+
+def test_text_resembling_the_echo_is_kept():
+    assert stream(["<s>[INST] What is", " love?"]) == clean("<s>[INST] What is love?", ECHO)
+
+
+def test_partial_token_at_the_end_is_flushed():
+    cleaner = StreamCleaner(echo=ECHO)
+    assert cleaner.feed("Justice [/IN") == "Justice"
+    assert cleaner.flush() == " [/IN"
+
+
+def test_cached_stream_is_recorded_even_if_abandoned(tmp_path):
+    transcripts = TranscriptStore(str(tmp_path / "transcripts.sqlite"))
+    generator = LLMGenerator(backend=MockBackend(), cache=ResponseCache(str(tmp_path / "cache.sqlite")),
+                             transcripts=transcripts)
+    first = "".join(generator.stream_response("What is justice?", "Plato"))
+
+    # Stop after the single chunk of the cache hit, without resuming the generator
+    chunks = generator.stream_response("What is justice?", "Plato")
+    assert next(chunks) == first
+    chunks.close()
+
+    records = transcripts.query(philosopher="Plato")
+    assert [record.cached for record in records] == [False, True]
+    assert records[0].prompt_hash == records[1].prompt_hash
+    transcripts.close()
+
+
+def timed_generate_many(jobs: int, max_concurrency: int) -> float:
+    generator = LLMGenerator(backend=MockBackend(latency=0.1), max_concurrency=max_concurrency,
+                             use_cache=False, record_transcripts=False)
+    started = time.perf_counter()
+    responses = generator.generate_many([(f"Question {i}", "Plato") for i in range(jobs)])
+    elapsed = time.perf_counter() - started
+    assert len(set(responses)) == jobs
+    return elapsed
+
+
+def test_generate_many_runs_up_to_max_concurrency_calls_at_once():
+    # More jobs than the event loop's default executor has threads
+    assert timed_generate_many(96, max_concurrency=96) < 0.25
+
+
+def test_generate_many_respects_max_concurrency():
+    assert timed_generate_many(8, max_concurrency=4) >= 0.2
+
+
+def test_abandoned_stream_is_recorded_as_incomplete(tmp_path):
+    transcripts = TranscriptStore(str(tmp_path / "transcripts.sqlite"))
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    generator = LLMGenerator(backend=MockBackend(), cache=cache, transcripts=transcripts)
+    chunks = generator.stream_response("What is justice?", "Plato", metadata={"question": "What is justice?"})
+    first = next(chunks)
+    chunks.close()
+
+    [record] = transcripts.query(philosopher="Plato")
+    assert record.response == first
+    assert record.metadata == {"question": "What is justice?", "incomplete": True}
+    # A partial response is never cached
+    assert len(cache) == 0
+    transcripts.close()
+
+
+def test_finished_stream_is_recorded_and_cached_once(tmp_path):
+    transcripts = TranscriptStore(str(tmp_path / "transcripts.sqlite"))
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    generator = LLMGenerator(backend=MockBackend(), cache=cache, transcripts=transcripts)
+    response = "".join(generator.stream_response("What is justice?", "Plato"))
+
+    [record] = transcripts.query(philosopher="Plato")
+    assert record.response == response
+    assert record.metadata == {}
+    assert len(cache) == 1
+    transcripts.close()
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self) -> None:
+        self.acquired += 1
+
+
+def test_rate_limiter_is_not_spent_on_cache_hits(tmp_path):
+    limiter = CountingLimiter()
+    generator = LLMGenerator(backend=MockBackend(), cache=ResponseCache(str(tmp_path / "cache.sqlite")),
+                             record_transcripts=False, rate_limiter=limiter)
+    first = generator.generate_response("What is justice?", "Plato")
+    assert generator.generate_response("What is justice?", "Plato") == first
+    assert "".join(generator.stream_response("What is justice?", "Plato")) == first
+    assert limiter.acquired == 1
+    "".join(generator.stream_response("What is liberty?", "Plato"))
+    assert limiter.acquired == 2
+
+
+def test_aiterate_holds_a_concurrency_slot_per_iterator():
+    generator = LLMGenerator(backend=MockBackend(), max_concurrency=2, use_cache=False, record_transcripts=False)
+
+    def slow(name: str):
+        time.sleep(0.1)
+        yield name
+        yield name.upper()
+
+    async def consume(name: str) -> List[str]:
+        return [item async for item in generator.aiterate(slow(name))]
+
+    async def main():
+        return await asyncio.gather(*(consume(name) for name in "abcd"))
+
+    started = time.perf_counter()
+    assert asyncio.run(main()) == [["a", "A"], ["b", "B"], ["c", "C"], ["d", "D"]]
+    # Four iterators, two at a time
+    assert time.perf_counter() - started >= 0.2
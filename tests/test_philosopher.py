@@ -0,0 +1,66 @@
+import copy
+import pickle
+import pytest
+from engine.kg_parser import Philosopher
+from engine.registry import get_parser
+from engine.vocabulary import Vocabulary
+
+EX = "http://example.org/philosophy/"
+LABELS = {EX + "naturalRights": "Natural Rights", EX + "socialContract": "Social Contract",
+          EX + "tabulaRasa": "Tabula Rasa"}
+
+
+@pytest.fixture
+def philosopher() -> Philosopher:
+    return Philosopher(
+        name="Locke", birth_year=1632,
+        beliefs=[EX + "naturalRights", EX + "socialContract"], key_concepts=[EX + "tabulaRasa"],
+        contexts=[EX + "enlightenment"], ideological_cluster="Liberalism",
+        influenced_by=[EX + "hobbes"], influenced=[EX + "rousseau"], region="England",
+        vocabulary=Vocabulary(resolve_label=LABELS.get),
+    )
+
+
+def test_pickle_round_trip(philosopher: Philosopher):
+    restored = pickle.loads(pickle.dumps(philosopher))
+    assert restored == philosopher
+    assert hash(restored) == hash(philosopher)
+    assert restored.beliefs == philosopher.beliefs
+    assert restored.key_concepts == philosopher.key_concepts
+    assert restored.belief_labels == ("Natural Rights", "Social Contract")
+    assert restored.concept_labels == ("Tabula Rasa",)
+    assert restored.replace(birth_year=1900).birth_year == 1900
+
+
+def test_pickle_does_not_serialize_the_vocabulary(philosopher: Philosopher):
+    assert b"Vocabulary" not in pickle.dumps(philosopher)
+
+
+def test_parsed_philosophers_pickle():
+    philosophers = get_parser().get_all_philosophers()
+    restored = pickle.loads(pickle.dumps(philosophers))
+    assert restored == philosophers
+    for before, after in zip(philosophers, restored):
+        assert after.belief_labels == before.belief_labels
+        assert after.concept_labels == before.concept_labels
+
+
+@pytest.mark.parametrize("copier", [copy.copy, copy.deepcopy])
+def test_copy(philosopher: Philosopher, copier):
+    copied = copier(philosopher)
+    assert copied == philosopher
+    assert copied.belief_labels == philosopher.belief_labels
+
+
+def test_deepcopy_inside_a_container(philosopher: Philosopher):
+    assert copy.deepcopy({"panel": [philosopher]}) == {"panel": [philosopher]}
+
+
+def test_vocabulary_pickles_without_its_lock():
+    vocabulary = Vocabulary()
+    vocabulary.intern(EX + "justice")
+    restored = pickle.loads(pickle.dumps(vocabulary))
+    assert restored.terms == vocabulary.terms
+    assert restored.label(0) == "justice"
+    # The lock is recreated, so interning still works
+    assert restored.intern(EX + "liberty") == 1
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from rdflib import Graph
+from engine.similarity import PhilosopherSimilarity
+
+EX = "http://example.org/philosophy/"
+
+# Hobbes and Locke share the social contract but clash on sovereignty; Marx criticizes property
+TTL = """
+@prefix ex: <http://example.org/philosophy/> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:hobbes rdf:type ex:philosopher ; rdfs:label "Hobbes" ;
+    ex:believesIn ex:socialContract , ex:authoritarianSovereignty , ex:materialism ;
+    ex:criticizes ex:popularSovereignty .
+ex:locke rdf:type ex:philosopher ; rdfs:label "Locke" ;
+    ex:believesIn ex:socialContract , ex:popularSovereignty , ex:propertyRights .
+ex:marx rdf:type ex:philosopher ; rdfs:label "Marx" ;
+    ex:believesIn ex:materialism , ex:classStruggle ;
+    ex:criticizes ex:propertyRights .
+ex:mill rdf:type ex:philosopher ; rdfs:label "Mill" ;
+    ex:believesIn ex:libertarianism .
+
+ex:socialContract rdfs:label "Social Contract" .
+ex:authoritarianSovereignty rdfs:label "Authoritarian Sovereignty" ;
+    ex:contrastsWith ex:popularSovereignty .
+ex:popularSovereignty rdfs:label "Popular Sovereignty" .
+ex:propertyRights rdfs:label "Property Rights" .
+ex:materialism rdfs:label "Materialism" .
+ex:classStruggle rdfs:label "Class Struggle" .
+ex:liberalism rdfs:label "Liberalism" .
+ex:libertarianism rdfs:label "Libertarianism" ; ex:subClassOf ex:liberalism .
+"""
+
+
+@pytest.fixture(scope="module")
+def similarity() -> PhilosopherSimilarity:
+    return PhilosopherSimilarity(Graph().parse(data=TTL, format="turtle"))
+
+
+def test_topic_ideas_match_labels_subclasses_and_contrasts(similarity):
+    assert set(similarity.topic_ideas("Who should be sovereign?")) == {
+        EX + "authoritarianSovereignty", EX + "popularSovereignty"}
+    assert EX + "libertarianism" in similarity.topic_ideas(EX + "liberalism")
+    assert similarity.topic_ideas("astronomy") == []
+
+
+def test_topic_changes_the_ranking(similarity):
+    # Overall Hobbes clashes most with Locke, but on material questions Locke has no stance
+    assert similarity.most_opposed("Hobbes")[0][0] == EX + "locke"
+    assert similarity.most_aligned("Hobbes", topic="materialism")[0][0] == EX + "marx"
+    assert similarity.most_opposed("Locke", topic="property")[0][0] == EX + "marx"
+
+
+def test_topic_with_every_idea_matches_the_whole_profile(similarity):
+    every_idea = " ".join(similarity.ideas)
+    for name in ("Hobbes", "Locke", "Marx", "Mill"):
+        full = np.array([scores[1:] for scores in similarity.scores(name)])
+        on_topic = np.array([scores[1:] for scores in similarity.scores(name, topic=every_idea)])
+        assert np.allclose(full, on_topic)
+
+
+def test_unrelated_topic_scores_zero(similarity):
+    assert all(stance == 0 for _, stance in similarity.most_opposed("Hobbes", n=3, topic="astronomy"))
+
+
+def test_unknown_philosopher_raises(similarity):
+    with pytest.raises(KeyError):
+        similarity.most_opposed("Nobody")
@@ -0,0 +1,35 @@
+from engine.snapshot import SNAPSHOT_DIR_NAME, load_graph
+
+TTL = """
+@prefix ex: <http://example.org/philosophy/> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+ex:locke rdfs:label "{label}" .
+"""
+
+
+def write(path, label: str) -> None:
+    path.write_text(TTL.format(label=label), encoding="utf-8")
+
+
+def snapshots(tmp_path):
+    return sorted(p.name for p in (tmp_path / SNAPSHOT_DIR_NAME).glob("*.pickle"))
+
+
+def test_edited_source_replaces_its_old_snapshot(tmp_path):
+    source = tmp_path / "onto.ttl"
+    write(source, "Locke")
+    load_graph(str(source))
+    write(source, "John Locke")
+    graph = load_graph(str(source))
+    assert "John Locke" in {str(o) for o in graph.objects()}
+    assert len(snapshots(tmp_path)) == 1
+
+
+def test_sources_sharing_a_prefix_keep_their_own_snapshots(tmp_path):
+    write(tmp_path / "onto.ttl", "Locke")
+    write(tmp_path / "onto-extra.ttl", "Hobbes")
+    load_graph(str(tmp_path / "onto-extra.ttl"))
+    load_graph(str(tmp_path / "onto.ttl"))
+    names = snapshots(tmp_path)
+    assert len(names) == 2
+    assert any(name.startswith("onto-extra-") for name in names)
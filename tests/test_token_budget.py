@@ -0,0 +1,57 @@
+import pytest
+from engine.kg_parser import Philosopher
+from engine.prompt_builder import PromptBuilder
+from engine.token_budget import TokenBudgeter, estimate_tokens
+from engine.vocabulary import Vocabulary
+
+EX = "http://example.org/philosophy/"
+QUESTION = "Is private property a natural right?"
+
+
+@pytest.fixture
+def philosopher() -> Philosopher:
+    return Philosopher(
+        name="Locke", birth_year=1632,
+        beliefs=[EX + "religiousToleration", EX + "naturalRights", EX + "separationOfPowers",
+                 EX + "privateProperty", EX + "empiricism"],
+        key_concepts=[EX + "tabulaRasa", EX + "propertyRights", EX + "consentOfTheGoverned"],
+        contexts=[EX + "enlightenment"], ideological_cluster="Liberalism",
+        influenced_by=["Hobbes", "Descartes"], influenced=["Rousseau", "Jefferson", "Voltaire"],
+        region="England", vocabulary=Vocabulary(),
+    )
+
+
+def tokens(philosopher: Philosopher) -> int:
+    return estimate_tokens(PromptBuilder(philosopher).build_prompt(QUESTION))
+
+
+def test_prompt_within_budget_is_unchanged(philosopher):
+    budget = tokens(philosopher)
+    result = TokenBudgeter(budget, count_tokens=estimate_tokens).fit(PromptBuilder(philosopher), QUESTION)
+    assert result.prompt == PromptBuilder(philosopher).build_prompt(QUESTION)
+    assert result.dropped == {}
+
+
+def test_fit_respects_the_budget(philosopher):
+    full = tokens(philosopher)
+    for budget in range(full - 60, full, 7):
+        result = TokenBudgeter(budget, count_tokens=estimate_tokens).fit(PromptBuilder(philosopher), QUESTION)
+        assert result.fits
+        assert result.tokens == estimate_tokens(result.prompt) <= budget
+        assert result.dropped
+
+
+def test_least_relevant_items_are_dropped_first(philosopher):
+    budget = tokens(philosopher) - 40
+    result = TokenBudgeter(budget, count_tokens=estimate_tokens).fit(PromptBuilder(philosopher), QUESTION)
+    dropped = [item for items in result.dropped.values() for item in items]
+    # Influences go before concepts and beliefs, and items sharing a word with the question last
+    assert "Voltaire" in dropped
+    for item in (EX + "naturalRights", EX + "privateProperty", EX + "propertyRights"):
+        assert item not in dropped
+
+
+def test_removal_order_ranks_by_relevance_then_field(philosopher):
+    order = TokenBudgeter(count_tokens=estimate_tokens).removal_order(philosopher, QUESTION)
+    assert order[0] == ("influenced", 2)
+    assert set(order[-3:]) == {("beliefs", 1), ("beliefs", 3), ("key_concepts", 1)}
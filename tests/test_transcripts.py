@@ -0,0 +1,43 @@
+from datetime import datetime
+import pytest
+from rdflib import URIRef
+from llm.transcripts import TranscriptRecord, TranscriptStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TranscriptStore(str(tmp_path / "transcripts.sqlite"), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def test_values_json_cannot_represent_are_stored_as_strings(store):
+    when = datetime(2026, 1, 1, 12, 0)
+    store.record(TranscriptRecord(
+        philosopher="Locke", response="Property is a natural right.",
+        parameters={"stop": URIRef("http://example.org/philosophy/stop")},
+        metadata={"asked_at": when, "philosopher_uri": URIRef("http://example.org/philosophy/locke")},
+    ))
+    [record] = store.query(philosopher="Locke")
+    assert record.metadata == {"asked_at": str(when), "philosopher_uri": "http://example.org/philosophy/locke"}
+    assert record.parameters == {"stop": "http://example.org/philosophy/stop"}
+    assert len(store) == 1
+
+
+def test_writer_survives_a_failing_batch(store, monkeypatch):
+    write = store._write
+    calls = []
+
+    def fail_once(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("disk on fire")
+        write(rows)
+
+    monkeypatch.setattr(store, "_write", fail_once)
+    store.record(TranscriptRecord(philosopher="Hobbes", response="lost"))
+    # flush() returns even though the batch was dropped
+    store.flush()
+    store.record(TranscriptRecord(philosopher="Hobbes", response="kept"))
+    assert [record.response for record in store.query(philosopher="Hobbes")] == ["kept"]
+    assert store._writer.is_alive()